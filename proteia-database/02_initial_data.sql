@@ -86,6 +86,8 @@ INSERT INTO ProductAnalysis (
 -- 5. PROCEDIMIENTOS ALMACENADOS ÚTILES
 -- =============================================
 
+GO
+
 -- Procedimiento para obtener análisis de mercado
 CREATE PROCEDURE sp_GetMarketAnalysis
 AS
@@ -124,6 +126,8 @@ BEGIN
     WHERE EstRevenue IS NOT NULL;
 END;
 
+GO
+
 -- Procedimiento para obtener productos similares a Proteo50
 CREATE PROCEDURE sp_GetSimilarProducts
     @SimilarityThreshold DECIMAL(5,4) = 0.5,
@@ -147,6 +151,8 @@ BEGIN
     ORDER BY pa.SimilarityScore DESC, p.Rating DESC;
 END;
 
+GO
+
 -- Procedimiento para obtener análisis por marca
 CREATE PROCEDURE sp_GetBrandAnalysis
 AS
@@ -174,6 +180,8 @@ GO
 -- =============================================
 
 -- Función para calcular precio por gramo de proteína
+-- Se calcula en vivo para un producto; para ordenar el catálogo usar
+-- sp_GetProteinValueRanking (ProductProteinMetrics) en lugar de llamarla por fila
 CREATE FUNCTION fn_PricePerProteinGram(@ProductId INT)
 RETURNS DECIMAL(10,4)
 AS
@@ -87,6 +87,8 @@ END
 -- 5. VISTAS PARA MANEJO DE USUARIOS
 -- =============================================
 
+GO
+
 -- Vista completa de usuarios con roles
 CREATE VIEW vw_UsersWithRoles AS
 SELECT 
@@ -224,6 +226,8 @@ CREATE INDEX IX_UserSessions_ExpiresAt ON UserSessions(ExpiresAt);
 CREATE INDEX IX_UserRoles_UserId ON UserRoles(UserId);
 CREATE INDEX IX_UserRoles_RoleId ON UserRoles(RoleId);
 
+GO
+
 -- =============================================
 -- 8. TRIGGER PARA AUDITORÍA DE USUARIOS
 -- =============================================
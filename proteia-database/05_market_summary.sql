@@ -0,0 +1,163 @@
+-- =============================================
+-- Resúmenes de mercado precalculados
+-- Las tablas las mantiene el importador (market_summary.py) con agregados
+-- combinables; los procedimientos del dashboard leen de ellas en lugar de
+-- agrupar Products en cada llamada
+-- =============================================
+
+-- =============================================
+-- 1. TABLAS DE RESUMEN
+-- =============================================
+IF OBJECT_ID('MarketSummary', 'U') IS NULL
+BEGIN
+    CREATE TABLE MarketSummary (
+        Dimension NVARCHAR(20) NOT NULL,
+        DimensionKey NVARCHAR(100) NOT NULL,
+        ProductCount INT NOT NULL,
+        PriceSum DECIMAL(18,2) NULL,
+        PriceCount INT NULL,
+        PositivePriceSum DECIMAL(18,2) NULL,
+        PositivePriceCount INT NULL,
+        PriceMin DECIMAL(10,2) NULL,
+        PriceMax DECIMAL(10,2) NULL,
+        RatingSum DECIMAL(18,2) NULL,
+        RatingCount INT NULL,
+        RevenueSum DECIMAL(19,2) NULL,
+        RevenueCount INT NULL,
+        ReviewSum BIGINT NULL,
+        ReviewCount INT NULL,
+        ProteinSum DECIMAL(18,2) NULL,
+        ProteinCount INT NULL,
+        UpdatedAt DATETIME2 DEFAULT GETDATE(),
+        CONSTRAINT PK_MarketSummary PRIMARY KEY (Dimension, DimensionKey)
+    );
+END;
+
+IF OBJECT_ID('MarketSummaryState', 'U') IS NULL
+BEGIN
+    CREATE TABLE MarketSummaryState (
+        ASIN NVARCHAR(20) NOT NULL,
+        Brand NVARCHAR(100) NULL,
+        Category NVARCHAR(100) NULL,
+        Price DECIMAL(10,2) NULL,
+        Rating DECIMAL(3,2) NULL,
+        EstRevenue DECIMAL(15,2) NULL,
+        ReviewCount INT NULL,
+        Protein DECIMAL(5,2) NULL,
+        CONSTRAINT PK_MarketSummaryState PRIMARY KEY (ASIN)
+    );
+END;
+
+-- Métricas de valor proteico: las mantiene el importador (protein_metrics.py)
+IF OBJECT_ID('ProductProteinMetrics', 'U') IS NULL
+BEGIN
+    CREATE TABLE ProductProteinMetrics (
+        ProductId INT NOT NULL,
+        ProteinGrams DECIMAL(12,2) NULL,
+        PricePerProteinGram DECIMAL(10,4) NULL,
+        PricePerKg DECIMAL(12,2) NULL,
+        ProteinDensity DECIMAL(8,2) NULL,
+        UpdatedAt DATETIME2 DEFAULT GETDATE(),
+        CONSTRAINT PK_ProductProteinMetrics PRIMARY KEY (ProductId),
+        FOREIGN KEY (ProductId) REFERENCES Products(Id) ON DELETE CASCADE
+    );
+END;
+
+-- El ranking es un recorrido ordenado de este índice
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ProductProteinMetrics_PricePerProteinGram'
+               AND object_id = OBJECT_ID('ProductProteinMetrics'))
+    CREATE INDEX IX_ProductProteinMetrics_PricePerProteinGram ON ProductProteinMetrics(PricePerProteinGram)
+    INCLUDE (ProteinGrams, PricePerKg, ProteinDensity);
+
+GO
+
+-- =============================================
+-- 2. PROCEDIMIENTOS SOBRE LOS RESÚMENES
+-- =============================================
+
+-- Métricas globales (mismo resultado que el agrupamiento sobre Products)
+CREATE OR ALTER PROCEDURE sp_GetMarketAnalysis
+AS
+BEGIN
+    SELECT 'Total Products' as Metric, ProductCount as Value, 'count' as Type
+    FROM MarketSummary WHERE Dimension = 'global'
+    
+    UNION ALL
+    
+    SELECT 'Average Price', PositivePriceSum / NULLIF(PositivePriceCount, 0), 'currency'
+    FROM MarketSummary WHERE Dimension = 'global'
+    
+    UNION ALL
+    
+    SELECT 'Average Rating', RatingSum / NULLIF(RatingCount, 0), 'rating'
+    FROM MarketSummary WHERE Dimension = 'global'
+    
+    UNION ALL
+    
+    SELECT 'Total Revenue', RevenueSum, 'currency'
+    FROM MarketSummary WHERE Dimension = 'global';
+END;
+
+GO
+
+-- Análisis por marca
+CREATE OR ALTER PROCEDURE sp_GetBrandAnalysis
+AS
+BEGIN
+    SELECT 
+        DimensionKey as Brand,
+        ProductCount,
+        PriceSum / NULLIF(PriceCount, 0) as AvgPrice,
+        RatingSum / NULLIF(RatingCount, 0) as AvgRating,
+        RevenueSum as TotalRevenue,
+        CAST(ReviewSum AS FLOAT) / NULLIF(ReviewCount, 0) as AvgReviews,
+        ProteinSum / NULLIF(ProteinCount, 0) as AvgProtein
+    FROM MarketSummary
+    WHERE Dimension = 'brand'
+        AND DimensionKey != 'PROTEO'
+        AND ProductCount > 0
+    ORDER BY TotalRevenue DESC, AvgRating DESC;
+END;
+
+GO
+
+-- Análisis por categoría (nuevo, sobre el mismo resumen)
+CREATE OR ALTER PROCEDURE sp_GetCategoryAnalysis
+AS
+BEGIN
+    SELECT 
+        DimensionKey as Category,
+        ProductCount,
+        PriceSum / NULLIF(PriceCount, 0) as AvgPrice,
+        PriceMin as MinPrice,
+        PriceMax as MaxPrice,
+        RatingSum / NULLIF(RatingCount, 0) as AvgRating,
+        RevenueSum as TotalRevenue
+    FROM MarketSummary
+    WHERE Dimension = 'category'
+    ORDER BY TotalRevenue DESC;
+END;
+
+GO
+
+-- Ranking del catálogo por valor proteico: ProductProteinMetrics la mantiene el
+-- importador (protein_metrics.py) y su índice por PricePerProteinGram ya trae
+-- el orden, sin evaluar fn_PricePerProteinGram por fila
+CREATE OR ALTER PROCEDURE sp_GetProteinValueRanking
+AS
+BEGIN
+    SELECT 
+        p.ASIN,
+        p.ProductName,
+        p.Brand,
+        m.PricePerProteinGram,
+        m.ProteinGrams,
+        m.PricePerKg,
+        m.ProteinDensity
+    FROM ProductProteinMetrics m
+    INNER JOIN Products p ON p.Id = m.ProductId
+    WHERE m.PricePerProteinGram IS NOT NULL
+    ORDER BY m.PricePerProteinGram ASC;
+END;
+
+GO
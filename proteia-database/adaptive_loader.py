@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Tamaño de lote adaptativo y reintentos para las cargas masivas
+Un lote fijo no sirve igual para todos los tiers de Azure SQL: uno chico
+desperdicia round-trips y uno grande agota el log o dispara el throttling
+(40501, 49918...) y la carga completa falla. El controlador ajusta el tamaño
+con AIMD sobre la latencia observada de cada lote:
+
+- lote más rápido que target_seconds: crece en un paso fijo (aditivo)
+- lote más lento: se reduce en proporción a target / latencia (mínimo a la mitad)
+- throttling o límite de recursos: se reduce a la mitad y se reintenta
+- otro error transitorio (conexión caída, timeout, deadlock): se reduce un
+  cuarto y se reintenta
+
+Los reintentos son por lote, con espera exponencial y jitter completo (nunca
+menor que el "retry after N seconds" que indica el servidor). Cada lote se
+confirma por separado, así que un reintento solo repite ese lote.
+"""
+
+import random
+import re
+import sqlite3
+import threading
+import time
+
+from instrumentation import METRICS
+
+# Throttling y límites de recursos de Azure SQL: el servidor pide bajar la carga
+THROTTLE_ERRORS = {
+    40501: "servicio ocupado",
+    49918: "recursos insuficientes para la operación",
+    49919: "demasiadas operaciones en curso",
+    49920: "servicio ocupado (demasiadas operaciones)",
+    10928: "límite de recursos alcanzado",
+    10929: "límite de recursos del tier",
+}
+
+# Errores transitorios que no dependen del tamaño del lote
+TRANSIENT_ERRORS = {
+    40613: "base de datos no disponible (failover)",
+    40197: "error del servicio al procesar la solicitud",
+    40143: "error del servicio al procesar la solicitud",
+    4221: "réplica secundaria no disponible",
+    1205: "deadlock",
+    233: "conexión cerrada por el servidor",
+    64: "conexión cerrada por el servidor",
+    10053: "conexión interrumpida",
+    10054: "conexión reiniciada por el servidor",
+    10060: "tiempo de conexión agotado",
+}
+
+# SQLSTATE de ODBC: enlace de comunicación, conexión, timeout y deadlock
+TRANSIENT_SQLSTATES = ('08S01', '08001', 'HYT00', '40001')
+
+# Mensajes de SQLite local (otro proceso con el archivo bloqueado)
+TRANSIENT_MESSAGES = ('database is locked', 'database table is locked')
+
+_SQLSTATE_PATTERN = re.compile(r'^[0-9A-Z]{5}$')
+# pyodbc cierra cada registro de diagnóstico con el número nativo y la función ODBC:
+# "[40001] ... deadlocked ... (1205) (SQLExecDirectW)"; los siguientes van tras "; "
+_NATIVE_CODE_PATTERN = re.compile(r'\((\d+)\)(?:\s*\(\w+\))?\s*(?:;|$)')
+_RETRY_AFTER_PATTERN = re.compile(r'retry .*?after (\d+) seconds?', re.IGNORECASE)
+
+
+def _driver_error(error):
+    """Excepción del driver (SQLAlchemy la envuelve en .orig; bulk_loader la lanza directa)"""
+    orig = getattr(error, 'orig', None)
+    return error if orig is None else orig
+
+
+def _error_text(error):
+    """Texto del error y de su causa (SQLAlchemy envuelve el error del driver en .orig)"""
+    parts = [str(error)]
+    orig = getattr(error, 'orig', None)
+    if orig is not None:
+        parts.append(str(orig))
+        parts.extend(str(arg) for arg in getattr(orig, 'args', ()))
+    return ' '.join(parts)
+
+
+def sqlstate(error):
+    """SQLSTATE que pyodbc pasa en args[0] (None si el driver no lo indica)"""
+    args = getattr(_driver_error(error), 'args', ())
+    if args and isinstance(args[0], str) and _SQLSTATE_PATTERN.match(args[0]):
+        return args[0]
+    return None
+
+
+def error_codes(error):
+    """
+    Números de error nativos de SQL Server del driver: args[0] en pymssql, o el
+    número que pyodbc agrega al final de cada registro de su mensaje. Los números
+    entre paréntesis dentro del texto (un valor de clave, nvarchar(64)) no cuentan
+    """
+    args = getattr(_driver_error(error), 'args', ())
+    if args and isinstance(args[0], int) and not isinstance(args[0], bool):
+        return {args[0]}
+    if sqlstate(error) and len(args) > 1:
+        return {int(code) for code in _NATIVE_CODE_PATTERN.findall(str(args[1]))}
+    return set()
+
+
+def classify_error(error):
+    """'throttle', 'transient' o None (error definitivo, no se reintenta)"""
+    codes = error_codes(error)
+    if codes & THROTTLE_ERRORS.keys():
+        return 'throttle'
+    if codes & TRANSIENT_ERRORS.keys():
+        return 'transient'
+    if sqlstate(error) in TRANSIENT_SQLSTATES:
+        return 'transient'
+    driver = _driver_error(error)
+    if isinstance(driver, sqlite3.OperationalError) and str(driver).lower() in TRANSIENT_MESSAGES:
+        return 'transient'
+    return None
+
+
+def retry_after(error):
+    """Segundos de espera que pide el servidor (0 si no indica)"""
+    match = _RETRY_AFTER_PATTERN.search(_error_text(error))
+    return int(match.group(1)) if match else 0
+
+
+class RetryPolicy:
+    """Espera exponencial con jitter completo entre reintentos de un lote"""
+
+    def __init__(self, max_retries=5, base_seconds=1.0, max_seconds=60.0, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.sleep = sleep
+
+    def delay(self, attempt, error=None):
+        """Espera antes del reintento attempt (0 = el primero)"""
+        ceiling = min(self.max_seconds, self.base_seconds * 2 ** attempt)
+        hint = retry_after(error) if error is not None else 0
+        return max(random.uniform(0, ceiling), min(hint, self.max_seconds))
+
+    def wait(self, attempt, error=None):
+        seconds = self.delay(attempt, error)
+        self.sleep(seconds)
+        return seconds
+
+
+class AdaptiveBatchController:
+    """
+    Tamaño de lote de una tabla, ajustado con AIMD
+    Es seguro usarlo desde varios hilos; cada decisión queda en stats
+    """
+
+    def __init__(self, batch_size=10000, min_size=500, max_size=100000, target_seconds=2.0, step=None):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.target_seconds = target_seconds
+        self.step = step or max(min_size, batch_size // 4)
+        self.batch_size = self._clamp(batch_size)
+        self.stats = {'grow': 0, 'hold': 0, 'shrink': 0, 'throttle': 0, 'transient': 0,
+                      'rows': 0, 'seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def _clamp(self, size):
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    def success(self, rows, seconds):
+        """Registrar un lote confirmado y decidir el tamaño del siguiente"""
+        if not rows:
+            # Sentencias sin filas (p. ej. crear la tabla): no informan sobre el tamaño
+            return 'hold'
+        with self._lock:
+            self.stats['rows'] += rows
+            self.stats['seconds'] += seconds
+            if rows < self.batch_size:
+                # Último lote (incompleto) de la tabla: su latencia no dice nada del tamaño
+                decision = 'hold'
+            elif seconds <= self.target_seconds:
+                decision = 'grow' if self.batch_size < self.max_size else 'hold'
+                self.batch_size = self._clamp(self.batch_size + self.step)
+            elif seconds > self.target_seconds * 1.25:
+                decision = 'shrink'
+                self.batch_size = self._clamp(self.batch_size * max(0.5, self.target_seconds / seconds))
+            else:
+                decision = 'hold'
+            self.stats[decision] += 1
+            return decision
+
+    def failure(self, kind):
+        """Registrar un lote fallido por throttling o error transitorio"""
+        with self._lock:
+            self.stats[kind] += 1
+            self.batch_size = self._clamp(self.batch_size * (0.5 if kind == 'throttle' else 0.75))
+            return self.batch_size
+
+    @property
+    def rows_per_second(self):
+        return self.stats['rows'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+
+class AdaptiveBatching:
+    """Controladores por tabla y política de reintentos compartidos por un BulkLoader"""
+
+    def __init__(self, batch_size=10000, min_size=500, max_size=100000, target_seconds=2.0,
+                 max_retries=5, retry_base_seconds=1.0, retry_max_seconds=60.0):
+        self.batch_size = batch_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.retry = RetryPolicy(max_retries, retry_base_seconds, retry_max_seconds)
+        self.controllers = {}
+        self._lock = threading.Lock()
+
+    def controller(self, table_name):
+        """Controlador de la tabla; los lotes siguientes de la misma tabla parten del tamaño aprendido"""
+        with self._lock:
+            controller = self.controllers.get(table_name)
+            if controller is None:
+                controller = self.controllers[table_name] = AdaptiveBatchController(
+                    self.batch_size, self.min_size, self.max_size, self.target_seconds)
+            return controller
+
+    def run(self, attempt_batch, reconnect, table_name):
+        """
+        Ejecutar attempt_batch(size) con reintentos; devuelve las filas enviadas
+        attempt_batch envía y confirma hasta size filas. Ante un error transitorio
+        se llama a reconnect() (la conexión puede haber quedado inutilizable)
+        y se reintenta con el tamaño ya reducido.
+        """
+        controller = self.controller(table_name)
+        attempt = 0
+        while True:
+            size = controller.batch_size
+            started = time.perf_counter()
+            try:
+                rows = attempt_batch(size)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None or attempt >= self.retry.max_retries:
+                    raise
+                controller.failure(kind)
+                METRICS.add(retries=1, throttles=int(kind == 'throttle'))
+                codes = ', '.join(str(code) for code in sorted(error_codes(e))) or kind
+                seconds = self.retry.wait(attempt, e)
+                print(f"  ⏳ Lote de {size:,} filas en {table_name} falló ({codes}); "
+                      f"reintento {attempt + 1}/{self.retry.max_retries} en {seconds:.1f}s "
+                      f"con {controller.batch_size:,} filas")
+                reconnect()
+                attempt += 1
+                continue
+            controller.success(rows, time.perf_counter() - started)
+            return rows
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Backends de base de datos del importador
+- azure: Azure SQL Database con el pool compartido de connection_config
+- sqlite: archivo SQLite local con traducción de T-SQL (sqlite_dialect.py),
+  para desarrollo y CI sin red: el mismo pipeline, las migraciones, las
+  estadísticas y los análisis de mercado corren en proceso
+
+Cada backend entrega un engine de SQLAlchemy y decide qué scripts SQL se
+despliegan en él.
+"""
+
+import os
+
+# Scripts de usuarios y autenticación (esquema config): solo existen en Azure SQL
+AZURE_ONLY_SCRIPTS = ('00_setup_config_users.sql', '04_user_integration.sql')
+
+
+class AzureSqlBackend:
+    """Azure SQL Database (requiere usuario y contraseña)"""
+
+    name = 'azure'
+    local = False
+    supports_merge = True
+
+    def __init__(self, username, password):
+        if not username or not password:
+            raise ValueError("Azure SQL Database requiere autenticación SQL Server (usuario y contraseña)")
+        self.username = username
+        self.password = password
+
+    @property
+    def label(self):
+        from connection_config import DATABASE_CONFIG
+
+        return f"Azure SQL ({DATABASE_CONFIG['server']}/{DATABASE_CONFIG['database']})"
+
+    @property
+    def connection_string(self):
+        from connection_config import get_connection_string
+
+        return get_connection_string(self.username, self.password)
+
+    def create_engine(self):
+        from connection_config import get_engine
+
+        return get_engine(self.username, self.password)
+
+    def deployable_scripts(self, file_paths):
+        return list(file_paths)
+
+
+class SQLiteBackend:
+    """Archivo SQLite local que acepta el T-SQL del importador"""
+
+    name = 'sqlite'
+    local = True
+    supports_merge = False
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._engine = None
+
+    @property
+    def label(self):
+        return f"SQLite local ({self.path})"
+
+    @property
+    def connection_string(self):
+        return f"sqlite:///{self.path}"
+
+    def create_engine(self):
+        """Engine del archivo (uno por backend); WAL permite leer mientras otra etapa escribe"""
+        if self._engine is not None:
+            return self._engine
+
+        from sqlalchemy import create_engine, event
+
+        from instrumentation import instrument_engine
+        from sql_profiler import profile_engine
+        from sqlite_dialect import TSqlConnection
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        engine = create_engine(self.connection_string, connect_args={
+            'factory': TSqlConnection,
+            'check_same_thread': False,
+            'timeout': 60,  # Las etapas en paralelo esperan el bloqueo de escritura
+        })
+
+        @event.listens_for(engine, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+            dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+
+        instrument_engine(engine)
+        profile_engine(engine)
+        self._engine = engine
+        return engine
+
+    def deployable_scripts(self, file_paths):
+        return [path for path in file_paths if os.path.basename(path) not in AZURE_ONLY_SCRIPTS]
+
+
+BACKENDS = {
+    AzureSqlBackend.name: AzureSqlBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def create_backend(name, username=None, password=None, path=None):
+    """Crear un backend por nombre ('azure' con credenciales, 'sqlite' con ruta)"""
+    if name == AzureSqlBackend.name:
+        return AzureSqlBackend(username, password)
+    if name == SQLiteBackend.name:
+        return SQLiteBackend(path)
+    raise ValueError(f"Backend de base de datos desconocido: {name} "
+                     f"(disponibles: {', '.join(sorted(BACKENDS))})")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga a temp_products_market
+Compara el patrón de df.to_sql con pyodbc (un round-trip por fila) contra los
+backends de bulk_loader, sobre SQLite envuelto en un driver DB-API falso que
+simula la latencia de red de Azure SQL.
+
+Uso: python3 benchmarks/bench_bulk_load.py --rows 2000 --rtt-ms 5
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bulk_loader import BulkLoader, ExecutemanyBackend, get_backend
+from csv_streaming import clean_column_name
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', '..', 'proteia-frontend', 'data', 'Products_market.csv')
+
+
+class LatencyCursor:
+    """Cursor que agrega un round-trip simulado por cada viaje al servidor"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection._sqlite.cursor()
+        self.fast_executemany = False
+        self.round_trips = 0
+
+    def _round_trip(self, count=1):
+        self.round_trips += count
+        self._connection.round_trips += count
+        time.sleep(self._connection.rtt * count)
+
+    def setinputsizes(self, sizes):
+        self.input_sizes = sizes
+
+    def execute(self, sql, params=()):
+        self._round_trip()
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        # Sin fast_executemany pyodbc envía cada fila por separado
+        self._round_trip(1 if self.fast_executemany else len(rows))
+        return self._cursor.executemany(sql, rows)
+
+    def close(self):
+        self._cursor.close()
+
+
+class LatencyConnection:
+    """Conexión DB-API sobre SQLite en memoria con latencia de red simulada"""
+
+    def __init__(self, rtt_ms):
+        self._sqlite = sqlite3.connect(':memory:')
+        self.rtt = rtt_ms / 1000.0
+        self.round_trips = 0
+
+    def cursor(self):
+        return LatencyCursor(self)
+
+    def commit(self):
+        self._sqlite.commit()
+
+    def rollback(self):
+        self._sqlite.rollback()
+
+    def close(self):
+        self._sqlite.close()
+
+
+def load_sample(csv_path, rows):
+    """Replicar el CSV de muestra hasta tener el número de filas pedido"""
+    import pandas as pd
+
+    sample = pd.read_csv(csv_path, encoding='utf-8', dtype=str)
+    sample.columns = [clean_column_name(col) for col in sample.columns]
+    repeats = -(-rows // len(sample))
+    return pd.concat([sample] * repeats, ignore_index=True).head(rows)
+
+
+def run_backend(name, df, rtt_ms, batch_size=None):
+    """Cargar el DataFrame con un backend y devolver filas/s y round-trips"""
+    connection = LatencyConnection(rtt_ms)
+    backend = ExecutemanyBackend() if name == 'to_sql' else get_backend(name, batch_size)
+    loader = BulkLoader(backend)
+    # El driver falso no es sqlite3, así que se le pasan tipos de SQLite
+    loader.create_table(connection, 'temp_products_market', df,
+                        column_types={col: 'TEXT' for col in df.columns})
+    connection.round_trips = 0
+
+    started = time.perf_counter()
+    loader.load(connection, 'temp_products_market', df)
+    connection.commit()
+    elapsed = time.perf_counter() - started
+
+    round_trips = connection.round_trips
+    connection.close()
+    return {
+        'backend': name,
+        'rows': len(df),
+        'seconds': elapsed,
+        'rows_per_second': len(df) / elapsed if elapsed > 0 else float('inf'),
+        'round_trips': round_trips,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga masiva a staging")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="CSV de muestra (Products_market.csv)")
+    parser.add_argument('--rows', type=int, default=2000, help="Filas a cargar")
+    parser.add_argument('--rtt-ms', type=float, default=5.0, help="Latencia simulada por round-trip")
+    parser.add_argument('--batch-size', type=int, default=None, help="Filas por lote")
+    parser.add_argument('--min-speedup', type=float, default=10.0,
+                        help="Aceleración mínima exigida a fast_executemany sobre to_sql")
+    args = parser.parse_args(argv)
+
+    df = load_sample(args.csv, args.rows)
+    print(f"🏁 Cargando {len(df):,} filas x {len(df.columns)} columnas "
+          f"(RTT simulado {args.rtt_ms} ms)")
+
+    results = [run_backend(name, df, args.rtt_ms, args.batch_size)
+               for name in ('to_sql', 'multirow', 'fast_executemany')]
+
+    baseline = results[0]['rows_per_second']
+    print(f"\n{'Backend':<18} {'Filas/s':>12} {'Round-trips':>12} {'Aceleración':>12}")
+    print("-" * 58)
+    for result in results:
+        speedup = result['rows_per_second'] / baseline if baseline else float('inf')
+        result['speedup'] = speedup
+        print(f"{result['backend']:<18} {result['rows_per_second']:>12,.0f} "
+              f"{result['round_trips']:>12,} {speedup:>11.1f}x")
+
+    fast = next(r for r in results if r['backend'] == 'fast_executemany')
+    if fast['speedup'] < args.min_speedup:
+        print(f"\n❌ fast_executemany solo alcanzó {fast['speedup']:.1f}x (mínimo {args.min_speedup}x)")
+        return 1
+
+    print(f"\n✅ fast_executemany es {fast['speedup']:.1f}x más rápido que to_sql")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark del importador completo sobre datos sintéticos
+Genera (o reutiliza) un dataset de synthetic_market.py y mide cada etapa del
+importador (ProteiaDataImporter) contra el backend SQLite local, que hace de
+Azure SQL sin conexión: despliegue de los scripts, carga a staging por lotes
+(parseo, limpieza/tipado y deduplicación incluidos), migraciones, resúmenes
+de mercado y estadísticas.
+
+Los resultados se guardan como JSON (--output) y el rendimiento (filas/s)
+de cada etapa se compara con import_baseline.json para detectar regresiones.
+
+Uso:
+    python3 benchmarks/bench_import.py --rows 100000
+    python3 benchmarks/bench_import.py --rows 100000 --update-baseline
+    python3 benchmarks/bench_import.py --rows 10000000 --output /tmp/import_10m.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, 'import_baseline.json')
+
+sys.path.insert(0, REPO_DIR)
+
+from synthetic_market import generate_dataset
+
+# Etapas con menos de este tiempo no se comparan (dominadas por ruido)
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+class StageTimer:
+    """Segundos y filas acumulados por etapa"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def measure(self, stage, rows=0):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds, total_rows = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (seconds + time.perf_counter() - started, total_rows + rows)
+
+    def add_rows(self, stage, rows):
+        seconds, total_rows = self.stages.get(stage, (0.0, 0))
+        self.stages[stage] = (seconds, total_rows + rows)
+
+    def results(self):
+        return {
+            stage: {
+                'seconds': round(seconds, 4),
+                'rows': rows,
+                'rows_per_second': round(rows / seconds, 1) if seconds > 0 and rows else None,
+            }
+            for stage, (seconds, rows) in self.stages.items()
+        }
+
+
+def run_import(paths, rows, workdir, chunk_size, backend, verbose=False):
+    """
+    Ejecutar el importador real contra una base SQLite nueva y devolver los tiempos
+    Se despliegan los scripts del repositorio con el backend sqlite (T-SQL
+    traducido) y cada etapa llama al mismo método que usa la importación
+    """
+    from backends import SQLiteBackend
+    from bulk_loader import BulkLoader
+    from connection_config import IMPORT_CONFIG
+    import import_data
+
+    database_path = os.path.join(workdir, 'bench_import.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(database_path + suffix):
+            os.remove(database_path + suffix)
+
+    sqlite_backend = SQLiteBackend(database_path)
+    importer = import_data.ProteiaDataImporter(sqlite_backend.name, sqlite_backend.path, backend=sqlite_backend)
+    importer.engine = sqlite_backend.create_engine()
+    importer.bulk_loader = BulkLoader(backend, IMPORT_CONFIG['bulk_batch_size'])
+    importer.parse_cache = None
+    sql_files = sqlite_backend.deployable_scripts([os.path.join(REPO_DIR, name) for name in import_data.SQL_SCRIPTS])
+
+    timer = StageTimer()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        with timer.measure('deploy'):
+            ok = importer.deploy_sql_files(sql_files)
+        for table_name, csv_path in paths.items():
+            with timer.measure(f"stage:{table_name}"):
+                ok = importer._import_csv_streaming(csv_path, table_name, chunk_size) and ok
+            timer.add_rows(f"stage:{table_name}", importer.table_rows(f"temp_{table_name}"))
+        analysis_rows = importer.table_rows('temp_selected_analysis')
+        with timer.measure('migrate:products', rows):
+            ok = importer.migrate_products_data() and ok
+        with timer.measure('migrate:analysis', analysis_rows):
+            ok = importer.migrate_analysis_data() and ok
+        with timer.measure('migrate:nutrition', analysis_rows):
+            ok = importer.migrate_nutrition_data(paths['selected_analysis']) and ok
+        with timer.measure('summary', rows):
+            ok = importer.refresh_market_summary() and ok
+        with timer.measure('stats', rows):
+            importer.show_statistics()
+
+    if not ok:
+        raise RuntimeError("Falló una etapa del importador (correr con --verbose para ver el detalle)")
+    return timer.results()
+
+
+def compare(results, baseline, tolerance):
+    """Etapas cuyo rendimiento cayó más que la tolerancia respecto a la línea base"""
+    failures = []
+    for stage, result in results.items():
+        base = baseline.get(stage)
+        current = result['rows_per_second']
+        if base is None or current is None or result['seconds'] < MIN_COMPARABLE_SECONDS:
+            continue
+        if current < base * (1 - tolerance):
+            failures.append(f"{stage} bajó de {base:,.0f} a {current:,.0f} filas/s")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del importador sobre datos sintéticos")
+    parser.add_argument('--rows', type=int, default=100000, help="Productos sintéticos (1K a 10M)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'proteia-bench'),
+                        help="Directorio de los CSV generados y de la base SQLite")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Filas por lote (como IMPORT_CONFIG)")
+    parser.add_argument('--backend', default='executemany', help="Backend de bulk_loader para SQLite")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="Caída de filas/s permitida sobre la línea base (0.3 = -30%%)")
+    parser.add_argument('--output', help="Guardar los resultados en este archivo JSON")
+    parser.add_argument('--update-baseline', action='store_true', help="Guardar resultados como línea base")
+    parser.add_argument('--verbose', action='store_true', help="Mostrar la salida del importador")
+    args = parser.parse_args(argv)
+
+    print(f"🧪 Dataset sintético de {args.rows:,} productos en {args.data_dir}...")
+    started = time.perf_counter()
+    paths = generate_dataset(args.data_dir, args.rows, args.seed)
+    print(f"   Listo en {time.perf_counter() - started:.2f}s")
+
+    results = run_import(paths, args.rows, args.data_dir, args.chunk_size, args.backend, args.verbose)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as file:
+            baselines = json.load(file)
+    baseline = baselines.get(str(args.rows), {})
+
+    print(f"\n{'Etapa':<32} {'Segundos':>9} {'Filas/s':>12} {'Base':>12}")
+    print("-" * 68)
+    for stage, result in results.items():
+        rate = result['rows_per_second']
+        base = baseline.get(stage)
+        print(f"{stage:<32} {result['seconds']:>9.3f} {rate or 0:>12,.0f} "
+              f"{f'{base:,.0f}' if base else '-':>12}")
+
+    report = {
+        'rows': args.rows,
+        'seed': args.seed,
+        'chunk_size': args.chunk_size,
+        'backend': args.backend,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'stages': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+        print(f"\n📄 Resultados en {args.output}")
+
+    if args.update_baseline:
+        baselines[str(args.rows)] = {stage: result['rows_per_second'] for stage, result in results.items()
+                                     if result['rows_per_second'] is not None}
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f"\n💾 Línea base guardada en {os.path.relpath(BASELINE_PATH)}")
+        return 0
+
+    failures = compare(results, baseline, args.tolerance)
+    if failures:
+        print("\n❌ Regresiones de rendimiento:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+
+    print("\n✅ Rendimiento dentro de la línea base" if baseline else "\nℹ️  Sin línea base para este tamaño")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark del puntaje de similitud con Proteo50
+Genera un catálogo sintético (nutrición, precio, etiquetas y segmentos con
+vocabulario realista) y mide score_products sobre todas las filas.
+
+Uso: python3 benchmarks/bench_similarity.py --rows 1000000 --max-seconds 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from market_schema import REFERENCE_ASIN
+from similarity_scoring import score_products
+
+LABELS = ['Alto en proteína', 'Fuente de fibra', 'Bajo en carbohidratos', 'Sin azúcar añadida',
+          'Vegano', 'Sin gluten', 'Orgánico', 'Keto', 'Whey isolate', 'Origen biotecnológico']
+SEGMENTS = ['Deportistas', 'Industria alimentaria', 'Snacks', 'Bebidas', 'Pet-food',
+            'Seasonings', 'Adultos mayores', 'Cárnicos', 'Fitness', 'Veganos']
+
+
+def synthetic_catalog(rows, seed=42):
+    """Frame con las columnas de FEATURE_SQL y la referencia en la primera fila"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+
+    def nutrient(low, high, missing=0.3):
+        values = rng.uniform(low, high, rows).round(2)
+        values[rng.random(rows) < missing] = np.nan
+        return values
+
+    def phrases(vocabulary, missing=0.5):
+        # Combinaciones de 3 frases: pocas cadenas distintas, como en datos reales
+        picks = rng.integers(0, len(vocabulary), size=(rows, 3))
+        text = pd.Series(['; '.join(vocabulary[i] for i in row) for row in picks[:2000]])
+        values = text.iloc[rng.integers(0, len(text), rows)].to_numpy(dtype=object)
+        values[rng.random(rows) < missing] = None
+        return values
+
+    frame = pd.DataFrame({
+        'ProductId': np.arange(1, rows + 1),
+        'ASIN': np.char.add('B', np.char.zfill(np.arange(rows).astype(str), 9)),
+        'Price': rng.uniform(5, 900, rows).round(2),
+        'Weight': rng.uniform(0.1, 5, rows).round(3),
+        'Energy': nutrient(50, 450),
+        'Protein': nutrient(0, 90),
+        'TotalFat': nutrient(0, 40),
+        'Carbohydrates': nutrient(0, 80),
+        'DietaryFiber': nutrient(0, 40),
+        'Sodium': nutrient(0, 1500),
+        'KeyLabels': phrases(LABELS),
+        'IntendedSegment': phrases(SEGMENTS),
+    })
+    frame.loc[0, ['ASIN', 'Price', 'Weight', 'Energy', 'Protein', 'TotalFat', 'Carbohydrates',
+                  'DietaryFiber', 'Sodium']] = [REFERENCE_ASIN, 850.0, 1.0, 304, 47.8, 5.1, 3.2, 26.7, 320]
+    frame.loc[0, 'KeyLabels'] = 'Alto en proteína; Fuente de fibra; Bajo en carbohidratos; Origen biotecnológico'
+    frame.loc[0, 'IntendedSegment'] = 'Industria alimentaria; Seasonings; Snacks; Bebidas; Cárnicos; Pet-food'
+    return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del puntaje de similitud")
+    parser.add_argument('--rows', type=int, default=1000000, help="Productos sintéticos")
+    parser.add_argument('--max-seconds', type=float, default=30.0,
+                        help="Tiempo máximo permitido para puntuar todas las filas")
+    args = parser.parse_args(argv)
+
+    print(f"🧪 Generando {args.rows:,} productos sintéticos...")
+    features = synthetic_catalog(args.rows)
+
+    started = time.perf_counter()
+    scores = score_products(features)
+    elapsed = time.perf_counter() - started
+
+    print(f"🏁 {len(scores):,} puntajes en {elapsed:.2f}s ({len(scores) / elapsed:,.0f} productos/s)")
+    print(f"   Referencia: {scores[0]:.4f} · media {scores.mean():.4f} · máximo resto {scores[1:].max():.4f}")
+
+    if elapsed > args.max_seconds:
+        print(f"\n❌ El puntaje tardó {elapsed:.2f}s (máximo {args.max_seconds:.0f}s)")
+        return 1
+
+    print("\n✅ Puntaje dentro del tiempo permitido")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque de proteia-db
+Ejecuta `python -X importtime` para cada subcomando (importando su módulo sin
+ejecutarlo), suma el tiempo de import y lo compara con un presupuesto y con la
+línea base guardada en startup_baseline.json.
+
+Uso:
+    python3 benchmarks/bench_startup.py                    # comparar con la línea base
+    python3 benchmarks/bench_startup.py --update-baseline  # guardar nueva línea base
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, 'startup_baseline.json')
+
+sys.path.insert(0, DATABASE_DIR)
+
+from proteia_db import COMMANDS
+
+# Dependencias que los comandos livianos no deben cargar al arrancar
+HEAVY_MODULES = ('pandas', 'numpy', 'sqlalchemy', 'pyodbc')
+
+# Comandos cuyo trabajo justifica cargar dependencias pesadas al arrancar
+HEAVY_COMMANDS = {'import', 'parse', 'neighbors', 'analysis'}
+
+# Acciones que usan el importador aunque su comando sea liviano
+HEAVY_ACTIONS = {('verify', 'summaries')}
+
+
+def measure(command, action, runs=3):
+    """
+    Tiempo de import (ms) del CLI más el módulo del subcomando
+    Devuelve el mínimo de varias corridas y los módulos pesados cargados
+    """
+    code = f"import proteia_db; proteia_db.resolve_command({command!r}, {action!r})"
+    best = None
+    heavy = set()
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=DATABASE_DIR, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {command} {action or ''}: {completed.stderr[-500:]}")
+
+        total_us = 0
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = line[len('import time:'):].split('|', 2)
+            total_us += int(self_us)
+            top_level = name.strip().split('.')[0]
+            if top_level in HEAVY_MODULES:
+                heavy.add(top_level)
+
+        total_ms = total_us / 1000.0
+        best = total_ms if best is None else min(best, total_ms)
+    return best, sorted(heavy)
+
+
+def command_label(command, action):
+    return f"{command} {action}" if action else command
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de proteia-db")
+    parser.add_argument('--budget-ms', type=float, default=100.0,
+                        help="Tiempo máximo de import para comandos livianos")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="Regresión permitida sobre la línea base (0.5 = +50%%)")
+    parser.add_argument('--runs', type=int, default=3, help="Corridas por comando (se toma el mínimo)")
+    parser.add_argument('--update-baseline', action='store_true', help="Guardar resultados como línea base")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    results = {}
+    failures = []
+    print(f"{'Comando':<18} {'Import (ms)':>12} {'Base (ms)':>10}  Pesados")
+    print("-" * 60)
+    for command, action in COMMANDS:
+        label = command_label(command, action)
+        total_ms, heavy = measure(command, action, args.runs)
+        results[label] = round(total_ms, 2)
+
+        base = baseline.get(label)
+        base_text = f"{base:.1f}" if base is not None else "-"
+        print(f"{label:<18} {total_ms:>12.1f} {base_text:>10}  {', '.join(heavy) or '-'}")
+
+        if command in HEAVY_COMMANDS or (command, action) in HEAVY_ACTIONS:
+            continue
+        if heavy:
+            failures.append(f"{label} carga {', '.join(heavy)} al arrancar")
+        if total_ms > args.budget_ms:
+            failures.append(f"{label} tarda {total_ms:.1f} ms (presupuesto {args.budget_ms:.0f} ms)")
+        # Margen fijo de 5 ms para no fallar por ruido en comandos muy rápidos
+        if base is not None and total_ms > base * (1 + args.tolerance) + 5:
+            failures.append(f"{label} regresó de {base:.1f} ms a {total_ms:.1f} ms")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f"\n💾 Línea base guardada en {os.path.relpath(BASELINE_PATH)}")
+        return 0
+
+    if failures:
+        print("\n❌ Regresiones de arranque:")
+        for failure in failures:
+            print(f"   - {failure}")
+        return 1
+
+    print("\n✅ Arranque dentro del presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Generador de datos de mercado sintéticos para los benchmarks
+Reproduce el esquema de Products_market.csv y Selected_Products_AI.csv y
+muestrea sus distribuciones de los CSV reales: nombres largos en español con
+familias de variantes ("... (1 kg, Fresa)"), precios y ventas con ruido
+log-normal, porcentajes ("13.83%", "< 0.01%"), fechas m/d/aaaa y nulos en la
+misma proporción. Escribe por bloques, así que escala de 1K a 10M filas con
+memoria acotada.
+
+Uso: python3 benchmarks/synthetic_market.py --rows 1000000 --output /tmp/proteia-bench
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'proteia-frontend', 'data')
+MARKET_SOURCE = os.path.join(DATA_DIR, 'Products_market.csv')
+ANALYSIS_SOURCE = os.path.join(DATA_DIR, 'Selected_Products_AI.csv')
+
+# Subir cuando cambie lo que se genera (invalida los datasets guardados)
+GENERATOR_VERSION = 2
+
+# Columnas numéricas que reciben ruido log-normal (el resto se muestrea tal cual)
+JITTER_COLUMNS = ['Avg. Price per Mo', 'Net', 'FBA Fees', 'Profit Potential', 'Est. Sales',
+                  'Est. Revenue', 'Rev. per Review', '# of Reviews', 'Rank', 'Avg. BSR per Mo']
+
+# Columnas de JITTER_COLUMNS que el CSV real trae como enteros (Products las guarda como INT)
+INTEGER_JITTER_COLUMNS = {'Est. Sales', '# of Reviews', 'Rank', 'Avg. BSR per Mo'}
+
+SIZES = ['1 kg', '2,27 kg', '1700g', '907 g', '500 g', '5LBS', '3LBS', '2 lb', 'paquete de 15', '1 lata']
+FLAVORS = ['Vainilla', 'Chocolate', 'Fresa', 'Moka', 'Cookies and Cream', 'Sin Sabor', 'Coco Caribe',
+           'Rol de Canela', 'Blueberry', 'Fresa Silvestre', 'Pescado', 'Salmón', 'Pollo', 'Cordero']
+
+# (etiqueta, mínimo, máximo, unidad, probabilidad de aparecer)
+NUTRIENTS = [
+    ('Calorías', 40, 450, '', 0.7),
+    ('Proteína', 2, 90, 'g', 0.95),
+    ('Grasas', 0, 30, 'g', 0.8),
+    ('Carbohidratos', 0, 60, 'g', 0.75),
+    ('Fibra', 0, 30, '%', 0.6),
+    ('Azúcar', 0, 20, 'g', 0.5),
+    ('Sodio', 0, 900, 'mg', 0.45),
+    ('Humedad', 5, 12, '%', 0.2),
+]
+
+ASIN_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def load_sources():
+    """CSV reales como texto (se muestrean los valores con su formato original)"""
+    import pandas as pd
+
+    for path in (MARKET_SOURCE, ANALYSIS_SOURCE):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No se encontró el CSV de referencia: {path}")
+    market = pd.read_csv(MARKET_SOURCE, dtype=str, keep_default_na=False, na_values=[''])
+    analysis = pd.read_csv(ANALYSIS_SOURCE, dtype=str, keep_default_na=False, na_values=[''])
+    return market, analysis
+
+
+def synthetic_asins(indices):
+    """ASIN único de 10 caracteres por índice global ("BX" + 8 dígitos base 36)"""
+    import numpy as np
+
+    alphabet = np.array(list(ASIN_ALPHABET))
+    powers = 36 ** np.arange(7, -1, -1, dtype=np.int64)
+    digits = (np.asarray(indices, dtype=np.int64)[:, None] // powers) % 36
+    # Matriz (n × 8) de caracteres vista como n cadenas de 8
+    codes = np.ascontiguousarray(alphabet[digits]).view('<U8').ravel()
+    return np.char.add('BX', codes)
+
+
+def _family_sizes(market, rng, rows):
+    """Tamaños de familia que reproducen la distribución por fila de la columna Variants"""
+    import numpy as np
+
+    variants = market['Variants'].astype(int).value_counts()
+    # Una familia de k variantes aporta k filas: el peso por familia es filas/k
+    weights = variants.to_numpy() / variants.index.to_numpy()
+    sizes = rng.choice(variants.index.to_numpy(), size=rows, p=weights / weights.sum())
+    return sizes[:np.searchsorted(np.cumsum(sizes), rows) + 1]
+
+
+def market_chunk(market, rng, start, rows):
+    """Bloque de filas de Products_market.csv con índices globales start..start+rows"""
+    import numpy as np
+    import pandas as pd
+
+    sizes = _family_sizes(market, rng, rows)
+    family = np.repeat(np.arange(len(sizes)), sizes)[:rows]
+    starts = np.cumsum(sizes) - sizes
+    position = np.arange(rows) - starts[family]
+
+    # Cada familia toma una fila real como plantilla (marca, categoría, peso, precio base)
+    template = rng.integers(0, len(market), len(sizes))[family]
+    base_names = market['Product Name'].str.replace(r'\s*\([^()]*\)\s*$', '', regex=True).to_numpy()
+    family_size = rng.integers(0, len(SIZES), len(sizes))[family]
+    flavor = (position + rng.integers(0, len(FLAVORS), len(sizes))[family]) % len(FLAVORS)
+
+    frame = pd.DataFrame(index=pd.RangeIndex(rows))
+    for column in market.columns:
+        if column not in JITTER_COLUMNS:
+            frame[column] = market[column].to_numpy()[rng.integers(0, len(market), rows)]
+
+    names = pd.Series(base_names[template])
+    frame['Product Name'] = (names + ' (' + pd.Series(np.array(SIZES)[family_size]) + ', '
+                             + pd.Series(np.array(FLAVORS)[flavor]) + ')').to_numpy()
+    for column in ('Brand', 'Category', 'Weight', 'Variants'):
+        frame[column] = market[column].to_numpy()[template]
+
+    price = pd.to_numeric(market['Price'], errors='coerce').to_numpy()[template]
+    price = np.round(price * rng.lognormal(0, 0.25, len(sizes))[family] * rng.lognormal(0, 0.03, rows), 2)
+    frame['Price'] = price
+    frame['Min. Price'] = price
+
+    for column in JITTER_COLUMNS:
+        # Convertir las pocas filas reales y muestrear números, no cada celda generada
+        values = pd.to_numeric(market[column], errors='coerce').to_numpy()
+        jittered = values[rng.integers(0, len(market), rows)] * rng.lognormal(0, 0.2, rows)
+        if column in INTEGER_JITTER_COLUMNS:
+            # Enteros con vacíos: Int64 se escribe "74", no "74.0"
+            frame[column] = pd.array(np.round(jittered), dtype='Float64').astype('Int64')
+        else:
+            frame[column] = np.round(jittered, 2)
+
+    # Fechas m/d/aaaa entre 2010 y 2025, con la misma proporción de vacíos
+    days = pd.to_datetime('2010-01-01') + pd.to_timedelta(rng.integers(0, 15 * 365, rows), unit='D')
+    dates = (days.month.astype(str) + '/' + days.day.astype(str) + '/' + days.year.astype(str)).to_numpy()
+    frame['Available from'] = np.where(frame['Available from'].isna(), None, dates)
+
+    asins = synthetic_asins(np.arange(start, start + rows))
+    frame['ASIN'] = asins
+    frame['URL'] = np.char.add('https://www.amazon.com.mx/dp/', asins)
+    return frame
+
+
+def nutrition_texts(rng, rows):
+    """Columna Nutritional_Values: "Proteína: 21g; Grasas: 4.5g; ..." con nutrientes al azar"""
+    import numpy as np
+    import pandas as pd
+
+    text = pd.Series([''] * rows, dtype=object)
+    for label, low, high, unit, probability in NUTRIENTS:
+        values = pd.Series(np.round(rng.uniform(low, high, rows), 1)).astype(str).str.replace('.0', '', regex=False)
+        part = label + ': ' + values + unit
+        present = rng.random(rows) < probability
+        separator = np.where(text == '', '', '; ')
+        text = text.where(~present, text + separator + part)
+    return text.where(text != '', None).to_numpy()
+
+
+def analysis_frame(analysis, rng, product_rows, source_rows):
+    """Selected_Products_AI.csv en la misma proporción que los CSV reales, con ASIN existentes"""
+    import numpy as np
+    import pandas as pd
+
+    rows = min(product_rows, max(len(analysis), product_rows * len(analysis) // source_rows))
+    indices = np.sort(rng.choice(product_rows, size=rows, replace=False))
+
+    frame = pd.DataFrame(index=pd.RangeIndex(rows))
+    for column in analysis.columns:
+        frame[column] = analysis[column].to_numpy()[rng.integers(0, len(analysis), rows)]
+    frame['ASIN'] = synthetic_asins(indices)
+    frame['Nutritional_Values'] = nutrition_texts(rng, rows)
+    return frame
+
+
+class CsvChunkWriter:
+    """
+    Escribir lotes de DataFrame en un mismo CSV
+    Con pyarrow se usa su escritor (más de 10x más rápido que DataFrame.to_csv)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+        self._schema = None
+        self._rows = 0
+        try:
+            import pyarrow  # noqa: F401
+            self.arrow = True
+        except ImportError:
+            self.arrow = False
+
+    def write(self, frame):
+        if not self.arrow:
+            frame.to_csv(self.path, mode='w' if self._rows == 0 else 'a', header=self._rows == 0, index=False)
+            self._rows += len(frame)
+            return
+
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        if self._schema is None:
+            schema = pa.Schema.from_pandas(frame, preserve_index=False)
+            # Columnas vacías en el primer lote: texto, para que los lotes siguientes encajen
+            self._schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                      for field in schema])
+            self._writer = pa_csv.CSVWriter(self.path, self._schema)
+        self._writer.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+        self._rows += len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def dataset_paths(directory, rows, seed):
+    """Rutas de los CSV de un dataset (mismo formato que CSV_FILES)"""
+    stem = f"market_{rows}_s{seed}_v{GENERATOR_VERSION}"
+    return {
+        "products_market": os.path.join(directory, f"{stem}_products.csv"),
+        "selected_analysis": os.path.join(directory, f"{stem}_analysis.csv"),
+    }
+
+
+def generate_dataset(directory, rows, seed=42, chunk_rows=250000, progress=print):
+    """
+    Escribir los dos CSV (o reutilizarlos si ya existen con los mismos parámetros)
+    Devuelve {tabla: ruta}
+    """
+    import numpy as np
+
+    paths = dataset_paths(directory, rows, seed)
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    os.makedirs(directory, exist_ok=True)
+    market, analysis = load_sources()
+    rng = np.random.default_rng(seed)
+
+    # Se escribe a un archivo temporal para no dejar un dataset a medias con el nombre final
+    partial = paths['products_market'] + '.partial'
+    writer = CsvChunkWriter(partial)
+    try:
+        for start in range(0, rows, chunk_rows):
+            writer.write(market_chunk(market, rng, start, min(chunk_rows, rows - start)))
+            if progress:
+                progress(f"  {min(start + chunk_rows, rows):,}/{rows:,} productos")
+    finally:
+        writer.close()
+    os.replace(partial, paths['products_market'])
+
+    writer = CsvChunkWriter(paths['selected_analysis'])
+    writer.write(analysis_frame(analysis, rng, rows, len(market)))
+    writer.close()
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generar CSV de mercado sintéticos")
+    parser.add_argument('--rows', type=int, default=10000, help="Productos a generar")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=os.path.join(tempfile.gettempdir(), 'proteia-bench'), help="Directorio de salida")
+    args = parser.parse_args(argv)
+
+    print(f"🧪 Generando {args.rows:,} productos sintéticos en {args.output}...")
+    paths = generate_dataset(args.output, args.rows, args.seed)
+    for table_name, path in paths.items():
+        print(f"   {table_name}: {path} ({os.path.getsize(path) / 1024 / 1024:,.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Carga masiva de DataFrames a tablas de staging
+Reemplaza df.to_sql (un round-trip por fila con pyodbc) por backends
+intercambiables que envían lotes completos al servidor:
+
+- fast_executemany: pyodbc con arreglos de parámetros y tamaños explícitos
+- multirow: INSERT ... VALUES (...), (...) respetando el límite de parámetros
+- executemany: DB-API genérico (SQLite o drivers de prueba)
+
+Con un AdaptiveBatching (adaptive_loader) el tamaño de lote lo decide la
+latencia observada y cada lote se confirma y reintenta por separado.
+"""
+
+import time
+
+from instrumentation import METRICS
+from sql_profiler import raw_connection
+
+# Límites de SQL Server para un solo INSERT ... VALUES
+SQLSERVER_MAX_PARAMS = 2100
+SQLSERVER_MAX_VALUES_ROWS = 1000
+
+# Por encima de este largo NVARCHAR(n) no aplica y se usa NVARCHAR(MAX)
+NVARCHAR_MAX_LENGTH = 4000
+
+
+def quote_identifier(name):
+    """Delimitar un identificador con corchetes (T-SQL y SQLite)"""
+    return '[' + str(name).replace(']', ']]') + ']'
+
+
+def driver_connection(connection):
+    """Obtener la conexión DB-API real detrás de un proxy del pool de SQLAlchemy"""
+    for attribute in ('driver_connection', 'dbapi_connection'):
+        inner = getattr(connection, attribute, None)
+        if inner is not None:
+            return inner
+    return connection
+
+
+def is_sqlite_connection(connection):
+    """Indicar si la conexión pertenece al módulo sqlite3 (también TSqlConnection del backend local)"""
+    import sqlite3
+
+    return isinstance(driver_connection(connection), sqlite3.Connection)
+
+
+def column_sql_type(series, sqlite=False):
+    """Tipo SQL para una columna de staging según su dtype de pandas"""
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(series):
+        return 'INTEGER' if sqlite else 'BIT'
+    if pd.api.types.is_integer_dtype(series):
+        return 'INTEGER' if sqlite else 'BIGINT'
+    if pd.api.types.is_float_dtype(series):
+        return 'REAL' if sqlite else 'FLOAT'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'TEXT' if sqlite else 'DATETIME2'
+    return 'TEXT' if sqlite else 'NVARCHAR(MAX)'
+
+
+def dataframe_rows(df):
+    """
+    Convertir un DataFrame en tuplas de tipos nativos de Python
+    NaN/NA pasan a None y las fechas a datetime, que todos los drivers aceptan
+    """
+    import pandas as pd
+
+    values = df.astype(object).where(df.notna(), None)
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            # list(): según la versión de pandas to_pydatetime devuelve un array o una
+            # Series con índice propio, que no debe realinearse con el del lote
+            converted = pd.Series(list(df[column].dt.to_pydatetime()), index=df.index, dtype=object)
+            values[column] = converted.where(df[column].notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+class ExecutemanyBackend:
+    """Backend DB-API genérico: cursor.executemany por lote"""
+
+    name = 'executemany'
+
+    def __init__(self, batch_size=10000):
+        self.batch_size = batch_size
+
+    def insert_sql(self, table_name, columns, row_count=1):
+        """Sentencia INSERT parametrizada para row_count filas"""
+        column_list = ', '.join(quote_identifier(col) for col in columns)
+        row_placeholders = '(' + ', '.join('?' for _ in columns) + ')'
+        values = ', '.join(row_placeholders for _ in range(row_count))
+        return f"INSERT INTO {quote_identifier(table_name)} ({column_list}) VALUES {values}"
+
+    def prepare_cursor(self, cursor, df):
+        """Configurar el cursor antes de enviar lotes (sin cambios por defecto)"""
+
+    def send(self, cursor, table_name, columns, rows):
+        """Enviar un lote de filas ya convertidas; devuelve los round-trips usados"""
+        cursor.executemany(self.insert_sql(table_name, columns), rows)
+        return 1
+
+    def load(self, connection, table_name, df):
+        """Insertar el DataFrame completo en lotes; devuelve (filas, lotes)"""
+        rows = dataframe_rows(df)
+        if not rows:
+            return 0, 0
+
+        cursor = connection.cursor()
+        batches = 0
+        try:
+            self.prepare_cursor(cursor, df)
+            for start in range(0, len(rows), self.batch_size):
+                batches += self.send(cursor, table_name, df.columns, rows[start:start + self.batch_size])
+        finally:
+            cursor.close()
+        return len(rows), batches
+
+
+class FastExecutemanyBackend(ExecutemanyBackend):
+    """
+    pyodbc con fast_executemany: cada lote viaja como un arreglo de
+    parámetros en un solo round-trip. Los tamaños se fijan con setinputsizes
+    para que el driver no tenga que adivinarlos (ni truncar NVARCHAR largos).
+    """
+
+    name = 'fast_executemany'
+
+    def prepare_cursor(self, cursor, df):
+        cursor.fast_executemany = True
+        if hasattr(cursor, 'setinputsizes'):
+            cursor.setinputsizes(self.input_sizes(df))
+
+    def input_sizes(self, df):
+        """Lista (tipo SQL, tamaño, decimales) por columna para setinputsizes"""
+        import pandas as pd
+
+        types = _odbc_sql_types()
+        sizes = []
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_bool_dtype(series):
+                sizes.append((types['SQL_BIT'], 0, 0))
+            elif pd.api.types.is_integer_dtype(series):
+                sizes.append((types['SQL_BIGINT'], 0, 0))
+            elif pd.api.types.is_float_dtype(series):
+                sizes.append((types['SQL_DOUBLE'], 0, 0))
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                sizes.append((types['SQL_TYPE_TIMESTAMP'], 0, 0))
+            else:
+                length = series.dropna().astype(str).str.len().max()
+                length = int(length) if pd.notna(length) and length > 0 else 1
+                # 0 indica NVARCHAR(MAX) al driver
+                sizes.append((types['SQL_WVARCHAR'], length if length <= NVARCHAR_MAX_LENGTH else 0, 0))
+        return sizes
+
+
+class MultiRowValuesBackend(ExecutemanyBackend):
+    """
+    INSERT con varias filas por sentencia: reduce round-trips con cualquier
+    driver DB-API. El tamaño de lote se limita por el máximo de parámetros
+    por sentencia de SQL Server (2100) y de filas en VALUES (1000).
+    """
+
+    name = 'multirow'
+
+    def __init__(self, batch_size=SQLSERVER_MAX_VALUES_ROWS):
+        super().__init__(batch_size)
+
+    def rows_per_statement(self, column_count):
+        """Filas por sentencia sin exceder los límites del servidor"""
+        by_params = (SQLSERVER_MAX_PARAMS - 1) // max(column_count, 1)
+        return max(1, min(self.batch_size, by_params, SQLSERVER_MAX_VALUES_ROWS))
+
+    def send(self, cursor, table_name, columns, rows):
+        """Un INSERT por cada rows_per_statement filas del lote"""
+        per_statement = self.rows_per_statement(len(columns))
+        full_sql = self.insert_sql(table_name, columns, per_statement)
+        statements = 0
+        for start in range(0, len(rows), per_statement):
+            batch = rows[start:start + per_statement]
+            sql = full_sql if len(batch) == per_statement else \
+                self.insert_sql(table_name, columns, len(batch))
+            cursor.execute(sql, [value for row in batch for value in row])
+            statements += 1
+        return statements
+
+
+def _odbc_sql_types():
+    """Constantes de tipos ODBC de pyodbc (nombres simbólicos si no está instalado)"""
+    names = ('SQL_BIT', 'SQL_BIGINT', 'SQL_DOUBLE', 'SQL_TYPE_TIMESTAMP', 'SQL_WVARCHAR')
+    try:
+        import pyodbc
+    except ImportError:
+        return {name: name for name in names}
+    return {name: getattr(pyodbc, name) for name in names}
+
+
+BULK_BACKENDS = {
+    ExecutemanyBackend.name: ExecutemanyBackend,
+    FastExecutemanyBackend.name: FastExecutemanyBackend,
+    MultiRowValuesBackend.name: MultiRowValuesBackend,
+}
+
+
+def get_backend(name, batch_size=None):
+    """Crear un backend de carga por nombre"""
+    try:
+        backend_class = BULK_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend de carga desconocido: {name} "
+                         f"(disponibles: {', '.join(sorted(BULK_BACKENDS))})")
+    return backend_class(batch_size) if batch_size else backend_class()
+
+
+class BulkLoader:
+    """Crear tablas de staging y cargarlas con el backend configurado"""
+
+    def __init__(self, backend=None, batch_size=None, adaptive=None):
+        if backend is None or isinstance(backend, str):
+            backend = get_backend(backend or FastExecutemanyBackend.name, batch_size)
+        self.backend = backend
+        # AdaptiveBatching: lotes de tamaño adaptativo con reintentos (None = lotes fijos)
+        self.adaptive = adaptive
+        self.last_stats = None
+
+    def create_table(self, connection, table_name, df, column_types=None):
+        """Recrear la tabla de staging con una columna por columna del DataFrame"""
+        sqlite = is_sqlite_connection(connection)
+        column_types = column_types or {}
+        definitions = ', '.join(
+            f"{quote_identifier(col)} {column_types.get(col) or column_sql_type(df[col], sqlite)}"
+            for col in df.columns
+        )
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {quote_identifier(table_name)}")
+            cursor.execute(f"CREATE TABLE {quote_identifier(table_name)} ({definitions})")
+        finally:
+            cursor.close()
+
+    def load(self, connection, table_name, df, create=False, column_types=None):
+        """
+        Cargar el DataFrame en table_name (creándola si create=True)
+        No hace commit: el llamador decide el alcance de la transacción
+        """
+        backend = self._backend_for(connection)
+
+        if create:
+            self.create_table(connection, table_name, df, column_types)
+
+        started = time.perf_counter()
+        rows, batches = backend.load(connection, table_name, df)
+        elapsed = time.perf_counter() - started
+
+        self._record_stats(backend, df, rows, batches, elapsed, create)
+        return rows
+
+    def _backend_for(self, connection):
+        # SQLite no implementa fast_executemany; el executemany nativo es
+        # igual de eficiente allí porque no hay red de por medio
+        if isinstance(self.backend, FastExecutemanyBackend) and is_sqlite_connection(connection):
+            return ExecutemanyBackend(self.backend.batch_size)
+        return self.backend
+
+    def _record_stats(self, backend, df, rows, batches, elapsed, create, **extra):
+        self.last_stats = dict({
+            'backend': backend.name,
+            'rows': rows,
+            'batches': batches,
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+        }, **extra)
+        if METRICS.enabled:
+            # Bytes enviados estimados por el tamaño en memoria del lote
+            METRICS.add(rows=rows, round_trips=batches + (2 if create else 0),
+                        bytes_sent=int(df.memory_usage(index=False, deep=True).sum()))
+
+    def load_with_engine(self, engine, table_name, df, create=False, column_types=None):
+        """
+        Cargar usando una conexión DB-API del engine y confirmar al terminar
+        En modo adaptativo se confirma cada lote (ver load_adaptive)
+        """
+        if self.adaptive is not None:
+            return self.load_adaptive(engine, table_name, df, create, column_types)
+        connection = raw_connection(engine)
+        try:
+            rows = self.load(connection, table_name, df, create, column_types)
+            connection.commit()
+            return rows
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def load_adaptive(self, engine, table_name, df, create=False, column_types=None):
+        """
+        Cargar con el tamaño de lote del controlador de la tabla, confirmando cada lote
+        Un error transitorio repite solo el lote en curso, por una conexión nueva.
+        Si la carga falla, los lotes ya confirmados quedan en la tabla (una carga
+        reanudada cuenta sus filas)
+        """
+        rows = dataframe_rows(df)
+        state = {'connection': None, 'cursor': None, 'backend': None, 'position': 0, 'batches': 0}
+
+        def close():
+            cursor, connection = state['cursor'], state['connection']
+            state['cursor'] = state['connection'] = None
+            try:
+                if cursor is not None:
+                    cursor.close()
+                if connection is not None:
+                    connection.rollback()
+                    connection.close()
+            except Exception:
+                # Conexión ya cortada por el servidor: no hay nada que liberar
+                pass
+
+        def connect():
+            close()
+            state['connection'] = raw_connection(engine)
+            state['backend'] = self._backend_for(state['connection'])
+            state['cursor'] = state['connection'].cursor()
+            state['backend'].prepare_cursor(state['cursor'], df)
+
+        def create_table(size):
+            self.create_table(state['connection'], table_name, df, column_types)
+            state['connection'].commit()
+            return 0
+
+        def send_batch(size):
+            batch = rows[state['position']:state['position'] + size]
+            state['batches'] += state['backend'].send(state['cursor'], table_name, df.columns, batch)
+            state['connection'].commit()
+            state['position'] += len(batch)
+            return len(batch)
+
+        started = time.perf_counter()
+        try:
+            connect()
+            if create:
+                self.adaptive.run(create_table, connect, table_name)
+            while state['position'] < len(rows):
+                self.adaptive.run(send_batch, connect, table_name)
+        finally:
+            close()
+        elapsed = time.perf_counter() - started
+
+        controller = self.adaptive.controller(table_name)
+        METRICS.annotate(batch_size=controller.batch_size)
+        self._record_stats(state['backend'], df, len(rows), state['batches'], elapsed, create,
+                           batch_size=controller.batch_size, decisions=dict(controller.stats))
+        return len(rows)
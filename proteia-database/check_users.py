@@ -3,8 +3,7 @@
 Script para verificar usuarios en la base de datos
 """
 
-import pyodbc
-from connection_config import get_direct_connection_string
+from connection_config import pooled_connection
 
 def check_users():
     print("🔍 Verificando usuarios en la base de datos...")
@@ -13,9 +12,7 @@ def check_users():
     password = input("Contraseña: ").strip()
     
     try:
-        conn_str = get_direct_connection_string(username, password)
-        
-        with pyodbc.connect(conn_str) as conn:
+        with pooled_connection(username, password) as conn:
             cursor = conn.cursor()
             
             # Verificar usuarios en config.users
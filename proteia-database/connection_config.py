@@ -2,8 +2,19 @@
 """
 Configuración de conexión específica para la base de datos Proteo
 Azure SQL Database: xworld-proteo.database.windows.net
+
+Incluye un administrador de conexiones compartido: un engine de SQLAlchemy
+por credenciales y por proceso, con pool, pre-ping y reciclaje de conexiones
+inactivas, para no pagar TLS + login de Azure SQL en cada script o etapa.
 """
 
+import threading
+import time
+from contextlib import contextmanager
+
+from instrumentation import METRICS, CountingConnection, instrument_engine
+from sql_profiler import PROFILER, ProfiledConnection, profile_engine
+
 # Configuración de la base de datos
 DATABASE_CONFIG = {
     'server': 'xworld-proteo.database.windows.net',
@@ -17,6 +28,57 @@ DATABASE_CONFIG = {
     'command_timeout': 300
 }
 
+# Configuración del pool de conexiones compartido
+POOL_CONFIG = {
+    'pool_size': 5,  # Conexiones que se mantienen abiertas
+    'max_overflow': 5,  # Conexiones extra permitidas en picos
+    'pool_timeout': 30,  # Segundos de espera por una conexión libre
+    'pool_recycle': 1800,  # Reabrir conexiones con más de 30 min de vida
+    'idle_timeout': 300,  # Reabrir conexiones inactivas más de 5 min
+    'pool_pre_ping': True  # Validar la conexión antes de entregarla
+}
+
+# Configuración de la importación de CSV
+IMPORT_CONFIG = {
+    'backend': 'azure',  # azure o sqlite (archivo local con T-SQL traducido, sin red)
+    'local_path': '~/.cache/proteia/proteia_local.db',  # Base del backend sqlite
+    'sql_dir': '.',  # Scripts .sql del despliegue (relativo a proteia-database)
+    'data_dir': '../proteia-frontend/data',  # Products_market.csv y Selected_Products_AI.csv
+    'chunk_size': 50000,  # Filas por lote en modo streaming (None = cargar todo el archivo)
+    'max_rss_mb': 1024,  # Techo de memoria residente del proceso durante la carga
+    'bulk_backend': 'fast_executemany',  # fast_executemany, multirow o executemany
+    'bulk_batch_size': 10000,  # Filas por lote enviado al servidor (tamaño inicial si es adaptativo)
+    'adaptive_batches': True,  # Ajustar el lote por latencia y reintentar lotes ante throttling
+    'batch_target_seconds': 2.0,  # Latencia objetivo por lote en modo adaptativo
+    'min_batch_size': 500,
+    'max_batch_size': 100000,
+    'max_retries': 5,  # Reintentos por lote ante errores transitorios (40501, 40613, 49918...)
+    'retry_base_seconds': 1.0,  # Espera base del backoff exponencial con jitter
+    'retry_max_seconds': 60.0,
+    'incremental_sync': False,  # Sincronizar Products por ASIN en lugar de INSERT completo
+    'delete_missing': False,  # En modo incremental, borrar productos ausentes del CSV
+    'dedupe_rule': 'latest',  # ASIN repetidos en el CSV: first, latest o highest_revenue (None = sin deduplicar)
+    'collapse_variants': False,  # Dejar un solo producto por familia de variantes (sabores y tamaños)
+    'partitioned_migration': True,  # Migrar staging -> Products por rangos de ASIN en paralelo
+    'partition_rows': 4000,  # Filas por partición (bajo las 5.000 del escalamiento a bloqueo de tabla)
+    'migration_workers': 4,  # Conexiones del pool usadas por las particiones
+    'drop_staging': True,  # Borrar las tablas temp_* después de migrar (False las deja para fix_*.py)
+    'max_workers': 4,  # Etapas del importador en paralelo (no más que el pool de conexiones)
+    'sql_transaction': 'script',  # Scripts SQL: deployment (todo o nada), script (por archivo) o batch
+    'resume': True,  # Saltar etapas sin cambios y reanudar cargas interrumpidas
+    'state_path': '~/.cache/proteia/pipeline_state.db',  # Estado del importador entre corridas
+    'parse_cache': True,  # Guardar los CSV ya parseados y tipados en disco
+    'cache_dir': '~/.cache/proteia/parse',
+    'cache_max_mb': 2048,  # Tamaño máximo del caché (desalojo LRU)
+    'neighbors_k': 20,  # Vecinos guardados por producto en ProductNeighbors
+    'neighbors_dir': '~/.cache/proteia/neighbors',  # Índice local (memory-map); None lo desactiva
+    'metrics_dir': '~/.cache/proteia/metrics',  # spans.jsonl y proteia_<comando>.prom; None las desactiva
+    'sql_profile': True,  # Histograma por sentencia SQL y reporte de las más costosas al final
+    'sql_profile_top': 10,  # Sentencias en el reporte
+    'slow_query_ms': 1000,  # Umbral del log de sentencias lentas (None lo desactiva)
+    'slow_query_log': '~/.cache/proteia/metrics/slow_queries.jsonl'
+}
+
 def get_connection_string(username, password):
     """
     Generar cadena de conexión para Azure SQL Database - SQLAlchemy
@@ -51,6 +113,136 @@ def get_direct_connection_string(username, password):
         f"Connection Timeout={DATABASE_CONFIG['connection_timeout']};"
     )
 
+class PoolStats:
+    """Contadores de uso del pool (aciertos, fallos y reciclajes)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.hits = 0  # Conexión reutilizada del pool
+        self.misses = 0  # Conexión nueva (TLS + login)
+        self.idle_recycled = 0
+        self.invalidated = 0
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            hit_rate = self.hits / self.checkouts if self.checkouts else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': hit_rate,
+                'idle_recycled': self.idle_recycled,
+                'invalidated': self.invalidated,
+            }
+
+
+_engines = {}
+_pool_stats = {}
+_engines_lock = threading.Lock()
+
+
+def _attach_pool_events(engine, stats, idle_timeout):
+    """Registrar eventos del pool para estadísticas y reciclaje por inactividad"""
+    from sqlalchemy import event, exc
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info['proteia_fresh'] = True
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last_checkin = connection_record.info.pop('proteia_last_checkin', None)
+        if idle_timeout and last_checkin and time.monotonic() - last_checkin > idle_timeout:
+            # El pool descarta la conexión y abre otra al recibir DisconnectionError
+            stats.increment('idle_recycled')
+            raise exc.DisconnectionError("Conexión inactiva reciclada")
+
+        stats.increment('checkouts')
+        if connection_record.info.pop('proteia_fresh', False):
+            stats.increment('misses')
+        else:
+            stats.increment('hits')
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info['proteia_last_checkin'] = time.monotonic()
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment('invalidated')
+
+
+def get_engine(username, password, **pool_overrides):
+    """
+    Engine de SQLAlchemy compartido por proceso para estas credenciales
+    Las opciones de POOL_CONFIG se pueden ajustar solo en la primera llamada
+    """
+    key = (username, password)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            return engine
+
+        from sqlalchemy import create_engine
+
+        options = dict(POOL_CONFIG, **pool_overrides)
+        idle_timeout = options.pop('idle_timeout')
+        engine = create_engine(get_connection_string(username, password), **options)
+        stats = PoolStats()
+        _attach_pool_events(engine, stats, idle_timeout)
+        instrument_engine(engine)
+        profile_engine(engine)
+
+        _engines[key] = engine
+        _pool_stats[engine] = stats
+        return engine
+
+
+@contextmanager
+def pooled_connection(username, password):
+    """
+    Conexión DB-API (pyodbc) tomada del pool compartido
+    Igual que `with pyodbc.connect(...)`: confirma al salir sin errores y
+    revierte si hay excepción; además devuelve la conexión al pool.
+    Con las métricas o el perfilador habilitados, cada execute cuenta como un
+    round-trip y queda en el perfil SQL.
+    """
+    connection = get_engine(username, password).raw_connection()
+    wrapped = CountingConnection(connection) if METRICS.enabled else connection
+    wrapped = ProfiledConnection(wrapped) if PROFILER.enabled else wrapped
+    try:
+        yield wrapped
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def get_pool_stats(engine=None):
+    """Estadísticas del pool de un engine o de todos los engines del proceso"""
+    if engine is not None:
+        stats = _pool_stats.get(engine)
+        return stats.as_dict() if stats else None
+    with _engines_lock:
+        return {username: _pool_stats[engine].as_dict() for (username, _), engine in _engines.items()}
+
+
+def dispose_engines():
+    """Cerrar todas las conexiones del pool (fin del proceso o pruebas)"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _pool_stats.clear()
+
+
 # Configuración específica para Azure SQL
 AZURE_SQL_NOTES = """
 NOTAS IMPORTANTES para Azure SQL Database:
@@ -66,5 +258,3 @@ Para configurar el firewall desde Azure Portal:
 - Configuración > Firewalls y redes virtuales
 - Agregar tu IP actual o rango de IPs
 """
-
-print(AZURE_SQL_NOTES)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Lectura de CSV por lotes para importaciones grandes
+Procesa el archivo como un pipeline de generadores (leer -> limpiar -> cargar)
+para que la memoria se mantenga acotada sin importar el tamaño del archivo
+"""
+
+import gc
+import os
+import sys
+import time
+
+
+class MemoryLimitError(MemoryError):
+    """El proceso superó el techo de memoria configurado para la importación"""
+
+
+def clean_column_name(column):
+    """Normalizar un nombre de columna del CSV para la tabla temporal"""
+    return column.replace(' ', '_').replace('#', 'Num').replace('.', '_')
+
+
+def current_rss_mb():
+    """
+    Memoria residente actual del proceso en MB
+    Usa /proc en Linux; en otros sistemas cae al pico reportado por resource
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reporta bytes, Linux reporta KB
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def read_csv_chunks(csv_path, chunk_size, max_rss_mb=None, min_chunk_size=1000,
+                    encoding='utf-8', **read_csv_kwargs):
+    """
+    Generador de lotes del CSV con tamaño fijo
+
+    Si se define max_rss_mb, antes de leer cada lote se revisa la memoria
+    residente: al acercarse al techo (80%) el tamaño del lote se reduce a la
+    mitad, y si aun con el lote mínimo se supera el techo se lanza
+    MemoryLimitError en lugar de dejar crecer el proceso.
+    """
+    import pandas as pd
+
+    # Todo se lee como texto: los dtypes no cambian entre lotes y las tablas
+    # tipadas se convierten en el cliente (type_coercion.prepare_products_market)
+    read_csv_kwargs.setdefault('dtype', str)
+
+    size = chunk_size
+    with pd.read_csv(csv_path, encoding=encoding, chunksize=chunk_size,
+                     **read_csv_kwargs) as reader:
+        while True:
+            if max_rss_mb:
+                size = _fit_chunk_size(size, max_rss_mb, min_chunk_size)
+            try:
+                chunk = reader.get_chunk(size)
+            except StopIteration:
+                return
+            if chunk.empty:
+                return
+            yield chunk
+
+
+def _fit_chunk_size(size, max_rss_mb, min_chunk_size):
+    """Ajustar el tamaño del siguiente lote según la memoria disponible"""
+    rss = current_rss_mb()
+    if rss is None:
+        return size
+
+    if rss > max_rss_mb * 0.8:
+        gc.collect()
+        rss = current_rss_mb()
+
+    if rss > max_rss_mb:
+        if size <= min_chunk_size:
+            raise MemoryLimitError(
+                f"RSS {rss:.0f} MB supera el techo de {max_rss_mb} MB"
+            )
+        return max(min_chunk_size, size // 2)
+
+    if rss > max_rss_mb * 0.8:
+        return max(min_chunk_size, size // 2)
+
+    return size
+
+
+def clean_chunks(chunks):
+    """Limpiar los nombres de columna de cada lote"""
+    for chunk in chunks:
+        chunk.columns = [clean_column_name(col) for col in chunk.columns]
+        yield chunk
+
+
+def skip_rows(chunks, rows):
+    """Descartar las primeras filas de la secuencia de lotes (reanudar una carga)"""
+    for chunk in chunks:
+        if rows >= len(chunk):
+            rows -= len(chunk)
+            continue
+        if rows:
+            chunk = chunk.iloc[rows:].reset_index(drop=True)
+            rows = 0
+        yield chunk
+
+
+def load_chunks(chunks, load_chunk, progress=print):
+    """
+    Cargar cada lote con load_chunk(chunk, index) y reportar filas/s por lote
+    Devuelve el total de filas cargadas
+    """
+    total_rows = 0
+    started = time.perf_counter()
+
+    for index, chunk in enumerate(chunks):
+        chunk_started = time.perf_counter()
+        load_chunk(chunk, index)
+        elapsed = time.perf_counter() - chunk_started
+
+        rows = len(chunk)
+        total_rows += rows
+        if progress:
+            rate = rows / elapsed if elapsed > 0 else float('inf')
+            rss = current_rss_mb()
+            rss_text = f" · RSS {rss:,.0f} MB" if rss is not None else ""
+            progress(f"  Lote {index + 1}: {rows:,} filas en {elapsed:.2f}s "
+                     f"({rate:,.0f} filas/s){rss_text}")
+
+        # Liberar el lote antes de leer el siguiente
+        del chunk
+
+    if progress:
+        elapsed = time.perf_counter() - started
+        rate = total_rows / elapsed if elapsed > 0 else float('inf')
+        progress(f"  Total: {total_rows:,} filas en {elapsed:.2f}s ({rate:,.0f} filas/s)")
+
+    return total_rows
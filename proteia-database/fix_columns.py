@@ -3,8 +3,7 @@
 Script para verificar columnas y corregir la migración
 """
 
-import pyodbc
-from connection_config import get_direct_connection_string
+from connection_config import pooled_connection
 
 def fix_column_migration():
     print("🔍 Verificando columnas y corrigiendo migración...")
@@ -13,9 +12,7 @@ def fix_column_migration():
     password = input("Contraseña: ").strip()
     
     try:
-        conn_str = get_direct_connection_string(username, password)
-        
-        with pyodbc.connect(conn_str) as conn:
+        with pooled_connection(username, password) as conn:
             cursor = conn.cursor()
             
             # Verificar columnas de temp_products_market
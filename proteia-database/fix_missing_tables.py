@@ -3,9 +3,8 @@
 Script para crear las tablas faltantes y migrar los datos correctamente
 """
 
-import pyodbc
-import pandas as pd
-from connection_config import get_direct_connection_string
+from connection_config import pooled_connection
+from verification import table_counts
 
 def fix_database():
     print("🔧 Reparando base de datos Proteia...")
@@ -14,9 +13,7 @@ def fix_database():
     password = input("Contraseña: ").strip()
     
     try:
-        conn_str = get_direct_connection_string(username, password)
-        
-        with pyodbc.connect(conn_str) as conn:
+        with pooled_connection(username, password) as conn:
             cursor = conn.cursor()
             
             print("\n📝 Creando tablas faltantes...")
@@ -95,9 +92,9 @@ def fix_database():
             # Migrar datos desde tablas temporales
             print("\n🔄 Migrando datos desde tablas temporales...")
             
-            # Verificar si hay datos en temp_products_market
-            cursor.execute("SELECT COUNT(*) FROM temp_products_market")
-            temp_count = cursor.fetchone()[0]
+            # Filas de las tablas temporales desde el catálogo (sin escanearlas)
+            counts, _ = table_counts(cursor)
+            temp_count = counts.get(('dbo', 'temp_products_market'), 0)
             print(f"📊 Registros en temp_products_market: {temp_count}")
             
             if temp_count > 0:
@@ -154,8 +151,7 @@ def fix_database():
                 print(f"✅ Migrados {migrated} productos")
                 
                 # Migrar análisis si existe temp_selected_analysis
-                cursor.execute("SELECT COUNT(*) FROM temp_selected_analysis")
-                analysis_count = cursor.fetchone()[0]
+                analysis_count = counts.get(('dbo', 'temp_selected_analysis'), 0)
                 
                 if analysis_count > 0:
                     migrate_analysis_sql = """
@@ -240,10 +236,13 @@ def fix_database():
                 ('Brands', 'dbo', 'Brands')
             ]
             
+            counts, _ = table_counts(cursor)
             for display_name, schema, table in tables_to_check:
-                cursor.execute(f"SELECT COUNT(*) FROM [{schema}].[{table}]")
-                count = cursor.fetchone()[0]
-                print(f"   📊 {display_name}: {count:,} registros")
+                count = counts.get((schema, table))
+                if count is None:
+                    print(f"   ❌ {display_name}: No existe")
+                else:
+                    print(f"   📊 {display_name}: {count:,} registros")
             
             print("\n🎉 ¡Base de datos reparada exitosamente!")
             return True
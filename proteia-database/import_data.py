@@ -6,36 +6,179 @@ Requiere: pip install pyodbc pandas sqlalchemy
 """
 
 import pandas as pd
-import pyodbc
 import os
 import sys
-from sqlalchemy import create_engine, text
-import urllib.parse
-from connection_config import DATABASE_CONFIG, get_connection_string, get_direct_connection_string
+import threading
+import time
+from sqlalchemy import inspect, text
+from adaptive_loader import AdaptiveBatching, RetryPolicy
+from backends import AzureSqlBackend, create_backend
+from bulk_loader import BulkLoader
+from connection_config import DATABASE_CONFIG, IMPORT_CONFIG, get_direct_connection_string, get_pool_stats
+from incremental_sync import IncrementalProductSync
+from market_summary import MarketSummary
+from nutrition_extraction import NutritionLoader, extract_nutrition
+from parse_cache import PARSER_VERSION, ParseCache, file_digest
+from partitioned_migration import PartitionedMigration
+from pipeline_state import PipelineState, input_hash
+from product_dedupe import ProductDeduplicator
+from protein_metrics import ProteinMetrics
+from similarity_scoring import SimilarityScorer
+from staging_schema import StagingSchema, analysis_column_types
+from sql_script_runner import SqlScriptRunner
+from product_neighbors import ProductNeighborsJob
+from pipeline_scheduler import STATUS_OK, StageScheduler
+from instrumentation import METRICS
+from csv_streaming import MemoryLimitError, clean_chunks, clean_column_name, load_chunks, read_csv_chunks, skip_rows
+from market_schema import PRODUCT_COLUMNS, PRODUCT_KEY, product_column_types
+from type_coercion import prepare_products_market
+from verification import DatabaseVerifier
+
+# Tablas de staging tipadas: función de conversión por lote y tipos SQL de las columnas
+# que terminan en una tabla final (staging_schema ajusta el ancho del texto a los datos)
+STAGING_SCHEMAS = {
+    "products_market": (prepare_products_market, product_column_types()),
+    "selected_analysis": (None, analysis_column_types())
+}
+
+# Tablas de staging deduplicadas por ASIN antes de cargar (product_dedupe)
+DEDUPE_TABLES = ("products_market",)
+
+# Análisis del dashboard: procedimientos de 05_market_summary.sql (en SQLite los ejecuta sqlite_dialect)
+ANALYSIS_PROCEDURES = {
+    "market": "sp_GetMarketAnalysis",
+    "brand": "sp_GetBrandAnalysis",
+    "category": "sp_GetCategoryAnalysis",
+    "protein": "sp_GetProteinValueRanking"
+}
+
+# Rutas de archivos: directorios sql_dir y data_dir de IMPORT_CONFIG (o --sql-dir y
+# --data-dir de proteia_db.py); los relativos se toman desde proteia-database
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_NAMES = {
+    "products_market": "Products_market.csv",
+    "selected_analysis": "Selected_Products_AI.csv"
+}
+# Scripts que se pueden repetir sobre una base existente (IF OBJECT_ID, CREATE OR ALTER):
+# se despliegan en su propia etapa, así un fallo de los scripts de creación no los revierte
+SUMMARY_SCRIPTS = ("05_market_summary.sql",)
+SQL_SCRIPTS = (
+    "00_setup_config_users.sql",
+    "01_create_tables.sql",
+    "02_initial_data.sql",
+    "04_user_integration.sql",
+    "05_market_summary.sql"
+)
+
+def project_path(path):
+    """Ruta absoluta; una relativa se resuelve desde proteia-database"""
+    return os.path.normpath(os.path.join(BASE_DIR, os.path.expanduser(path)))
+
+def sql_file_paths():
+    """Scripts SQL en orden de despliegue dentro de IMPORT_CONFIG['sql_dir']"""
+    sql_dir = project_path(IMPORT_CONFIG['sql_dir'])
+    return [os.path.join(sql_dir, name) for name in SQL_SCRIPTS]
+
+def csv_file_paths():
+    """CSV de cada tabla de staging dentro de IMPORT_CONFIG['data_dir']"""
+    data_dir = project_path(IMPORT_CONFIG['data_dir'])
+    return {table_name: os.path.join(data_dir, name) for table_name, name in CSV_NAMES.items()}
+
+def staging_frames(csv_path, table_name, parse_cache=None, chunk_size=None, max_rss_mb=None):
+    """
+    Lotes limpios y tipados del CSV listos para staging
+    Sin chunk_size se devuelve un solo lote con el archivo completo. Con caché
+    de parseo, un CSV sin cambios se lee ya tipado del disco.
+    """
+    prepare, column_types = STAGING_SCHEMAS.get(table_name, (None, None))
+    
+    def parse():
+        METRICS.add(bytes_read=os.path.getsize(csv_path))
+        if chunk_size:
+            chunks = clean_chunks(read_csv_chunks(csv_path, chunk_size, max_rss_mb=max_rss_mb))
+        else:
+            df = pd.read_csv(csv_path, encoding='utf-8')
+            df.columns = [clean_column_name(col) for col in df.columns]
+            chunks = [df]
+        if prepare:
+            chunks = (prepare(chunk) for chunk in chunks)
+        return chunks
+    
+    if parse_cache is None:
+        return parse()
+    
+    # El modo (streaming o no) cambia los dtypes de las tablas sin esquema tipado
+    key = parse_cache.key(csv_path, table_name, schema=(column_types, bool(chunk_size)))
+    return parse_cache.frames(key, parse)
+
+def dedupe_settings(table_name):
+    """(regla, colapsar variantes) que se aplican a la tabla, o None si no se deduplica"""
+    if table_name not in DEDUPE_TABLES or not IMPORT_CONFIG['dedupe_rule']:
+        return None
+    return IMPORT_CONFIG['dedupe_rule'], IMPORT_CONFIG['collapse_variants']
+
+def deduplicated_frames(csv_path, table_name, parse_cache=None, chunk_size=None, max_rss_mb=None):
+    """
+    Lotes de staging sin ASIN repetidos: (lotes, ProductDeduplicator o None)
+    El plan recorre los lotes una vez antes de devolverlos; con caché de parseo
+    la segunda pasada ya no parsea el CSV
+    """
+    settings = dedupe_settings(table_name)
+    if settings is None:
+        return staging_frames(csv_path, table_name, parse_cache, chunk_size, max_rss_mb), None
+    dedupe = ProductDeduplicator(*settings)
+    frames = dedupe.frames(lambda: staging_frames(csv_path, table_name, parse_cache, chunk_size, max_rss_mb))
+    return frames, dedupe
+
+def _indent(report):
+    """Sangría de los reportes de varias líneas bajo el paso que los produjo"""
+    return '\n'.join(f"  {line}" for line in report.splitlines())
+
+def print_cache_statistics(parse_cache):
+    """Mostrar aciertos y fallos del caché de parseo"""
+    if parse_cache is None:
+        return
+    stats = parse_cache.stats
+    print(f"🗃️  Caché de parseo ({parse_cache.format}): {stats['hits']} aciertos, "
+          f"{stats['misses']} fallos, {stats['evictions']} desalojos, "
+          f"{stats['bytes_read'] / 1024 / 1024:,.1f} MB leídos, "
+          f"{stats['bytes_written'] / 1024 / 1024:,.1f} MB escritos")
 
 class ProteiaDataImporter:
-    def __init__(self, server, database, username=None, password=None):
+    def __init__(self, server, database, username=None, password=None, backend=None):
         self.server = server
         self.database = database
         self.username = username
         self.password = password
-        self.connection_string = self._build_connection_string()
+        # Azure SQL salvo que se indique otro backend (p. ej. SQLite local)
+        self.backend = backend or AzureSqlBackend(username, password)
+        self.connection_string = self.backend.connection_string
         self.engine = None
+        adaptive = None
+        if IMPORT_CONFIG['adaptive_batches']:
+            adaptive = AdaptiveBatching(
+                IMPORT_CONFIG['bulk_batch_size'], IMPORT_CONFIG['min_batch_size'], IMPORT_CONFIG['max_batch_size'],
+                IMPORT_CONFIG['batch_target_seconds'], IMPORT_CONFIG['max_retries'],
+                IMPORT_CONFIG['retry_base_seconds'], IMPORT_CONFIG['retry_max_seconds']
+            )
+        self.bulk_loader = BulkLoader(IMPORT_CONFIG['bulk_backend'], IMPORT_CONFIG['bulk_batch_size'], adaptive)
+        self.parse_cache = None
+        if IMPORT_CONFIG['parse_cache']:
+            self.parse_cache = ParseCache(IMPORT_CONFIG['cache_dir'], IMPORT_CONFIG['cache_max_mb'] * 1024 * 1024)
+        # Productos tocados por las migraciones, para actualizar MarketSummary
+        self.summary_changes = set()
+        self.summary_full_refresh = False
+        self._summary_lock = threading.Lock()
+        # Etapas completadas y cargas en curso entre corridas (None = sin reanudación)
+        self.pipeline_state = None
         
-    def _build_connection_string(self):
-        """Construir cadena de conexión para Azure SQL Database"""
-        if self.username and self.password:
-            return get_connection_string(self.username, self.password)
-        else:
-            raise ValueError("Azure SQL Database requiere autenticación SQL Server (usuario y contraseña)")
-    
     def test_connection(self):
-        """Probar conexión a la base de datos"""
+        """Probar conexión a la base de datos (engine compartido del pool)"""
         try:
-            self.engine = create_engine(self.connection_string)
+            self.engine = self.backend.create_engine()
             with self.engine.connect() as conn:
                 result = conn.execute(text("SELECT 1"))
-                print("✓ Conexión exitosa a SQL Server")
+                print(f"✓ Conexión exitosa a {self.backend.label}")
                 return True
         except Exception as e:
             print(f"✗ Error de conexión: {e}")
@@ -43,51 +186,68 @@ class ProteiaDataImporter:
     
     def execute_sql_file(self, file_path):
         """Ejecutar un archivo SQL"""
-        if not os.path.exists(file_path):
-            print(f"⚠️  Archivo no encontrado: {file_path}")
+        return self.deploy_sql_files([file_path], transaction='script')
+    
+    def deploy_sql_files(self, file_paths, transaction=None):
+        """
+        Ejecutar varios archivos SQL en orden sobre una conexión del pool
+        Con transaction='script' (predeterminado en IMPORT_CONFIG) cada archivo
+        se confirma al terminar; con 'deployment' un lote fallido revierte todos
+        """
+        paths = []
+        for file_path in file_paths:
+            if os.path.exists(file_path):
+                paths.append(file_path)
+            else:
+                print(f"⚠️  Archivo no encontrado: {file_path}")
+        if not paths:
             return False
-            
+        
+        runner = SqlScriptRunner(self.engine, transaction or IMPORT_CONFIG['sql_transaction'])
+        started = time.perf_counter()
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                sql_content = file.read()
-            
-            # Dividir por GO statements
-            sql_batches = [batch.strip() for batch in sql_content.split('GO') if batch.strip()]
-            
-            with self.engine.connect() as conn:
-                for i, batch in enumerate(sql_batches):
-                    if batch:
-                        print(f"  Ejecutando lote {i+1}/{len(sql_batches)}...")
-                        conn.execute(text(batch))
-                        conn.commit()
-            
-            print(f"✓ Ejecutado: {os.path.basename(file_path)}")
-            return True
-            
+            runner.run(paths)
+            print(f"✓ Ejecutado: {', '.join(os.path.basename(path) for path in paths)}")
+            return len(paths) == len(file_paths)
         except Exception as e:
-            print(f"✗ Error ejecutando {file_path}: {e}")
+            print(f"✗ Error ejecutando scripts SQL: {e}")
+            if runner.transaction != 'batch':
+                print("  Transacción revertida")
             return False
+        finally:
+            print(runner.report(time.perf_counter() - started))
     
-    def import_csv_to_temp_table(self, csv_path, table_name):
-        """Importar CSV a tabla temporal"""
+    def import_csv_to_temp_table(self, csv_path, table_name, chunk_size=None, max_rss_mb=None):
+        """
+        Importar CSV a tabla temporal
+        Con chunk_size se usa el modo streaming: el archivo se lee, limpia y
+        carga por lotes para que la memoria no crezca con el tamaño del CSV
+        """
         if not os.path.exists(csv_path):
             print(f"⚠️  CSV no encontrado: {csv_path}")
             return False
         
+        if chunk_size:
+            return self._import_csv_streaming(csv_path, table_name, chunk_size, max_rss_mb)
+        
         try:
             print(f"📊 Importando {os.path.basename(csv_path)}...")
             
-            # Leer CSV
-            df = pd.read_csv(csv_path, encoding='utf-8')
+            # Leer, limpiar y tipar el CSV (o tomarlo del caché de parseo)
+            frames = list(self.staging_frames(csv_path, table_name))
+            df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
             print(f"  Filas encontradas: {len(df)}")
             
-            # Limpiar nombres de columnas
-            df.columns = [col.replace(' ', '_').replace('#', 'Num').replace('.', '_') 
-                         for col in df.columns]
-            
             # Importar a tabla temporal
             temp_table_name = f"temp_{table_name}"
-            df.to_sql(temp_table_name, self.engine, if_exists='replace', index=False)
+            _, column_types = STAGING_SCHEMAS.get(table_name, (None, None))
+            schema = StagingSchema(temp_table_name, column_types)
+            schema.derive(df)
+            print(_indent(schema.report()))
+            self.bulk_loader.load_with_engine(self.engine, temp_table_name, df, create=True,
+                                              column_types=schema.column_types)
+            self._print_load_stats()
+            self._print_batch_decisions(temp_table_name)
             
             print(f"✓ Importado a tabla temporal: {temp_table_name}")
             return True
@@ -96,121 +256,579 @@ class ProteiaDataImporter:
             print(f"✗ Error importando CSV: {e}")
             return False
     
+    def _import_csv_streaming(self, csv_path, table_name, chunk_size, max_rss_mb=None):
+        """Importar CSV a tabla temporal por lotes de tamaño fijo"""
+        temp_table_name = f"temp_{table_name}"
+        _, column_types = STAGING_SCHEMAS.get(table_name, (None, None))
+        
+        state = self.pipeline_state
+        # La deduplicación cambia qué filas llegan a staging: otra regla no reanuda la carga anterior
+        load_hash = (input_hash(file_digest(csv_path), table_name, PARSER_VERSION, dedupe_settings(table_name))
+                     if state else None)
+        progress = {'rows': self._resume_rows(temp_table_name, load_hash), 'chunks': 0}
+        resumed_rows = progress['rows']
+        schema = StagingSchema(temp_table_name, column_types)
+        
+        def load_chunk(chunk, index):
+            # El primer lote recrea la tabla, los siguientes (y los de una carga reanudada) se agregan
+            create = index == 0 and not resumed_rows
+            with METRICS.span('chunk', index=index, table=temp_table_name):
+                if create:
+                    # El primer lote es la muestra que fija los anchos de la staging
+                    schema.derive(chunk)
+                    print(_indent(schema.report()))
+                else:
+                    self._widen_staging(schema, chunk)
+                self.bulk_loader.load_with_engine(self.engine, temp_table_name, chunk, create=create,
+                                                  column_types=schema.column_types)
+            # Cada lote ya está confirmado: anotar hasta dónde llegó la carga
+            progress['rows'] += len(chunk)
+            progress['chunks'] += 1
+            if state:
+                state.record_load(temp_table_name, load_hash, progress['rows'], progress['chunks'])
+        
+        try:
+            limit_text = f", techo {max_rss_mb} MB" if max_rss_mb else ""
+            print(f"📊 Importando {os.path.basename(csv_path)} por lotes de {chunk_size:,} filas{limit_text}...")
+            
+            chunks = self.staging_frames(csv_path, table_name, chunk_size, max_rss_mb)
+            if resumed_rows:
+                print(f"  ↷ Reanudando después de {resumed_rows:,} filas ya cargadas")
+                schema.observe(self.engine)
+                chunks = skip_rows(chunks, resumed_rows)
+            load_chunks(chunks, load_chunk)
+            if state:
+                state.finish_load(temp_table_name)
+            self._print_batch_decisions(temp_table_name)
+            
+            print(f"✓ Importado a tabla temporal: {temp_table_name} ({progress['rows']:,} filas)")
+            return True
+            
+        except MemoryLimitError as e:
+            print(f"✗ Importación detenida por límite de memoria: {e}")
+            return False
+        except Exception as e:
+            print(f"✗ Error importando CSV: {e}")
+            return False
+    
+    def _widen_staging(self, schema, chunk):
+        """Ensanchar las columnas de texto que el lote desborda antes de cargarlo"""
+        changes = schema.widen(chunk)
+        schema.alter(self.engine, changes)
+        for column, sql_type in changes.items():
+            print(f"  ↔ {schema.table_name}.{column} ensanchada a {sql_type}")
+    
+    def _resume_rows(self, temp_table_name, load_hash):
+        """
+        Filas confirmadas de una carga interrumpida del mismo CSV (0 si hay que empezar)
+        Se cuenta la tabla: los lotes se agregan en orden y cada uno se confirma completo
+        """
+        if load_hash is None or self.pipeline_state.load_progress(temp_table_name, load_hash) is None:
+            return 0
+        try:
+            return self.table_rows(temp_table_name)
+        except Exception:
+            return 0
+    
+    def table_rows(self, table_name):
+        """Filas de una tabla (falla si no existe)"""
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+    
+    def staging_rows(self, table_name):
+        """
+        Filas de la staging de una tabla; 0 si ya no existe
+        drop_staging la borra después de migrar y registra su etapa con 0 filas,
+        así una corrida sin cambios en el CSV no la vuelve a cargar
+        """
+        with self.engine.connect() as conn:
+            if not inspect(conn).has_table(f"temp_{table_name}"):
+                return 0
+        return self.table_rows(f"temp_{table_name}")
+    
+    def ensure_staging(self, csv_path, table_name):
+        """
+        Recargar la staging que borró una limpieza anterior
+        Una migración puede repetirse (p. ej. cambió el DDL) aunque el CSV no cambió
+        y su etapa csv:<tabla> se saltó sin volver a cargarla
+        """
+        with self.engine.connect() as conn:
+            if inspect(conn).has_table(f"temp_{table_name}"):
+                return True
+        print(f"  ↻ temp_{table_name} se borró en una corrida anterior; recargando")
+        return self.import_csv_to_temp_table(csv_path, table_name,
+                                             chunk_size=IMPORT_CONFIG['chunk_size'],
+                                             max_rss_mb=IMPORT_CONFIG['max_rss_mb'])
+    
+    def drop_staging_tables(self, table_names):
+        """Borrar las tablas de staging ya migradas (con sus índices)"""
+        try:
+            with self.engine.connect() as conn:
+                for table_name in table_names:
+                    conn.execute(text(f"DROP TABLE IF EXISTS temp_{table_name}"))
+                conn.commit()
+            print(f"🧽 Staging borrada: {', '.join(f'temp_{name}' for name in table_names)}")
+            return True
+        except Exception as e:
+            print(f"✗ Error borrando staging: {e}")
+            return False
+    
+    def staging_frames(self, csv_path, table_name, chunk_size=None, max_rss_mb=None):
+        """Lotes tipados (y deduplicados) del CSV, a través del caché de parseo del importador"""
+        frames, dedupe = deduplicated_frames(csv_path, table_name, self.parse_cache, chunk_size, max_rss_mb)
+        if dedupe is not None:
+            print(_indent(dedupe.report()))
+        return frames
+    
+    def show_cache_statistics(self):
+        """Mostrar aciertos y fallos del caché de parseo"""
+        print_cache_statistics(self.parse_cache)
+    
+    def _print_load_stats(self):
+        """Mostrar el rendimiento de la última carga masiva"""
+        stats = self.bulk_loader.last_stats
+        if stats:
+            print(f"  Carga {stats['backend']}: {stats['rows']:,} filas en {stats['batches']} lotes "
+                  f"({stats['rows_per_second']:,.0f} filas/s)")
+    
+    def _print_batch_decisions(self, table_name):
+        """Mostrar el tamaño de lote aprendido y los reintentos de una tabla (modo adaptativo)"""
+        adaptive = self.bulk_loader.adaptive
+        if adaptive is None or table_name not in adaptive.controllers:
+            return
+        controller = adaptive.controllers[table_name]
+        stats = controller.stats
+        print(f"  Lote adaptativo: {controller.batch_size:,} filas ({stats['grow']} aumentos, "
+              f"{stats['shrink']} reducciones, {stats['throttle']} throttling, "
+              f"{stats['transient']} errores transitorios, {controller.rows_per_second:,.0f} filas/s)")
+    
     def migrate_products_data(self):
-        """Migrar datos de productos desde tabla temporal"""
-        migration_sql = """
+        """
+        Migrar datos de productos desde tabla temporal
+        La staging ya viene tipada y con claves ASIN resueltas en el cliente,
+        así que la migración es una copia directa sin conversiones
+        """
+        if IMPORT_CONFIG['partitioned_migration']:
+            return self._migrate_products_partitioned()
+        columns = ", ".join(f"[{product_col}]" for _, product_col, _ in PRODUCT_COLUMNS)
+        migration_sql = f"""
         -- Migrar productos principales
-        INSERT INTO Products (
-            ASIN, ProductName, Brand, Category, Price, AvgPricePerMonth, 
-            NetMargin, LQS, ReviewCount, Rating, MinPrice, Net, FBAFees,
-            ScoreForPL, ScoreForReselling, NumSellers, Rank, AvgBSRPerMonth,
-            Inventory, EstSales, EstRevenue, PageSalesShare, PageRevShare,
-            RevPerReview, ProfitPotential, Weight, SellerType, Variants,
-            URL, SearchCount, SearchTerm, HasAPlus
-        )
-        SELECT 
-            ISNULL(ASIN, 'UNK-' + CAST(ROW_NUMBER() OVER (ORDER BY Product_Name) AS NVARCHAR(10))),
-            Product_Name,
-            Brand,
-            Category,
-            CAST(Price AS DECIMAL(10,2)),
-            CAST(Avg__Price_per_Mo AS DECIMAL(10,2)),
-            CAST(Net_Margin AS DECIMAL(5,2)),
-            CAST(LQS AS INT),
-            CAST(Num_of_Reviews AS INT),
-            CAST(Rating AS DECIMAL(3,2)),
-            CAST(Min__Price AS DECIMAL(10,2)),
-            CAST(Net AS DECIMAL(10,2)),
-            CAST(FBA_Fees AS DECIMAL(10,2)),
-            CAST(Score_for_PL AS INT),
-            CAST(Score_for_Reselling AS INT),
-            CAST(Num_of_Sellers AS INT),
-            CAST(Rank AS INT),
-            CAST(Avg__BSR_per_Mo AS INT),
-            CAST(Inventory AS INT),
-            CAST(Est__Sales AS INT),
-            CAST(Est__Revenue AS DECIMAL(15,2)),
-            CAST(Page_Sales_Share AS DECIMAL(5,4)),
-            CAST(Page_Rev__Share AS DECIMAL(5,4)),
-            CAST(Rev__per_Review AS DECIMAL(10,2)),
-            CAST(Profit_Potential AS DECIMAL(15,2)),
-            CAST(Weight AS DECIMAL(8,3)),
-            Seller_Type,
-            CAST(Variants AS INT),
-            URL,
-            CAST(Cantidad_de_Búsquedas AS INT),
-            Término_de_Búsqueda,
-            CASE WHEN UPPER(APlus) = 'TRUE' THEN 1 ELSE 0 END
+        INSERT INTO Products ({columns})
+        SELECT {columns}
         FROM temp_products_market
-        WHERE Product_Name IS NOT NULL
+        WHERE ProductName IS NOT NULL
         """
         
         try:
             with self.engine.connect() as conn:
                 result = conn.execute(text(migration_sql))
                 conn.commit()
+                METRICS.add(rows=result.rowcount)
                 print(f"✓ Migrados {result.rowcount} productos")
-                return True
+            self.record_summary_changes(full=True)
+            return True
         except Exception as e:
             print(f"✗ Error migrando productos: {e}")
             return False
     
-    def migrate_analysis_data(self):
-        """Migrar datos de análisis desde tabla temporal"""
-        migration_sql = """
-        -- Migrar análisis de productos
-        INSERT INTO ProductAnalysis (
-            ProductId, ValueProposition, Ingredients, KeyLabels,
-            PrimaryColors, SecondaryColors, IntendedSegment, AdditionalNotes
+    def _migrate_products_partitioned(self):
+        """Migrar productos por rangos de ASIN en paralelo, una transacción corta por partición"""
+        migration = PartitionedMigration(
+            self.engine, "temp_products_market", "Products",
+            [product_col for _, product_col, _ in PRODUCT_COLUMNS], PRODUCT_KEY,
+            where="s.ProductName IS NOT NULL",
+            partition_rows=IMPORT_CONFIG['partition_rows'],
+            max_workers=IMPORT_CONFIG['migration_workers'],
+            retry=RetryPolicy(IMPORT_CONFIG['max_retries'], IMPORT_CONFIG['retry_base_seconds'],
+                              IMPORT_CONFIG['retry_max_seconds']),
+            touch="UpdatedAt"
         )
-        SELECT 
-            p.Id,
-            sa.Value_Proposition,
-            sa.Ingredients,
-            sa.Key_Labels,
-            sa.Primary_Colors,
-            sa.Secondary_Colors,
-            sa.Intended_Segment,
-            sa.Additional_Notes
+        try:
+            counts = migration.run()
+            print(f"✓ Migrados {counts['inserted']} productos nuevos y {counts['updated']} actualizados "
+                  f"en {len(migration.partitions)} particiones")
+            self.record_summary_changes(counts['keys'])
+            return True
+        except Exception as e:
+            # Las particiones confirmadas antes del error también cambiaron Products
+            self.record_summary_changes(migration.changed_keys)
+            print(f"✗ Error migrando productos: {e}")
+            return False
+    
+    def sync_products_data(self, csv_path, delete_missing=False):
+        """
+        Sincronizar Products de forma incremental por ASIN
+        Solo las filas nuevas o modificadas viajan al servidor y se aplican con MERGE
+        """
+        if not os.path.exists(csv_path):
+            print(f"⚠️  CSV no encontrado: {csv_path}")
+            return False
+        
+        try:
+            print(f"🔁 Sincronizando productos desde {os.path.basename(csv_path)}...")
+            sync = IncrementalProductSync(
+                self.engine, self.bulk_loader,
+                chunk_size=IMPORT_CONFIG['chunk_size'] or 50000,
+                delete_missing=delete_missing,
+                dedupe_rule=IMPORT_CONFIG['dedupe_rule'],
+                collapse_variants=IMPORT_CONFIG['collapse_variants']
+            )
+            counts = sync.sync(csv_path)
+            print(_indent(sync.dedupe.report()))
+            self.record_summary_changes(sync.changed_asins)
+            print(f"✓ Productos: {counts['inserted']} nuevos, {counts['updated']} actualizados, "
+                  f"{counts['unchanged']} sin cambios, {counts['deleted']} eliminados")
+            if counts['missing'] and not delete_missing:
+                print(f"  ℹ️  {counts['missing']} productos ya no están en el CSV (no se eliminaron)")
+            return True
+        except Exception as e:
+            print(f"✗ Error sincronizando productos: {e}")
+            return False
+    
+    def migrate_analysis_data(self):
+        """
+        Migrar datos de análisis desde tabla temporal
+        La etapa puede repetirse (cambió un CSV o el DDL): cada producto de la
+        staging actualiza su análisis o lo crea si falta, y las filas repetidas
+        de corridas anteriores se eliminan. Las columnas que no vienen del CSV
+        (SimilarityScore, Barriers, Playbook...) se conservan
+        """
+        # Un análisis por producto aunque el CSV repita un ASIN
+        staged_sql = """
+        SELECT
+            p.Id AS ProductId,
+            MAX(sa.Value_Proposition) AS ValueProposition,
+            MAX(sa.Ingredients) AS Ingredients,
+            MAX(sa.Key_Labels) AS KeyLabels,
+            MAX(sa.Primary_Colors) AS PrimaryColors,
+            MAX(sa.Secondary_Colors) AS SecondaryColors,
+            MAX(sa.Intended_Segment) AS IntendedSegment,
+            MAX(sa.Additional_Notes) AS AdditionalNotes
         FROM temp_selected_analysis sa
         INNER JOIN Products p ON p.ASIN = sa.ASIN
         WHERE sa.Value_Proposition IS NOT NULL
+        GROUP BY p.Id
+        """
+        columns = ["ValueProposition", "Ingredients", "KeyLabels", "PrimaryColors",
+                   "SecondaryColors", "IntendedSegment", "AdditionalNotes"]
+        dedupe_sql = f"""
+        -- Quitar análisis repetidos (se conserva el más antiguo de cada producto)
+        DELETE FROM ProductAnalysis
+        WHERE ProductId IN (SELECT ProductId FROM ({staged_sql}) s)
+          AND Id NOT IN (SELECT MIN(Id) FROM ProductAnalysis GROUP BY ProductId)
+        """
+        update_sql = f"""
+        -- Actualizar los análisis existentes
+        UPDATE ProductAnalysis
+        SET {', '.join(f"{col} = s.{col}" for col in columns)}
+        FROM ({staged_sql}) s
+        WHERE ProductAnalysis.ProductId = s.ProductId
+        """
+        insert_sql = f"""
+        -- Crear los que faltan
+        INSERT INTO ProductAnalysis (ProductId, {', '.join(columns)})
+        SELECT s.ProductId, {', '.join(f"s.{col}" for col in columns)}
+        FROM ({staged_sql}) s
+        WHERE NOT EXISTS (SELECT 1 FROM ProductAnalysis pa WHERE pa.ProductId = s.ProductId)
         """
         
         try:
             with self.engine.connect() as conn:
-                result = conn.execute(text(migration_sql))
+                removed = conn.execute(text(dedupe_sql)).rowcount
+                updated = conn.execute(text(update_sql)).rowcount
+                inserted = conn.execute(text(insert_sql)).rowcount
                 conn.commit()
-                print(f"✓ Migrados {result.rowcount} análisis")
+                METRICS.add(rows=max(updated, 0) + max(inserted, 0))
+                print(f"✓ Migrados {inserted} análisis nuevos, {updated} actualizados"
+                      + (f" ({removed} repetidos eliminados)" if removed > 0 else ""))
                 return True
         except Exception as e:
             print(f"✗ Error migrando análisis: {e}")
             return False
     
-    def show_statistics(self):
-        """Mostrar estadísticas de la base de datos"""
-        stats_sql = """
-        SELECT 'Products' as TableName, COUNT(*) as RecordCount FROM Products
-        UNION ALL
-        SELECT 'NutritionalInfo' as TableName, COUNT(*) as RecordCount FROM NutritionalInfo
-        UNION ALL
-        SELECT 'ProductAnalysis' as TableName, COUNT(*) as RecordCount FROM ProductAnalysis
-        UNION ALL
-        SELECT 'Categories' as TableName, COUNT(*) as RecordCount FROM Categories
-        UNION ALL
-        SELECT 'Brands' as TableName, COUNT(*) as RecordCount FROM Brands
+    def migrate_nutrition_data(self, csv_path):
+        """Extraer NutritionalInfo de Nutritional_Values y cargarla en bloque"""
+        if not os.path.exists(csv_path):
+            print(f"⚠️  CSV no encontrado: {csv_path}")
+            return False
+        
+        try:
+            frames = list(self.staging_frames(csv_path, "selected_analysis"))
+            source = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+            nutrition = extract_nutrition(source)
+            counts = NutritionLoader(self.engine, self.bulk_loader).load(nutrition)
+            self.record_summary_changes(nutrition['ASIN'])
+            print(f"✓ Información nutricional: {counts['extracted']} productos extraídos, "
+                  f"{counts['inserted']} insertados ({counts['replaced']} reemplazados)")
+            return True
+        except Exception as e:
+            print(f"✗ Error migrando información nutricional: {e}")
+            return False
+    
+    def record_summary_changes(self, asins=(), full=False):
+        """Anotar productos modificados (o una carga completa) para MarketSummary"""
+        with self._summary_lock:
+            self.summary_changes.update(asins)
+            self.summary_full_refresh = self.summary_full_refresh or full
+    
+    def refresh_market_summary(self, full=False):
+        """
+        Actualizar MarketSummary con los productos que cambiaron en esta corrida
+        full=True recalcula todo (p. ej. si una migración se saltó y no anotó sus cambios)
         """
+        try:
+            started = time.perf_counter()
+            summary = MarketSummary(self.engine, self.bulk_loader)
+            summary.ensure_tables()
+            if full or self.summary_full_refresh or summary.state_rows() == 0:
+                counts = summary.rebuild()
+                print(f"✓ Resúmenes de mercado recalculados: {counts['groups']:,} grupos "
+                      f"({counts['products']:,} productos) en {time.perf_counter() - started:.2f}s")
+            else:
+                counts = summary.apply_changes(self.summary_changes)
+                print(f"✓ Resúmenes de mercado: {counts['products']:,} productos modificados, "
+                      f"{counts['groups']:,} grupos actualizados ({counts['recomputed']} recalculados) "
+                      f"en {time.perf_counter() - started:.2f}s")
+            with self._summary_lock:
+                self.summary_changes.clear()
+                self.summary_full_refresh = False
+            return True
+        except Exception as e:
+            print(f"✗ Error actualizando resúmenes de mercado: {e}")
+            return False
+    
+    def verify_market_summary(self):
+        """Comparar MarketSummary con un recálculo completo sobre Products"""
+        try:
+            mismatches = MarketSummary(self.engine, self.bulk_loader).check()
+        except Exception as e:
+            print(f"✗ Error verificando resúmenes: {e}")
+            return False
+        
+        if not mismatches:
+            print("✅ MarketSummary coincide con el recálculo completo")
+            return True
+        
+        print(f"❌ {len(mismatches)} diferencias en MarketSummary:")
+        for dimension, key, column, stored, expected in mismatches[:20]:
+            if column == '*':
+                print(f"   {dimension}/{key}: {stored}")
+            else:
+                print(f"   {dimension}/{key} {column}: guardado {stored}, esperado {expected}")
+        return False
+    
+    def refresh_protein_metrics(self):
+        """Recalcular ProductProteinMetrics y guardar solo los productos que cambiaron"""
+        try:
+            started = time.perf_counter()
+            counts = ProteinMetrics(self.engine, self.bulk_loader).refresh()
+            METRICS.add(rows=counts['changed'] + counts['removed'])
+            print(f"✓ Métricas proteicas: {counts['products']:,} productos ({counts['ranked']:,} con precio "
+                  f"por gramo de proteína), {counts['changed']:,} actualizados, {counts['removed']:,} "
+                  f"eliminados en {time.perf_counter() - started:.2f}s")
+            return True
+        except Exception as e:
+            print(f"✗ Error calculando métricas proteicas: {e}")
+            return False
+    
+    def score_similarity(self):
+        """Calcular SimilarityScore de todos los productos contra Proteo50"""
+        try:
+            started = time.perf_counter()
+            counts = SimilarityScorer(self.engine, self.bulk_loader).run()
+            print(f"✓ Similitud con Proteo50: {counts['scored']:,} productos en "
+                  f"{time.perf_counter() - started:.2f}s ({counts['updated']:,} actualizados, "
+                  f"{counts['unanalyzed']:,} sin análisis)")
+            return True
+        except Exception as e:
+            print(f"✗ Error calculando similitud: {e}")
+            return False
+    
+    def build_neighbors(self, full=False):
+        """Construir o actualizar el índice top-k de productos similares"""
+        try:
+            started = time.perf_counter()
+            job = ProductNeighborsJob(self.engine, self.bulk_loader,
+                                      k=IMPORT_CONFIG['neighbors_k'],
+                                      index_dir=IMPORT_CONFIG['neighbors_dir'])
+            counts = job.run(full=full)
+            mode = "completo" if counts['mode'] == 'full' else "incremental"
+            print(f"✓ Vecinos ({mode}): {counts['updated']:,} de {counts['products']:,} productos "
+                  f"actualizados, {counts['rows']:,} filas en {time.perf_counter() - started:.2f}s")
+            return True
+        except Exception as e:
+            print(f"✗ Error construyendo vecinos: {e}")
+            return False
+    
+    def show_pool_statistics(self):
+        """Mostrar aciertos y fallos del pool de conexiones"""
+        stats = get_pool_stats(self.engine)
+        if stats:
+            print(f"\n🔌 Pool de conexiones: {stats['checkouts']} usos, {stats['hits']} reutilizadas, "
+                  f"{stats['misses']} nuevas ({stats['hit_rate']:.0%} aciertos)")
+    
+    def show_statistics(self):
+        """Mostrar estadísticas de la base de datos (conteos del catálogo, sin escanear tablas)"""
+        tables = ['Products', 'NutritionalInfo', 'ProductAnalysis', 'Categories', 'Brands']
         
         try:
-            df = pd.read_sql(stats_sql, self.engine)
+            result = DatabaseVerifier(self.engine, checks=[]).run()
+            df = pd.DataFrame({'TableName': tables,
+                               'RecordCount': [result.rows(table) or 0 for table in tables]})
             print("\n📈 Estadísticas de la Base de Datos:")
             print(df.to_string(index=False))
         except Exception as e:
             print(f"⚠️  No se pudieron obtener estadísticas: {e}")
+    
+    def show_analysis(self, kind):
+        """Mostrar un análisis de mercado (market, brand, category o protein)"""
+        procedure = ANALYSIS_PROCEDURES[kind]
+        try:
+            started = time.perf_counter()
+            with self.engine.connect() as conn:
+                df = pd.read_sql(text(f"EXEC {procedure}"), conn)
+            print(f"\n📊 {procedure} ({len(df)} filas en {time.perf_counter() - started:.3f}s):")
+            print(df.to_string(index=False))
+            return True
+        except Exception as e:
+            print(f"✗ Error ejecutando {procedure}: {e}")
+            return False
 
-def main():
-    print("🚀 Importador de datos Proteia para Azure SQL Database")
+def source_digest(path):
+    """Hash de un archivo de entrada de una etapa ('missing' si no existe)"""
+    return file_digest(path) if os.path.exists(path) else 'missing'
+
+def build_import_scheduler(importer, sql_files, csv_files):
+    """
+    Declarar las etapas del importador y sus dependencias
+    Las cargas de CSV a staging no dependen de los scripts SQL y corren en
+    paralelo con ellos; las migraciones esperan a sus tablas y a su CSV.
+    Cada etapa declara sus entradas para que una corrida repetida salte las
+    que no cambiaron (importer.pipeline_state).
+    """
+    # MERGE solo existe en Azure SQL: el backend local siempre hace la carga completa
+    incremental = IMPORT_CONFIG['incremental_sync'] and importer.backend.supports_merge
+    sql_files = importer.backend.deployable_scripts(sql_files)
+    scheduler = StageScheduler(max_workers=IMPORT_CONFIG['max_workers'], state=importer.pipeline_state)
+    
+    # Scripts SQL: despliegue en orden sobre una conexión. Un fallo (p. ej. tablas
+    # que ya existen en 01) no detiene la importación, igual que antes. Los scripts
+    # repetibles (05) van en otra etapa: un cambio en ellos llega a las bases existentes
+    summary_files = [path for path in sql_files if os.path.basename(path) in SUMMARY_SCRIPTS]
+    base_files = [path for path in sql_files if path not in summary_files]
+    ddl_stages = []
+    for name, files in (("sql:deploy", base_files), ("sql:summary", summary_files)):
+        if files:
+            scheduler.add(name, lambda files=files: importer.deploy_sql_files(files), blocking=False,
+                          depends_on=list(ddl_stages),
+                          inputs=([source_digest(path) for path in files], IMPORT_CONFIG['sql_transaction']))
+            ddl_stages.append(name)
+    
+    # Cargas de CSV a staging
+    csv_stages = {}
+    for table_name, csv_path in csv_files.items():
+        if table_name == "products_market" and incremental:
+            # En modo incremental el CSV de productos no pasa por staging completo
+            continue
+        name = f"csv:{table_name}"
+        scheduler.add(name, lambda path=csv_path, table=table_name: importer.import_csv_to_temp_table(
+            path, table,
+            chunk_size=IMPORT_CONFIG['chunk_size'],
+            max_rss_mb=IMPORT_CONFIG['max_rss_mb']
+        ), inputs=(source_digest(csv_path), PARSER_VERSION, bool(IMPORT_CONFIG['chunk_size']),
+                   dedupe_settings(table_name)),
+           output_rows=lambda table=table_name: importer.staging_rows(table))
+        csv_stages[table_name] = name
+    
+    def with_staging(func, table_name):
+        """La migración recarga su staging si drop_staging la borró y la etapa csv se saltó"""
+        def run():
+            if table_name in csv_stages and IMPORT_CONFIG['drop_staging']:
+                if not importer.ensure_staging(csv_files[table_name], table_name):
+                    return False
+            return func()
+        return run
+    
+    # Migraciones: productos después de todo el DDL; análisis después de productos
+    products_depends = list(ddl_stages)
+    if incremental:
+        scheduler.add("migrate:products",
+                      lambda: importer.sync_products_data(csv_files["products_market"],
+                                                          IMPORT_CONFIG['delete_missing']),
+                      depends_on=products_depends,
+                      inputs=(source_digest(csv_files["products_market"]), IMPORT_CONFIG['delete_missing'],
+                              dedupe_settings("products_market")))
+    else:
+        if "products_market" in csv_stages:
+            products_depends.append(csv_stages["products_market"])
+        scheduler.add("migrate:products", with_staging(importer.migrate_products_data, "products_market"),
+                      depends_on=products_depends,
+                      inputs=('upsert' if IMPORT_CONFIG['partitioned_migration'] else 'insert',))
+    
+    analysis_depends = ["migrate:products"]
+    if "selected_analysis" in csv_stages:
+        analysis_depends.append(csv_stages["selected_analysis"])
+    scheduler.add("migrate:analysis", with_staging(importer.migrate_analysis_data, "selected_analysis"),
+                  depends_on=analysis_depends, inputs=())
+    
+    # NutritionalInfo se extrae directo del CSV de análisis (no usa su staging)
+    if "selected_analysis" in csv_files:
+        scheduler.add("migrate:nutrition",
+                      lambda: importer.migrate_nutrition_data(csv_files["selected_analysis"]),
+                      depends_on=["migrate:products"], inputs=(source_digest(csv_files["selected_analysis"]),))
+    
+    # La similitud usa nutrición y análisis ya migrados
+    scoring_depends = ["migrate:analysis"]
+    if "migrate:nutrition" in scheduler.stages:
+        scoring_depends.append("migrate:nutrition")
+    scheduler.add("score:similarity", importer.score_similarity, depends_on=scoring_depends, inputs=())
+    
+    # Resúmenes de mercado: después de que cambien productos y nutrición
+    summary_depends = ["migrate:products"]
+    if "migrate:nutrition" in scheduler.stages:
+        summary_depends.append("migrate:nutrition")
+    # Si una de sus dependencias se saltó (corrida reanudada), sus cambios no quedaron anotados
+    scheduler.add("summary:market",
+                  lambda: importer.refresh_market_summary(full=bool(scheduler.reused & set(summary_depends))),
+                  depends_on=summary_depends, inputs=())
+    # Métricas proteicas: precio, peso y proteína ya migrados (solo escribe lo que cambió)
+    scheduler.add("metrics:protein", importer.refresh_protein_metrics, depends_on=summary_depends, inputs=())
+    scheduler.add("build:neighbors", importer.build_neighbors, depends_on=scoring_depends,
+                  inputs=(IMPORT_CONFIG['neighbors_k'],))
+    
+    # Staging: se borra cuando sus migraciones terminaron. Sus etapas csv quedan
+    # registradas con 0 filas para que una corrida sin cambios no la recargue
+    if IMPORT_CONFIG['drop_staging'] and csv_stages:
+        def drop_staging():
+            if not importer.drop_staging_tables(list(csv_stages)):
+                return False
+            if importer.pipeline_state is not None:
+                for name in csv_stages.values():
+                    if scheduler.hashes.get(name) is not None:
+                        importer.pipeline_state.record_stage(name, scheduler.hashes[name], STATUS_OK, 0)
+            return True
+        
+        scheduler.add("cleanup:staging", drop_staging, depends_on=["migrate:products", "migrate:analysis"])
+    
+    return scheduler
+
+def connect_importer(title):
+    """
+    Crear el importador y probar la conexión (None si falla)
+    Con IMPORT_CONFIG['backend'] = 'sqlite' se usa el archivo local sin pedir credenciales
+    """
+    print(title)
     print("=" * 60)
+    if IMPORT_CONFIG['backend'] != AzureSqlBackend.name:
+        backend = create_backend(IMPORT_CONFIG['backend'], path=IMPORT_CONFIG['local_path'])
+        print(f"💻 Base de datos local: {backend.label}")
+        print("=" * 60)
+        importer = ProteiaDataImporter(backend.name, backend.path, backend=backend)
+        if not importer.test_connection():
+            print("❌ No se pudo abrir la base de datos local")
+            return None
+        return importer
+    
     print(f"🌐 Servidor: {DATABASE_CONFIG['server']}")
     print(f"🗄️  Base de datos: {DATABASE_CONFIG['database']}")
     print("=" * 60)
@@ -225,20 +843,7 @@ def main():
     
     if not USERNAME or not PASSWORD:
         print("❌ Usuario y contraseña son requeridos para Azure SQL Database")
-        return
-    
-    # Rutas de archivos
-    project_path = "/Users/carlosmagana/CascadeProjects/proteia"
-    csv_files = {
-        "products_market": f"{project_path}/data/Products_market.csv",
-        "selected_analysis": f"{project_path}/figma/data/Selected_Products_AI.csv"
-    }
-    
-    sql_files = [
-        f"{project_path}/database/01_create_tables.sql",
-        f"{project_path}/database/02_initial_data.sql",
-        f"{project_path}/database/04_user_integration.sql"
-    ]
+        return None
     
     # Crear importador
     importer = ProteiaDataImporter(SERVER, DATABASE, USERNAME, PASSWORD)
@@ -246,27 +851,104 @@ def main():
     # Probar conexión
     if not importer.test_connection():
         print("❌ No se pudo conectar a la base de datos")
+        return None
+    return importer
+
+def main():
+    importer = connect_importer("🚀 Importador de datos Proteia para Azure SQL Database")
+    if importer is None:
         return
     
-    # Ejecutar scripts SQL
-    print("\n📝 Ejecutando scripts SQL...")
-    for sql_file in sql_files:
-        importer.execute_sql_file(sql_file)
-    
-    # Importar CSVs
-    print("\n📊 Importando archivos CSV...")
-    for table_name, csv_path in csv_files.items():
-        importer.import_csv_to_temp_table(csv_path, table_name)
+    if IMPORT_CONFIG['resume']:
+        importer.pipeline_state = PipelineState(IMPORT_CONFIG['state_path'],
+                                                scope=f"{importer.server}/{importer.database}")
     
-    # Migrar datos
-    print("\n🔄 Migrando datos a tablas principales...")
-    importer.migrate_products_data()
-    importer.migrate_analysis_data()
+    # Etapas del importador con sus dependencias
+    print("\n🗂️  Ejecutando etapas (scripts SQL, CSV y migraciones)...")
+    scheduler = build_import_scheduler(importer, sql_file_paths(), csv_file_paths())
+    started = time.perf_counter()
+    results = scheduler.run()
+    print(scheduler.summary(results, time.perf_counter() - started))
     
     # Mostrar estadísticas
     importer.show_statistics()
+    importer.show_pool_statistics()
+    importer.show_cache_statistics()
+    
+    if all(result.status == STATUS_OK for result in results.values()):
+        print("\n✅ Importación completada exitosamente!")
+    else:
+        failed = [name for name, result in results.items() if result.status != STATUS_OK]
+        print(f"\n⚠️  Importación completada con etapas fallidas u omitidas: {', '.join(failed)}")
+
+def neighbors_main():
+    """Job offline: reconstruir o actualizar ProductNeighbors"""
+    importer = connect_importer("🧭 Índice de productos similares (ProductNeighbors)")
+    if importer is None:
+        return False
+    ok = importer.build_neighbors()
+    importer.show_pool_statistics()
+    return ok
+
+def verify_summaries_main():
+    """Verificar MarketSummary contra un recálculo completo"""
+    importer = connect_importer("🧮 Verificación de resúmenes de mercado")
+    if importer is None:
+        return False
+    return importer.verify_market_summary()
+
+def analysis_main(kind):
+    """Ejecutar un análisis de mercado contra la base configurada"""
+    importer = connect_importer(f"📊 Análisis de mercado ({kind})")
+    if importer is None:
+        return False
+    return importer.show_analysis(kind)
+
+def market_analysis_main():
+    return analysis_main("market")
+
+def brand_analysis_main():
+    return analysis_main("brand")
+
+def category_analysis_main():
+    return analysis_main("category")
+
+def protein_analysis_main():
+    return analysis_main("protein")
+
+def parse_main(csv_files=None):
+    """
+    Dry-run: parsear y tipar los CSV sin conectarse a la base de datos
+    La primera corrida llena el caché de parseo y las siguientes lo leen
+    """
+    print("🧪 Dry-run de parseo (sin base de datos)")
+    print("=" * 60)
+    parse_cache = None
+    if IMPORT_CONFIG['parse_cache']:
+        parse_cache = ParseCache(IMPORT_CONFIG['cache_dir'], IMPORT_CONFIG['cache_max_mb'] * 1024 * 1024)
+    
+    ok = True
+    for table_name, csv_path in (csv_files or csv_file_paths()).items():
+        if not os.path.exists(csv_path):
+            print(f"⚠️  CSV no encontrado: {csv_path}")
+            ok = False
+            continue
+        started = time.perf_counter()
+        rows = 0
+        frame = None
+        frames, dedupe = deduplicated_frames(csv_path, table_name, parse_cache,
+                                             IMPORT_CONFIG['chunk_size'], IMPORT_CONFIG['max_rss_mb'])
+        for frame in frames:
+            rows += len(frame)
+        elapsed = time.perf_counter() - started
+        columns = len(frame.columns) if frame is not None else 0
+        print(f"✓ {os.path.basename(csv_path)} -> temp_{table_name}: {rows:,} filas, "
+              f"{columns} columnas en {elapsed:.2f}s")
+        if dedupe is not None:
+            print(_indent(dedupe.report()))
     
-    print("\n✅ Importación completada exitosamente!")
+    print_cache_statistics(parse_cache)
+    return ok
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Sincronización incremental de Products por ASIN
+Calcula un hash de contenido por fila en el cliente, lo compara con los
+hashes guardados en ProductSyncState y solo envía al servidor las filas
+nuevas o modificadas, que se aplican con un único MERGE.
+"""
+
+import hashlib
+
+from csv_streaming import clean_chunks, read_csv_chunks
+from market_schema import PRODUCT_COLUMNS, PRODUCT_KEY, REFERENCE_ASIN, product_column_types
+from product_dedupe import ProductDeduplicator
+from sql_profiler import raw_connection
+from type_coercion import prepare_products_market
+
+DELTA_TABLE = 'temp_products_delta'
+DELETED_TABLE = 'temp_products_deleted'
+
+# Productos que no vienen del CSV y nunca deben borrarse por sincronización
+PROTECTED_ASINS = (REFERENCE_ASIN,)
+
+STATE_TABLE_SQL = """
+IF OBJECT_ID('ProductSyncState', 'U') IS NULL
+BEGIN
+    CREATE TABLE ProductSyncState (
+        ASIN NVARCHAR(20) NOT NULL PRIMARY KEY,
+        ContentHash CHAR(40) NOT NULL,
+        SyncedAt DATETIME2 DEFAULT GETDATE()
+    );
+END
+"""
+
+# Separadores que no aparecen en los datos del CSV
+FIELD_SEPARATOR = '\x1f'
+NULL_MARKER = '\x00'
+
+
+def content_hashes(frame):
+    """
+    Hash SHA-1 estable por fila sobre las columnas de Products ya tipadas
+    El texto de cada fila se arma con operaciones vectorizadas de pandas;
+    solo el digest se calcula fila por fila.
+    """
+    columns = [product_col for _, product_col, _ in PRODUCT_COLUMNS if product_col in frame.columns]
+    text = frame[columns].astype(object).where(frame[columns].notna(), NULL_MARKER).astype(str)
+    joined = text[columns[0]].str.cat([text[col] for col in columns[1:]], sep=FIELD_SEPARATOR)
+    return joined.map(lambda row: hashlib.sha1(row.encode('utf-8')).hexdigest())
+
+
+class IncrementalProductSync:
+    """Aplicar a Products solo las diferencias contra la última sincronización"""
+
+    def __init__(self, engine, bulk_loader, chunk_size=50000, delete_missing=False,
+                 dedupe_rule='first', collapse_variants=False):
+        self.engine = engine
+        self.bulk_loader = bulk_loader
+        self.chunk_size = chunk_size
+        self.delete_missing = delete_missing
+        # El MERGE necesita un ASIN por fila: siempre se deduplica
+        self.dedupe = ProductDeduplicator(dedupe_rule or 'first', collapse_variants)
+        self.changed_asins = []
+
+    def ensure_state_table(self):
+        """Crear ProductSyncState si no existe"""
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            conn.execute(text(STATE_TABLE_SQL))
+            conn.commit()
+
+    def load_stored_hashes(self):
+        """Hashes de la última sincronización: {ASIN: hash}"""
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT ASIN, ContentHash FROM ProductSyncState"))
+            return {asin: content_hash for asin, content_hash in rows}
+
+    def diff(self, csv_path, stored_hashes):
+        """
+        Comparar el CSV con los hashes guardados
+        Devuelve (DataFrame de filas nuevas o cambiadas, filas sin cambios, ASIN ausentes)
+        """
+        import pandas as pd
+
+        def frames():
+            return (prepare_products_market(chunk)
+                    for chunk in clean_chunks(read_csv_chunks(csv_path, self.chunk_size)))
+
+        seen = set()
+        changed_parts = []
+        unchanged = 0
+
+        # Un ASIN repetido en el CSV se resuelve con la regla del deduplicador
+        for frame in self.dedupe.frames(frames):
+            frame = frame.copy()
+            seen.update(frame[PRODUCT_KEY])
+
+            frame['ContentHash'] = content_hashes(frame)
+            previous = frame[PRODUCT_KEY].map(stored_hashes)
+            is_changed = previous.isna() | (previous != frame['ContentHash'])
+            unchanged += int((~is_changed).sum())
+            if is_changed.any():
+                changed_parts.append(frame[is_changed])
+
+        columns = [product_col for _, product_col, _ in PRODUCT_COLUMNS] + ['ContentHash']
+        if changed_parts:
+            changed = pd.concat(changed_parts, ignore_index=True)
+        else:
+            changed = pd.DataFrame(columns=columns)
+        missing = sorted(set(stored_hashes) - seen - set(PROTECTED_ASINS))
+        return changed.reindex(columns=columns), unchanged, missing
+
+    def merge_sql(self):
+        """MERGE de la tabla delta (ya tipada) sobre Products"""
+        columns = [product_col for _, product_col, _ in PRODUCT_COLUMNS]
+        update_columns = ',\n            '.join(
+            f"t.[{col}] = s.[{col}]" for col in columns if col != PRODUCT_KEY
+        )
+        insert_columns = ', '.join(f"[{col}]" for col in columns)
+        insert_values = ', '.join(f"s.[{col}]" for col in columns)
+
+        return f"""
+        MERGE Products AS t
+        USING {DELTA_TABLE} AS s
+        ON t.ASIN = s.ASIN
+        WHEN MATCHED THEN UPDATE SET
+            {update_columns},
+            t.UpdatedAt = GETDATE()
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({insert_columns})
+            VALUES ({insert_values})
+        OUTPUT $action;
+        """
+
+    def sync(self, csv_path):
+        """
+        Sincronizar Products con el CSV
+        Devuelve conteos {'inserted', 'updated', 'unchanged', 'deleted', 'missing'};
+        'missing' son los ASIN ausentes del CSV, que solo se borran con delete_missing
+        """
+        self.ensure_state_table()
+        stored_hashes = self.load_stored_hashes()
+        changed, unchanged, missing = self.diff(csv_path, stored_hashes)
+        # ASIN que tocó esta sincronización (para mantener los resúmenes)
+        self.changed_asins = list(changed[PRODUCT_KEY])
+        if self.delete_missing:
+            self.changed_asins.extend(missing)
+
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': unchanged, 'deleted': 0,
+                  'missing': len(missing)}
+        if changed.empty and not (self.delete_missing and missing):
+            return counts
+
+        connection = raw_connection(self.engine)
+        try:
+            cursor = connection.cursor()
+
+            if not changed.empty:
+                column_types = dict(product_column_types(), ContentHash='CHAR(40)')
+                self.bulk_loader.load(connection, DELTA_TABLE, changed, create=True,
+                                      column_types=column_types)
+
+                cursor.execute(self.merge_sql())
+                actions = [row[0] for row in cursor.fetchall()]
+                counts['inserted'] = actions.count('INSERT')
+                counts['updated'] = actions.count('UPDATE')
+
+                cursor.execute(f"""
+                MERGE ProductSyncState AS t
+                USING {DELTA_TABLE} AS s ON t.ASIN = s.ASIN
+                WHEN MATCHED THEN UPDATE SET t.ContentHash = s.ContentHash, t.SyncedAt = GETDATE()
+                WHEN NOT MATCHED BY TARGET THEN
+                    INSERT (ASIN, ContentHash) VALUES (s.ASIN, s.ContentHash);
+                """)
+                cursor.execute(f"DROP TABLE {DELTA_TABLE}")
+
+            if self.delete_missing and missing:
+                import pandas as pd
+
+                keys = pd.DataFrame({PRODUCT_KEY: missing})
+                self.bulk_loader.load(connection, DELETED_TABLE, keys, create=True,
+                                      column_types={PRODUCT_KEY: 'NVARCHAR(20)'})
+                cursor.execute(f"DELETE p FROM Products p INNER JOIN {DELETED_TABLE} d ON p.ASIN = d.ASIN")
+                counts['deleted'] = cursor.rowcount
+                cursor.execute(f"DELETE s FROM ProductSyncState s INNER JOIN {DELETED_TABLE} d ON s.ASIN = d.ASIN")
+                cursor.execute(f"DROP TABLE {DELETED_TABLE}")
+
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        return counts
@@ -0,0 +1,990 @@
+#!/usr/bin/env python3
+"""
+Asesor estático de índices a partir de los scripts .sql del proyecto
+Lee los archivos en orden de despliegue (lotes de sql_script_runner) y arma
+el esquema declarado: columnas y tipos de cada tabla, PRIMARY KEY y UNIQUE
+(inline o como CONSTRAINT) y los CREATE INDEX. De cada procedimiento, vista
+y función (la última definición gana, como en el despliegue) extrae por
+tabla las columnas de filtro (igualdad o rango), join, ORDER BY, GROUP BY y
+las columnas leídas.
+
+Por cada consulta se elige la tabla que conduce el plan (la que tiene
+filtros buscables o el primer ORDER BY, nunca el lado opcional de un LEFT
+JOIN); el resto se busca por sus columnas de join. Con eso se propone una
+clave (igualdades, luego un rango o el orden) y columnas INCLUDE para que el
+índice cubra la consulta sin lookups al clustered.
+
+El resultado es un script .sql para revisar (no se ejecuta nada):
+1. Índices redundantes: prefijo izquierdo de otro índice o de una
+   restricción PRIMARY KEY / UNIQUE (solo cuestan escrituras)
+2. Índices existentes a los que les faltan columnas INCLUDE
+3. Índices de cobertura faltantes
+4. Notas: índices que ninguna consulta usa y coberturas descartadas
+
+Uso:
+    python3 proteia_db.py advise indexes > index_suggestions.sql
+    python3 index_advisor.py --output index_suggestions.sql [archivos.sql ...]
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+
+from sql_script_runner import read_batches
+
+DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts de despliegue: 00_setup_config_users.sql, 01_create_tables.sql, ...
+DEFAULT_PATTERN = '[0-9][0-9]_*.sql'
+
+# Una cobertura que copia más que esto por fila se descarta (el lookup sale más barato)
+MAX_INCLUDE_BYTES = 1000
+
+_TOKEN = re.compile(r"""
+    (?P<string>N?'(?:[^']|'')*')
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<name>(?:\[[^\]]+\]|[@#]{0,2}[^\W\d]\w*)(?:\s*\.\s*(?:\[[^\]]+\]|[^\W\d]\w*|\*))*)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<op><>|!=|>=|<=|[=<>])
+  | (?P<punct>[(),;*+\-/%])
+""", re.VERBOSE | re.DOTALL)
+
+_KEYWORDS = {
+    'ALL', 'ALTER', 'AND', 'APPLY', 'AS', 'ASC', 'BEGIN', 'BETWEEN', 'BY', 'CASE', 'CLUSTERED', 'CONSTRAINT',
+    'CREATE', 'CROSS', 'DECLARE', 'DEFAULT', 'DELETE', 'DESC', 'DISTINCT', 'ELSE', 'END', 'EXCEPT', 'EXEC',
+    'EXECUTE', 'EXISTS', 'FOR', 'FOREIGN', 'FROM', 'FULL', 'FUNCTION', 'GROUP', 'HAVING', 'IF', 'IN', 'INCLUDE',
+    'INDEX', 'INNER', 'INSERT', 'INTERSECT', 'INTO', 'IS', 'JOIN', 'KEY', 'LEFT', 'LIKE', 'MERGE', 'NONCLUSTERED',
+    'NOT', 'NULL', 'ON', 'OPTION', 'OR', 'ORDER', 'OUTER', 'OUTPUT', 'OVER', 'PRIMARY', 'PRINT', 'PROC',
+    'PROCEDURE', 'REFERENCES', 'RETURN', 'RETURNS', 'RIGHT', 'SELECT', 'SET', 'TABLE', 'THEN', 'TOP', 'TRIGGER',
+    'UNION', 'UNIQUE', 'UPDATE', 'VALUES', 'VIEW', 'WHEN', 'WHERE', 'WHILE', 'WITH',
+}
+
+# Palabras que terminan una sentencia SELECT/UPDATE/DELETE (T-SQL no exige ;)
+_STATEMENT_STARTS = {
+    'BEGIN', 'DECLARE', 'DELETE', 'ELSE', 'END', 'EXCEPT', 'EXEC', 'EXECUTE', 'IF', 'INSERT', 'INTERSECT',
+    'MERGE', 'PRINT', 'RETURN', 'SELECT', 'UNION', 'UPDATE', 'WHILE',
+}
+
+_JOIN_WORDS = {'INNER', 'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'JOIN', 'APPLY'}
+
+_RANGE_OPERATORS = {'<', '>', '<=', '>=', 'BETWEEN', 'LIKE'}
+
+_OBJECT = re.compile(r'^\s*CREATE\s+(?:OR\s+ALTER\s+)?(PROC(?:EDURE)?|VIEW|FUNCTION)\s+'
+                     r'((?:\[[^\]]+\]|\w+)(?:\.(?:\[[^\]]+\]|\w+))?)', re.IGNORECASE)
+
+# Bytes por fila de cada tipo (aproximado; MAX va fuera de fila y no se incluye)
+_FIXED_WIDTHS = {
+    'BIT': 1, 'TINYINT': 1, 'SMALLINT': 2, 'INT': 4, 'BIGINT': 8, 'REAL': 4, 'FLOAT': 8, 'MONEY': 8,
+    'DATE': 3, 'TIME': 5, 'DATETIME': 8, 'DATETIME2': 8, 'DATETIMEOFFSET': 10, 'UNIQUEIDENTIFIER': 16,
+    'DECIMAL': 9, 'NUMERIC': 9,
+}
+
+
+class Token:
+    """Token de una sentencia: tipo, texto y posición en el lote"""
+
+    def __init__(self, kind, text, position):
+        self.kind = kind
+        self.text = text
+        self.position = position
+        self.upper = text.upper() if kind == 'name' else text
+
+    @property
+    def parts(self):
+        """Partes de un nombre (esquema.tabla.columna) sin corchetes"""
+        return [part.strip().strip('[]') for part in re.split(r'\s*\.\s*(?![^\[]*\])', self.text)]
+
+    @property
+    def keyword(self):
+        return self.kind == 'name' and self.upper in _KEYWORDS
+
+    def is_(self, *words):
+        return self.upper in words and self.kind in ('name', 'op', 'punct')
+
+
+def tokenize(sql):
+    """Tokens de un lote sin comentarios"""
+    tokens = []
+    for match in _TOKEN.finditer(sql):
+        if match.lastgroup != 'comment':
+            tokens.append(Token(match.lastgroup, match.group(), match.start()))
+    return tokens
+
+
+def table_key(parts):
+    """Clave de tabla sin base de datos ni esquema dbo, en minúsculas (collation CI)"""
+    parts = [part for part in parts if part][-2:]
+    if len(parts) == 2 and parts[0].lower() == 'dbo':
+        parts = parts[1:]
+    return '.'.join(parts).lower()
+
+
+def _matching(tokens, start):
+    """Índice del ) que cierra el ( de tokens[start]"""
+    depth = 0
+    for index in range(start, len(tokens)):
+        if tokens[index].text == '(':
+            depth += 1
+        elif tokens[index].text == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(tokens) - 1
+
+
+def _split(tokens, separator):
+    """Partir en el separador (',' o AND) fuera de paréntesis; BETWEEN x AND y queda junto"""
+    pieces, current, depth, between = [], [], 0, False
+    for token in tokens:
+        if token.text == '(':
+            depth += 1
+        elif token.text == ')':
+            depth -= 1
+        if depth == 0 and token.is_('BETWEEN'):
+            between = True
+        if depth == 0 and token.is_(separator):
+            if separator == 'AND' and between:
+                between = False
+            else:
+                pieces.append(current)
+                current = []
+                continue
+        current.append(token)
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _column_width(type_name):
+    """Bytes por fila de un tipo declarado (None para MAX y tipos LOB)"""
+    match = re.match(r'(\w+)\s*(?:\(\s*(\w+))?', type_name)
+    base = match.group(1).upper() if match else type_name.upper()
+    size = match.group(2) if match else None
+    if base in ('NVARCHAR', 'NCHAR', 'VARCHAR', 'CHAR', 'VARBINARY', 'BINARY'):
+        if size is None:
+            return 2 if base.startswith('N') else 1
+        if size.upper() == 'MAX':
+            return None
+        return int(size) * (2 if base.startswith('N') else 1)
+    if base in ('TEXT', 'NTEXT', 'IMAGE', 'XML'):
+        return None
+    return _FIXED_WIDTHS.get(base, 8)
+
+
+class Table:
+    """Tabla declarada: columnas con su tipo (en orden) y dónde se creó"""
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.columns = {}
+
+    def column(self, name):
+        """Nombre de la columna como se declaró (None si no existe)"""
+        entry = self.columns.get(name.lower())
+        return entry[0] if entry else None
+
+    def width(self, column):
+        return _column_width(self.columns[column.lower()][1])
+
+
+class Index:
+    """Índice declarado o restricción PRIMARY KEY / UNIQUE"""
+
+    def __init__(self, name, table, keys, includes=(), unique=False, clustered=False,
+                 constraint=None, filtered=False, source=''):
+        self.name = name
+        self.table = table
+        self.keys = keys  # [(columna, desc)]
+        self.includes = list(includes)
+        self.unique = unique
+        self.clustered = clustered
+        self.constraint = constraint  # 'PRIMARY KEY', 'UNIQUE' o None para CREATE INDEX
+        self.filtered = filtered
+        self.source = source
+
+    @property
+    def key_columns(self):
+        return [column.lower() for column, _ in self.keys]
+
+    @property
+    def label(self):
+        if self.name:
+            return self.name
+        return f"{self.constraint} ({', '.join(column for column, _ in self.keys)})"
+
+
+class Usage:
+    """Uso de una tabla en una consulta: columnas por rol"""
+
+    def __init__(self, table):
+        self.table = table
+        self.equality = []
+        self.range = []
+        self.join = []
+        self.sort = []  # [(columna, desc)]
+        self.group = []
+        self.read = []
+        self.star = False
+        self.optional = False  # lado opcional de un LEFT/RIGHT JOIN
+
+    def add(self, role, column):
+        values = getattr(self, role)
+        if column not in values:
+            values.append(column)
+
+    @property
+    def filtered(self):
+        return bool(self.equality or self.range)
+
+    def needed(self):
+        """Columnas que la consulta lee de la tabla (en orden de aparición)"""
+        columns = []
+        for column in (self.equality + self.range + self.join + [column for column, _ in self.sort]
+                       + self.group + self.read):
+            if column not in columns:
+                columns.append(column)
+        return columns
+
+
+class Query:
+    """Una sentencia SELECT/UPDATE/DELETE de un objeto, con el uso de cada tabla"""
+
+    def __init__(self, owner, kind):
+        self.owner = owner
+        self.kind = kind
+        self.sources = []  # [(alias en minúsculas, clave de tabla)]
+        self.usages = {}
+
+    def usage(self, key):
+        if key not in self.usages:
+            self.usages[key] = Usage(key)
+        return self.usages[key]
+
+
+class SqlObject:
+    """Procedimiento, vista o función y las consultas de su cuerpo"""
+
+    def __init__(self, kind, name, source):
+        self.kind = kind
+        self.name = name
+        self.source = source
+        self.queries = []
+
+
+class Suggestion:
+    """Índice propuesto (nuevo o un existente ampliado) y las consultas que lo piden"""
+
+    def __init__(self, table, keys, includes, existing=None):
+        self.table = table
+        self.keys = keys
+        self.includes = includes
+        self.existing = existing
+        self.owners = []
+
+    def merge(self, includes, owner):
+        for column in includes:
+            if column not in self.includes:
+                self.includes.append(column)
+        if owner not in self.owners:
+            self.owners.append(owner)
+
+
+class SchemaCatalog:
+    """Tablas, índices y objetos declarados en los scripts"""
+
+    def __init__(self):
+        self.tables = {}
+        self.indexes = []
+        self.objects = {}
+        self.paths = []
+        self._pending = []
+
+    def load(self, paths):
+        for path in paths:
+            self.paths.append(path)
+            for batch in read_batches(path):
+                self._load_batch(path, batch)
+        return self
+
+    def _source(self, path, batch, position):
+        return f"{os.path.basename(path)}:{batch.line + batch.sql.count(chr(10), 0, position)}"
+
+    def _load_batch(self, path, batch):
+        tokens = tokenize(batch.sql)
+        match = _OBJECT.match(' '.join(token.text for token in tokens[:8]))
+        if match:
+            kind = {'PROC': 'PROCEDURE'}.get(match.group(1).upper(), match.group(1).upper())
+            name = Token('name', match.group(2), 0).parts[-1]
+            obj = SqlObject(kind, name, self._source(path, batch, tokens[0].position))
+            self.objects[name.lower()] = obj
+            self._pending.append((obj, tokens))
+            return
+
+        for index, token in enumerate(tokens):
+            if not token.is_('CREATE'):
+                continue
+            words = [t.upper for t in tokens[index + 1:index + 4]]
+            if words[:1] == ['TABLE']:
+                self._create_table(tokens, index + 2, self._source(path, batch, token.position))
+            elif 'INDEX' in words:
+                self._create_index(tokens, index + 1, self._source(path, batch, token.position))
+
+    def _create_table(self, tokens, index, source):
+        name_parts = tokens[index].parts
+        if name_parts[-1].startswith('#') or index + 1 >= len(tokens) or tokens[index + 1].text != '(':
+            return
+        key = table_key(name_parts)
+        table = Table('.'.join(part for part in name_parts[-2:] if part.lower() != 'dbo') or name_parts[-1], source)
+        self.tables[key] = table
+        self.indexes = [idx for idx in self.indexes if idx.table != key]
+
+        body = tokens[index + 2:_matching(tokens, index + 1)]
+        for definition in _split(body, ','):
+            if not definition:
+                continue
+            first = definition[0]
+            if first.is_('CONSTRAINT'):
+                self._table_constraint(key, definition[1].text.strip('[]'), definition[2:], source)
+            elif first.is_('PRIMARY', 'UNIQUE'):
+                self._table_constraint(key, None, definition, source)
+            elif first.is_('FOREIGN', 'CHECK', 'INDEX'):
+                continue
+            else:
+                self._column_definition(table, key, definition, source)
+
+    def _column_definition(self, table, key, definition, source):
+        column = definition[0].parts[-1]
+        type_name = definition[1].text if len(definition) > 1 else ''
+        if len(definition) > 2 and definition[2].text == '(':
+            type_name += ''.join(t.text for t in definition[2:_matching(definition, 2) + 1])
+        table.columns[column.lower()] = (column, type_name)
+
+        words = [t.upper for t in definition]
+        if 'PRIMARY' in words:
+            self.indexes.append(Index(None, key, [(column, False)], unique=True,
+                                      clustered='NONCLUSTERED' not in words,
+                                      constraint='PRIMARY KEY', source=source))
+        elif 'UNIQUE' in words:
+            self.indexes.append(Index(None, key, [(column, False)], unique=True,
+                                      clustered='CLUSTERED' in words and 'NONCLUSTERED' not in words,
+                                      constraint='UNIQUE', source=source))
+
+    def _table_constraint(self, key, name, definition, source):
+        words = [t.upper for t in definition]
+        if not definition or not definition[0].is_('PRIMARY', 'UNIQUE'):
+            return
+        constraint = 'PRIMARY KEY' if definition[0].is_('PRIMARY') else 'UNIQUE'
+        start = next((i for i, t in enumerate(definition) if t.text == '('), None)
+        if start is None:
+            return
+        keys = _key_list(definition[start + 1:_matching(definition, start)])
+        clustered = 'CLUSTERED' in words if constraint == 'UNIQUE' else 'NONCLUSTERED' not in words
+        self.indexes.append(Index(name, key, keys, unique=True, clustered=clustered,
+                                  constraint=constraint, source=source))
+
+    def _create_index(self, tokens, index, source):
+        words = []
+        while index < len(tokens) and not tokens[index].is_('INDEX'):
+            words.append(tokens[index].upper)
+            index += 1
+        if index + 3 >= len(tokens) or not tokens[index + 2].is_('ON'):
+            return
+        name = tokens[index + 1].parts[-1]
+        key = table_key(tokens[index + 3].parts)
+        start = index + 4
+        if start >= len(tokens) or tokens[start].text != '(':
+            return
+        end = _matching(tokens, start)
+        keys = _key_list(tokens[start + 1:end])
+        includes, filtered = [], False
+        position = end + 1
+        if position + 1 < len(tokens) and tokens[position].is_('INCLUDE'):
+            include_end = _matching(tokens, position + 1)
+            includes = [column for column, _ in _key_list(tokens[position + 2:include_end])]
+            position = include_end + 1
+        if position < len(tokens) and tokens[position].is_('WHERE'):
+            filtered = True
+        self.indexes = [idx for idx in self.indexes if (idx.name or '').lower() != name.lower()]
+        self.indexes.append(Index(name, key, keys, includes, unique='UNIQUE' in words,
+                                  clustered='CLUSTERED' in words, filtered=filtered, source=source))
+
+    def analyze_objects(self):
+        """Extraer las consultas de cada objeto (después de cargar todas las tablas)"""
+        for obj, tokens in self._pending:
+            if self.objects.get(obj.name.lower()) is obj:
+                obj.queries = [query for query in _queries(obj, _object_body(tokens), self.tables)
+                               if query.usages]
+        self._pending = []
+        return list(self.objects.values())
+
+
+def _key_list(tokens):
+    """Columnas de una lista (col [ASC|DESC], ...)"""
+    keys = []
+    for piece in _split(tokens, ','):
+        names = [t for t in piece if t.kind == 'name' and not t.is_('ASC', 'DESC')]
+        if names:
+            keys.append((names[0].parts[-1], any(t.is_('DESC') for t in piece)))
+    return keys
+
+
+def _object_body(tokens):
+    """Tokens después del AS que abre el cuerpo (los parámetros no cuentan)"""
+    depth = 0
+    for index, token in enumerate(tokens):
+        if token.text == '(':
+            depth += 1
+        elif token.text == ')':
+            depth -= 1
+        elif depth == 0 and token.is_('AS'):
+            return tokens[index + 1:]
+    return tokens
+
+
+def _statement_end(tokens, start):
+    """Fin de la sentencia que empieza en start"""
+    depth, cases = 0, 0
+    head = tokens[start].upper
+    for index in range(start + 1, len(tokens)):
+        token = tokens[index]
+        if token.text == '(':
+            depth += 1
+        elif token.text == ')':
+            if depth == 0:
+                return index
+            depth -= 1
+        elif depth == 0:
+            if token.text == ';':
+                return index
+            if token.is_('CASE'):
+                cases += 1
+            elif token.is_('END') and cases:
+                cases -= 1
+            elif token.is_('ELSE') and cases:
+                continue
+            elif token.is_('SET') and head != 'UPDATE':
+                return index
+            elif token.upper in _STATEMENT_STARTS and token.kind == 'name':
+                # DELETE FROM ... y UPDATE ... SET no cortan su propia sentencia
+                return index
+    return len(tokens)
+
+
+def _queries(owner, tokens, tables):
+    """Consultas (incluidas subconsultas) de una lista de tokens"""
+    queries = []
+    index = 0
+    while index < len(tokens):
+        if tokens[index].is_('SELECT', 'UPDATE', 'DELETE'):
+            end = _statement_end(tokens, index)
+            queries.extend(_parse_statement(owner, tokens[index:end], tables))
+            index = end
+        else:
+            index += 1
+    return queries
+
+
+def _parse_statement(owner, tokens, tables):
+    """Partir una sentencia en cláusulas y registrar el uso de cada tabla"""
+    queries = []
+    query = Query(owner, tokens[0].upper)
+    clauses = {'target': []}
+    clause = 'select' if query.kind == 'SELECT' else 'target'
+
+    index = 1
+    while index < len(tokens):
+        token = tokens[index]
+        if token.text == '(':
+            end = _matching(tokens, index)
+            inner = tokens[index + 1:end]
+            if inner and inner[0].is_('SELECT'):
+                # Subconsulta: se analiza aparte y en la cláusula queda un marcador
+                queries.extend(_queries(owner, inner, tables))
+                clauses.setdefault(clause, []).append(Token('subquery', '', token.position))
+            else:
+                clauses.setdefault(clause, []).extend(tokens[index:end + 1])
+            index = end + 1
+            continue
+        next_word = tokens[index + 1].upper if index + 1 < len(tokens) else None
+        if token.is_('FROM', 'WHERE', 'HAVING', 'SET', 'OPTION', 'INTO', 'OUTPUT'):
+            clause = token.upper.lower()
+        elif token.is_('GROUP', 'ORDER') and next_word == 'BY':
+            clause = token.upper.lower()
+            index += 1
+        else:
+            clauses.setdefault(clause, []).append(token)
+        index += 1
+
+    from_tokens = clauses.get('from', [])
+    conditions = _parse_sources(query, from_tokens, tables)
+    if query.kind in ('UPDATE', 'DELETE') and not query.sources:
+        target = [t for t in clauses.get('target', []) if t.kind == 'name' and not t.keyword]
+        if target:
+            _add_source(query, target[0].parts, None, tables, False)
+    if not query.sources:
+        return queries
+
+    resolve = _resolver(query, tables)
+    for condition in conditions + [clauses.get('where', []), clauses.get('having', [])]:
+        _predicates(query, condition, resolve)
+    _group(query, clauses.get('group', []), resolve)
+    _order(query, clauses.get('order', []), resolve)
+    if query.kind == 'SELECT':
+        _reads(query, clauses.get('select', []), resolve, select_list=True)
+    queries.append(query)
+    return queries
+
+
+def _add_source(query, parts, alias, tables, optional):
+    key = table_key(parts)
+    query.sources.append(((alias or parts[-1]).lower(), key))
+    if key in tables:
+        query.usage(key).optional = query.usage(key).optional or optional
+
+
+def _parse_sources(query, tokens, tables):
+    """Tablas y alias del FROM; devuelve las condiciones ON"""
+    conditions = []
+    index, expect_table, optional = 0, True, False
+    while index < len(tokens):
+        token = tokens[index]
+        if token.upper in _JOIN_WORDS:
+            if token.is_('LEFT', 'FULL'):
+                optional = True
+            expect_table = True
+            index += 1
+        elif token.text == ',':
+            expect_table, optional = True, False
+            index += 1
+        elif token.is_('ON'):
+            end = index + 1
+            depth = 0
+            while end < len(tokens):
+                if tokens[end].text == '(':
+                    depth += 1
+                elif tokens[end].text == ')':
+                    depth -= 1
+                elif depth == 0 and (tokens[end].upper in _JOIN_WORDS or tokens[end].text == ','):
+                    break
+                end += 1
+            conditions.append(tokens[index + 1:end])
+            index = end
+        elif expect_table and token.kind in ('name', 'subquery') and not token.keyword:
+            index += 1
+            if index < len(tokens) and tokens[index].is_('AS'):
+                index += 1
+            alias = None
+            if index < len(tokens) and tokens[index].kind == 'name' and not tokens[index].keyword:
+                alias = tokens[index].text
+                index += 1
+            if index + 1 < len(tokens) and tokens[index].is_('WITH') and tokens[index + 1].text == '(':
+                index = _matching(tokens, index + 1) + 1
+            if token.kind == 'name':
+                _add_source(query, token.parts, alias, tables, optional)
+            expect_table, optional = False, False
+        else:
+            index += 1
+    return conditions
+
+
+def _resolver(query, tables):
+    """Función token -> (tabla, columna) para las columnas de la consulta ('*' para p.*)"""
+    aliases = {}
+    for alias, key in query.sources:
+        aliases.setdefault(alias, key)
+        aliases.setdefault(key.split('.')[-1], key)
+    known = [key for _, key in query.sources if key in tables]
+
+    def resolve(token):
+        if token.kind != 'name' or token.keyword or token.text.startswith(('@', '#')):
+            return None
+        parts = token.parts
+        if len(parts) >= 2:
+            key = aliases.get(parts[-2].lower())
+            if key not in tables:
+                return None
+            if parts[-1] == '*':
+                return key, '*'
+            column = tables[key].column(parts[-1])
+            return (key, column) if column else None
+        matches = [(key, tables[key].column(parts[0])) for key in known if tables[key].column(parts[0])]
+        return matches[0] if len(matches) == 1 else None
+
+    return resolve
+
+
+def _columns(tokens, resolve):
+    """Columnas referenciadas (sin nombres de función ni alias de salida)"""
+    found = []
+    for index, token in enumerate(tokens):
+        if index + 1 < len(tokens) and tokens[index + 1].text == '(':
+            continue
+        if index > 0 and tokens[index - 1].is_('AS'):
+            continue
+        resolved = resolve(token)
+        if resolved and resolved[1] != '*':
+            found.append(resolved)
+    return found
+
+
+def _predicates(query, tokens, resolve):
+    """Clasificar cada predicado: igualdad, rango, join o residual (solo se lee)"""
+    if not tokens:
+        return
+    depth, has_or = 0, False
+    for token in tokens:
+        depth += token.text == '('
+        depth -= token.text == ')'
+        has_or = has_or or (depth == 0 and token.is_('OR'))
+
+    for predicate in _split(tokens, 'AND'):
+        if has_or:
+            _reads(query, predicate, resolve)
+            continue
+        operator = next((i for i, t in enumerate(predicate)
+                         if t.kind == 'op' or t.is_('IS', 'IN', 'LIKE', 'BETWEEN', 'NOT')), None)
+        if operator is None:
+            _reads(query, predicate, resolve)
+            continue
+        left, right = predicate[:operator], predicate[operator + 1:]
+        op = predicate[operator].upper
+        if op == 'IS':
+            op = 'IS NOT' if right and right[0].is_('NOT') else 'IS'
+        left_column = resolve(left[0]) if len(left) == 1 else None
+        right_column = resolve(right[0]) if len(right) == 1 and op != 'IS' else None
+
+        if op == '=' and left_column and right_column:
+            if left_column[0] != right_column[0]:
+                query.usage(left_column[0]).add('join', left_column[1])
+                query.usage(right_column[0]).add('join', right_column[1])
+            else:
+                _reads(query, predicate, resolve)
+            continue
+
+        column = left_column or right_column
+        role = None
+        if column and not _columns(right if left_column else left, resolve):
+            if op in ('=', 'IS', 'IN'):
+                role = 'equality'
+            elif op in _RANGE_OPERATORS:
+                role = 'range'
+        if role:
+            query.usage(column[0]).add(role, column[1])
+        _reads(query, predicate, resolve)
+
+
+def _group(query, tokens, resolve):
+    for table, column in _columns(tokens, resolve):
+        query.usage(table).add('group', column)
+
+
+def _order(query, tokens, resolve):
+    """Solo el primer ORDER BY (y los siguientes de la misma tabla) puede venir de un índice"""
+    sort_table = None
+    for item in _split(tokens, ','):
+        names = [t for t in item if not t.is_('ASC', 'DESC')]
+        column = resolve(names[0]) if len(names) == 1 else None
+        if column and column[1] != '*' and sort_table in (None, column[0]):
+            sort_table = column[0]
+            usage = query.usage(column[0])
+            if column[1] not in [name for name, _ in usage.sort]:
+                usage.sort.append((column[1], any(t.is_('DESC') for t in item)))
+        else:
+            sort_table = False
+            _reads(query, item, resolve)
+
+
+def _reads(query, tokens, resolve, select_list=False):
+    for index, token in enumerate(tokens):
+        if select_list and token.text == '*' and (index == 0 or tokens[index - 1].text in (',', ')')
+                                                   or tokens[index - 1].is_('DISTINCT')):
+            # SELECT * lee todas las columnas de todas las tablas
+            for alias, _ in query.sources:
+                resolved = resolve(Token('name', f"{alias}.*", 0))
+                if resolved:
+                    query.usage(resolved[0]).star = True
+        resolved = resolve(token)
+        if resolved and resolved[1] == '*':
+            query.usage(resolved[0]).star = True
+    for table, column in _columns(tokens, resolve):
+        query.usage(table).add('read', column)
+
+
+class IndexAdvisor:
+    """Redundancias, coberturas faltantes e INCLUDE sugeridos a partir de un SchemaCatalog"""
+
+    def __init__(self, catalog, max_include_bytes=MAX_INCLUDE_BYTES):
+        self.catalog = catalog
+        self.max_include_bytes = max_include_bytes
+        self.objects = catalog.analyze_objects()
+        self.redundant = []  # [(índice, índice que lo cubre)]
+        self.extend = {}  # nombre del índice -> Suggestion
+        self.missing = {}  # (tabla, clave) -> Suggestion
+        self.notes = []
+        self.used = set()
+
+    def run(self):
+        self._find_redundant()
+        redundant = {id(index) for index, _ in self.redundant}
+        self.live = [index for index in self.catalog.indexes if id(index) not in redundant]
+        for obj in self.objects:
+            for query in obj.queries:
+                driver = self._driver(query)
+                for key, usage in query.usages.items():
+                    if key in self.catalog.tables:
+                        self._advise(obj, query, usage, usage is driver)
+        return self
+
+    def _find_redundant(self):
+        """Un índice sobra si su clave es prefijo de la de otro índice o restricción que ya incluye sus columnas"""
+        indexes = self.catalog.indexes
+        for index in indexes:
+            if index.constraint or index.filtered or index.clustered:
+                continue
+            for other in indexes:
+                if other is index or other.table != index.table or other.filtered:
+                    continue
+                if any(other is dropped for dropped, _ in self.redundant):
+                    continue
+                keys, other_keys = index.key_columns, other.key_columns
+                if other_keys[:len(keys)] != keys:
+                    continue
+                if index.unique and not (other.unique and other_keys == keys):
+                    continue
+                covered = set(other_keys) | {column.lower() for column in other.includes}
+                if not other.clustered and not {column.lower() for column in index.includes} <= covered:
+                    continue
+                if other_keys == keys and not other.constraint and indexes.index(other) > indexes.index(index):
+                    # Dos CREATE INDEX idénticos: se propone quitar el segundo
+                    continue
+                self.redundant.append((index, other))
+                break
+
+    def _driver(self, query):
+        """Tabla que conduce el plan: filtros buscables, luego el primer ORDER BY, luego la primera del FROM"""
+        candidates = [query.usages[key] for _, key in query.sources
+                      if key in query.usages and not query.usages[key].optional]
+        for usage in candidates:
+            if usage.filtered:
+                return usage
+        for usage in candidates:
+            if usage.sort:
+                return usage
+        return candidates[0] if candidates else None
+
+    def _proposed_key(self, usage, driver):
+        """Clave propuesta: [(columna, desc)]"""
+        columns = list(usage.equality) if driver else usage.join + [c for c in usage.equality if c not in usage.join]
+        sort = dict(usage.sort)
+        if usage.range:
+            columns.append(usage.range[0])
+        elif driver and usage.sort:
+            columns += [column for column, _ in usage.sort if column not in columns]
+        elif driver and usage.group and not columns:
+            columns = list(usage.group)
+        return [(column, sort.get(column, False)) for column in columns]
+
+    def _clustered(self, table):
+        return next((index for index in self.live if index.table == table and index.clustered), None)
+
+    def _advise(self, obj, query, usage, driver):
+        table = self.catalog.tables[usage.table]
+        key = self._proposed_key(usage, driver)
+        if not key:
+            return
+        key_columns = [column.lower() for column, _ in key]
+        equality = {column.lower() for column in usage.equality + usage.join}
+        clustered = self._clustered(usage.table)
+        clustered_keys = set(clustered.key_columns) if clustered else set()
+
+        usable = [index for index in self.live if index.table == usage.table and not index.filtered
+                  and index.key_columns[0] in key_columns]
+        for index in usable:
+            if index.clustered or (index.unique and set(index.key_columns) <= equality):
+                # El clustered trae todas las columnas; un único con igualdad en toda la clave trae una fila
+                self.used.add(id(index))
+                return
+
+        needed = [column for column in usage.needed() if column.lower() not in key_columns]
+        includes = [column for column in needed if column.lower() not in clustered_keys]
+        key_names = [column for column, _ in key]
+        if usage.star:
+            if usable:
+                self.used.add(id(usable[0]))
+                return
+            includes = None
+        else:
+            widths = [table.width(column) for column in includes]
+            if None in widths or sum(widths) > self.max_include_bytes:
+                wide = ', '.join(column for column in includes
+                                 if table.width(column) is None or table.width(column) > 100)
+                self._note(f"{obj.name}: cobertura de {table.name} descartada por columnas anchas ({wide})")
+                if usable:
+                    self.used.add(id(usable[0]))
+                    return
+                includes = None
+
+        if usable:
+            # Las columnas de la clave propuesta que el índice no tiene también causan lookups
+            wanted = key_names + (includes or [])
+            best = max(usable, key=lambda index: (_prefix(index.key_columns, key_columns),
+                                                  -len(_missing(index, wanted, clustered_keys))))
+            self.used.add(id(best))
+            missing = _missing(best, wanted, clustered_keys)
+            if not missing:
+                return
+            if best.constraint:
+                self._note(f"{obj.name}: {table.name}.{best.label} es una restricción; "
+                           f"sin INCLUDE quedan lookups por {', '.join(missing)}")
+                return
+            suggestion = self.extend.setdefault(best.name.lower(), Suggestion(usage.table, best.keys, list(best.includes),
+                                                                              existing=best))
+            suggestion.merge(missing, obj)
+            return
+
+        suggestion = self.missing.setdefault((usage.table, tuple(key_columns)), Suggestion(usage.table, key, []))
+        suggestion.merge(includes or [], obj)
+
+    def _note(self, text):
+        if text not in self.notes:
+            self.notes.append(text)
+
+    def unused(self):
+        """CREATE INDEX que ninguna consulta de procedimientos o vistas usa"""
+        return [index for index in self.live
+                if not index.constraint and id(index) not in self.used]
+
+    def script(self):
+        """Script .sql con las sugerencias, comentado para revisión"""
+        tables = self.catalog.tables
+        files = ', '.join(os.path.basename(path) for path in self.catalog.paths)
+        queries = sum(len(obj.queries) for obj in self.objects)
+        lines = [
+            "-- =============================================",
+            "-- Sugerencias de índices (index_advisor.py)",
+            f"-- Scripts analizados: {files}",
+            f"-- {len(self.objects)} procedimientos/vistas/funciones, {queries} consultas, "
+            f"{len(self.catalog.indexes)} índices y restricciones",
+            "-- Revisar cada bloque antes de ejecutarlo: el análisis es estático y no",
+            "-- conoce la selectividad real ni las consultas ad hoc del dashboard",
+            "-- =============================================",
+            "",
+        ]
+
+        lines += _section("1. ÍNDICES REDUNDANTES (solo cuestan escrituras)", not self.redundant)
+        for index, other in self.redundant:
+            relation = "duplica" if index.key_columns == other.key_columns else "es prefijo de"
+            lines.append(f"-- {index.name} ({index.source}) {relation} {other.label} ({other.source})")
+            lines.append(f"DROP INDEX {index.name} ON {tables[index.table].name};")
+            lines.append("GO")
+            lines.append("")
+
+        lines += _section("2. ÍNDICES EXISTENTES SIN LAS COLUMNAS QUE LEEN LAS CONSULTAS", not self.extend)
+        for suggestion in self.extend.values():
+            index = suggestion.existing
+            lines.append(f"-- {index.name} ({index.source}): {_owners(suggestion)}")
+            lines.append(f"--   agrega INCLUDE ({', '.join(suggestion.includes[len(index.includes):])})")
+            unique = 'UNIQUE ' if index.unique else ''
+            lines.append(f"CREATE {unique}NONCLUSTERED INDEX {index.name} ON {tables[index.table].name} "
+                         f"({_key_sql(index.keys)})")
+            lines.append(f"    INCLUDE ({', '.join(suggestion.includes)})")
+            lines.append("    WITH (DROP_EXISTING = ON, ONLINE = ON);")
+            lines.append("GO")
+            lines.append("")
+
+        lines += _section("3. ÍNDICES DE COBERTURA FALTANTES", not self.missing)
+        for suggestion in self.missing.values():
+            table = tables[suggestion.table]
+            name = f"IX_{table.name.split('.')[-1]}_{'_'.join(column for column, _ in suggestion.keys)}"
+            lines.append(f"-- {_owners(suggestion)}")
+            lines.append(f"CREATE NONCLUSTERED INDEX {name} ON {table.name} ({_key_sql(suggestion.keys)})")
+            if suggestion.includes:
+                lines.append(f"    INCLUDE ({', '.join(suggestion.includes)})")
+            lines[-1] += ';'
+            lines.append("GO")
+            lines.append("")
+
+        unused = self.unused()
+        lines += _section("4. NOTAS (no se ejecuta nada)", not unused and not self.notes)
+        if unused:
+            lines.append("-- Índices que ningún procedimiento o vista usa: antes de quitarlos, confirmar")
+            lines.append("-- con sys.dm_db_index_usage_stats que el dashboard tampoco los lee")
+            for index in unused:
+                lines.append(f"--   {index.name} ON {tables[index.table].name} "
+                             f"({_key_sql(index.keys)}) ({index.source})")
+        for note in self.notes:
+            lines.append(f"-- {note}")
+        return '\n'.join(lines).rstrip() + '\n'
+
+
+def _prefix(index_keys, key_columns):
+    count = 0
+    for column in index_keys:
+        if column not in key_columns:
+            break
+        count += 1
+    return count
+
+
+def _missing(index, columns, clustered_keys):
+    covered = set(index.key_columns) | {column.lower() for column in index.includes} | clustered_keys
+    return [column for column in columns if column.lower() not in covered]
+
+
+def _key_sql(keys):
+    return ', '.join(f"{column} DESC" if desc else column for column, desc in keys)
+
+
+def _owners(suggestion):
+    return "usado por " + ', '.join(f"{obj.name} ({obj.source})" for obj in suggestion.owners)
+
+
+def _section(title, empty):
+    lines = ["-- =============================================", f"-- {title}",
+             "-- =============================================", ""]
+    if empty:
+        lines += ["-- (ninguno)", ""]
+    return lines
+
+
+def default_paths():
+    """Scripts de despliegue del proyecto, en orden"""
+    return sorted(glob.glob(os.path.join(DATABASE_DIR, DEFAULT_PATTERN)))
+
+
+def advise(paths=None, max_include_bytes=MAX_INCLUDE_BYTES):
+    """Analizar los scripts y devolver el IndexAdvisor con los resultados"""
+    catalog = SchemaCatalog().load(paths or default_paths())
+    return IndexAdvisor(catalog, max_include_bytes).run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sugerir índices a partir de los procedimientos y vistas")
+    parser.add_argument('paths', nargs='*', help="Scripts .sql (por defecto los NN_*.sql del proyecto)")
+    parser.add_argument('--output', help="Escribir el script en este archivo en lugar de la salida estándar")
+    parser.add_argument('--max-include-bytes', type=int, default=MAX_INCLUDE_BYTES,
+                        help="Ancho máximo por fila de las columnas INCLUDE de una cobertura")
+    # Desde proteia_db se llama sin argumentos: no leer sys.argv del CLI
+    args = parser.parse_args([] if argv is None else argv)
+
+    advisor = advise(args.paths, args.max_include_bytes)
+    script = advisor.script()
+    if not args.output:
+        sys.stdout.write(script)
+        return 0
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        file.write(script)
+    print(f"📝 Sugerencias escritas en {args.output}")
+    print(f"   🗑️  Índices redundantes: {len(advisor.redundant)}")
+    print(f"   ➕ Índices a ampliar con INCLUDE: {len(advisor.extend)}")
+    print(f"   🆕 Índices de cobertura faltantes: {len(advisor.missing)}")
+    print(f"   📋 Notas: {len(advisor.unused()) + len(advisor.notes)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Instrumentación del importador y de los scripts de mantenimiento
+Registra spans anidados (corrida -> etapa -> lote) con su duración, filas,
+bytes leídos (CSV) y enviados (cargas masivas), round-trips a la base,
+reintentos de lotes (y cuántos por throttling) y memoria residente (actual y pico del proceso). Los contadores de un span se
+suman a su padre al terminar, así que cada etapa reporta totales inclusivos.
+
+Exportación (IMPORT_CONFIG['metrics_dir']):
+- spans.jsonl: una línea JSON por span terminado, en orden de término
+- proteia_<corrida>.prom: formato de texto de Prometheus con la última
+  corrida y sus etapas, para el textfile collector de node_exporter
+
+Deshabilitada (por defecto), span() devuelve un span nulo sin costo.
+"""
+
+import contextlib
+import itertools
+import os
+import sys
+import threading
+import time
+
+from csv_streaming import current_rss_mb
+
+COUNTERS = ('rows', 'bytes_read', 'bytes_sent', 'round_trips', 'retries', 'throttles')
+
+JSONL_FILE = 'spans.jsonl'
+
+
+def peak_rss_mb():
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reporta bytes, Linux reporta KB
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Span:
+    """Intervalo medido con sus contadores; add() acumula filas, bytes o round-trips"""
+
+    def __init__(self, span_id, name, parent, run_id, attributes):
+        self.span_id = span_id
+        self.name = name
+        self.parent = parent
+        self.run_id = run_id
+        self.attributes = attributes
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.status = 'ok'
+        self.error = None
+        self.started_at = time.time()
+        self.seconds = None
+        self.rss_mb = None
+        self.peak_rss_mb = None
+        self._started = time.perf_counter()
+
+    def add(self, **counters):
+        for name, value in counters.items():
+            self.counters[name] += value
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+        self.rss_mb = current_rss_mb()
+        peak = peak_rss_mb()
+        # ru_maxrss y /proc/self/statm se miden distinto: el pico nunca queda bajo el actual
+        self.peak_rss_mb = max(peak, self.rss_mb or 0.0) if peak is not None else self.rss_mb
+
+    @property
+    def path(self):
+        span, names = self, []
+        while span is not None:
+            names.append(span.name)
+            span = span.parent
+        return '/'.join(reversed(names))
+
+    def record(self):
+        """Diccionario del span para la línea JSON"""
+        rows = self.counters['rows']
+        return dict({
+            'ts': round(self.started_at, 3),
+            'run_id': self.run_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'path': self.path,
+            'status': self.status,
+            'error': self.error,
+            'seconds': round(self.seconds, 6),
+            'rows_per_second': round(rows / self.seconds, 1) if rows and self.seconds else None,
+            'rss_mb': round(self.rss_mb, 1) if self.rss_mb is not None else None,
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+            'attributes': self.attributes,
+        }, **self.counters)
+
+
+class _NullSpan:
+    """Span de la instrumentación deshabilitada"""
+
+    status = 'ok'
+    error = None
+
+    def add(self, **counters):
+        pass
+
+    def __setattr__(self, name, value):
+        # Es un objeto compartido: status y error asignados por el llamador se descartan
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Instrumentation:
+    """Registro de spans del proceso (un solo objeto compartido: METRICS)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.spans = []
+        self._run = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jsonl = None
+
+    def configure(self, directory, trace=False):
+        """
+        Habilitar la instrumentación y exportar en directory (None la deshabilita)
+        Con trace=True los spans se registran aunque no se exporten (el perfilador
+        SQL los usa para saber qué etapa ejecutó cada sentencia)
+        """
+        self.enabled = bool(directory) or trace
+        self.directory = os.path.expanduser(directory) if directory else None
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """Span abierto en este hilo (o la corrida si el hilo no abrió ninguno)"""
+        stack = self._stack()
+        return stack[-1] if stack else self._run
+
+    def add(self, **counters):
+        """Sumar contadores al span actual"""
+        if not self.enabled:
+            return
+        span = self.current()
+        if span is not None:
+            with self._lock:
+                span.add(**counters)
+
+    def annotate(self, **attributes):
+        """Agregar atributos al span actual (p. ej. el tamaño de lote decidido)"""
+        if not self.enabled:
+            return
+        span = self.current()
+        if span is not None:
+            with self._lock:
+                span.attributes.update(attributes)
+
+    @contextlib.contextmanager
+    def attach(self, span):
+        """Abrir los spans de este hilo bajo span (trabajo repartido en un pool de hilos)"""
+        if not self.enabled or span is None:
+            yield
+            return
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def span(self, name, **attributes):
+        """Context manager que mide un span hijo del span actual de este hilo"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._measure(name, attributes)
+
+    @contextlib.contextmanager
+    def _measure(self, name, attributes):
+        parent = self.current()
+        span = Span(next(self._ids), name, parent,
+                    parent.run_id if parent else f"{name}-{int(time.time())}", attributes)
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = 'failed', str(e)
+            raise
+        finally:
+            stack.pop()
+            self._finish(span)
+
+    @contextlib.contextmanager
+    def run(self, name, **attributes):
+        """Span raíz de una corrida; al terminar escribe el archivo de Prometheus"""
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+        self.spans = []
+        span = None
+        try:
+            with self._measure(name, attributes) as span:
+                self._run = span
+                yield span
+        finally:
+            self._run = None
+            # También si la corrida falla: proteia_run_success=0 es lo que dispara la alerta
+            if span is not None and self.directory:
+                self.write_prometheus(span)
+
+    def _finish(self, span):
+        span.finish()
+        with self._lock:
+            if span.parent is not None:
+                span.parent.add(**span.counters)
+            self.spans.append(span)
+            if self.directory:
+                self._write_jsonl(span.record())
+
+    def _write_jsonl(self, record):
+        import json
+
+        if self._jsonl is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._jsonl = open(os.path.join(self.directory, JSONL_FILE), 'a', encoding='utf-8')
+        self._jsonl.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self._jsonl.flush()
+
+    def stage_spans(self, run_span):
+        """Spans hijos directos de la corrida (las etapas), agregados por nombre"""
+        stages = {}
+        for span in self.spans:
+            if span.parent is not run_span:
+                continue
+            stage = stages.setdefault(span.name, {'seconds': 0.0, 'ok': 1, 'peak_rss_mb': 0.0,
+                                                  **dict.fromkeys(COUNTERS, 0)})
+            stage['seconds'] += span.seconds
+            stage['ok'] = stage['ok'] and int(span.status == 'ok')
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'], span.peak_rss_mb or 0.0)
+            for counter in COUNTERS:
+                stage[counter] += span.counters[counter]
+        return stages
+
+    def prometheus_text(self, run_span):
+        """Métricas de la corrida y de cada etapa en formato de texto de Prometheus"""
+        run = _label(run_span.name)
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{{{labels}}} {round(value, 6) if isinstance(value, float) else value}")
+
+        run_labels = f'run="{run}"'
+        metric('proteia_run_duration_seconds', "Duración de la última corrida",
+               [(run_labels, run_span.seconds)])
+        metric('proteia_run_success', "1 si la última corrida terminó sin errores",
+               [(run_labels, int(run_span.status == 'ok'))])
+        metric('proteia_run_last_timestamp_seconds', "Fin de la última corrida (epoch)",
+               [(run_labels, round(run_span.started_at + run_span.seconds, 3))])
+        metric('proteia_run_peak_rss_bytes', "Pico de memoria residente del proceso",
+               [(run_labels, int((run_span.peak_rss_mb or 0) * 1024 * 1024))])
+        for counter in COUNTERS:
+            metric(f'proteia_run_{counter}', f"Total de {counter} de la última corrida",
+                   [(run_labels, run_span.counters[counter])])
+
+        stages = self.stage_spans(run_span)
+        samples = {name: [] for name in ('duration_seconds', 'success', 'rows_per_second', 'peak_rss_bytes')}
+        counter_samples = {counter: [] for counter in COUNTERS}
+        for stage, values in stages.items():
+            labels = f'{run_labels},stage="{_label(stage)}"'
+            samples['duration_seconds'].append((labels, values['seconds']))
+            samples['success'].append((labels, values['ok']))
+            rate = values['rows'] / values['seconds'] if values['rows'] and values['seconds'] else 0.0
+            samples['rows_per_second'].append((labels, rate))
+            samples['peak_rss_bytes'].append((labels, int(values['peak_rss_mb'] * 1024 * 1024)))
+            for counter in COUNTERS:
+                counter_samples[counter].append((labels, values[counter]))
+        if stages:
+            metric('proteia_stage_duration_seconds', "Duración de la etapa", samples['duration_seconds'])
+            metric('proteia_stage_success', "1 si la etapa terminó sin errores", samples['success'])
+            metric('proteia_stage_rows_per_second', "Filas por segundo de la etapa", samples['rows_per_second'])
+            metric('proteia_stage_peak_rss_bytes', "Pico de memoria del proceso al terminar la etapa",
+                   samples['peak_rss_bytes'])
+            for counter in COUNTERS:
+                metric(f'proteia_stage_{counter}', f"Total de {counter} de la etapa", counter_samples[counter])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, run_span):
+        """Escribir proteia_<corrida>.prom de forma atómica (el collector nunca lee un archivo a medias)"""
+        import re
+
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = 'proteia_' + re.sub(r'\W+', '_', run_span.name).strip('_') + '.prom'
+        path = os.path.join(self.directory, file_name)
+        partial = path + '.partial'
+        with open(partial, 'w', encoding='utf-8') as file:
+            file.write(self.prometheus_text(run_span))
+        os.replace(partial, path)
+        return path
+
+    def close(self):
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+def _label(value):
+    """Escapar un valor de etiqueta de Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class CountingCursor:
+    """Cursor DB-API que cuenta cada execute como un round-trip"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        METRICS.add(round_trips=1)
+        result = self._cursor.execute(*args, **kwargs)
+        # pyodbc devuelve el cursor para encadenar .fetchone()
+        return self if result is self._cursor else result
+
+    def executemany(self, *args, **kwargs):
+        METRICS.add(round_trips=1)
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """Conexión DB-API cuyos cursores cuentan round-trips (scripts de mantenimiento)"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def instrument_engine(engine):
+    """Contar como round-trip cada sentencia que SQLAlchemy envía por este engine"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        METRICS.add(round_trips=1)
+
+
+METRICS = Instrumentation()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Mapeo de columnas de Products_market.csv a la tabla Products
+Las columnas del CSV aparecen ya limpiadas con clean_column_name
+"""
+
+import hashlib
+
+# (columna CSV limpia, columna en Products, tipo SQL en Products)
+PRODUCT_COLUMNS = [
+    ('ASIN', 'ASIN', 'NVARCHAR(20)'),
+    ('Product_Name', 'ProductName', 'NVARCHAR(500)'),
+    ('Brand', 'Brand', 'NVARCHAR(100)'),
+    ('Category', 'Category', 'NVARCHAR(100)'),
+    ('Price', 'Price', 'DECIMAL(10,2)'),
+    ('Avg__Price_per_Mo', 'AvgPricePerMonth', 'DECIMAL(10,2)'),
+    ('Net_Margin', 'NetMargin', 'DECIMAL(5,2)'),
+    ('LQS', 'LQS', 'INT'),
+    ('Num_of_Reviews', 'ReviewCount', 'INT'),
+    ('Rating', 'Rating', 'DECIMAL(3,2)'),
+    ('Min__Price', 'MinPrice', 'DECIMAL(10,2)'),
+    ('Net', 'Net', 'DECIMAL(10,2)'),
+    ('FBA_Fees', 'FBAFees', 'DECIMAL(10,2)'),
+    ('Score_for_PL', 'ScoreForPL', 'INT'),
+    ('Score_for_Reselling', 'ScoreForReselling', 'INT'),
+    ('Num_of_Sellers', 'NumSellers', 'INT'),
+    ('Rank', 'Rank', 'INT'),
+    ('Avg__BSR_per_Mo', 'AvgBSRPerMonth', 'INT'),
+    ('Inventory', 'Inventory', 'INT'),
+    ('Est__Sales', 'EstSales', 'INT'),
+    ('Est__Revenue', 'EstRevenue', 'DECIMAL(15,2)'),
+    ('Page_Sales_Share', 'PageSalesShare', 'DECIMAL(5,4)'),
+    ('Page_Rev__Share', 'PageRevShare', 'DECIMAL(5,4)'),
+    ('Rev__per_Review', 'RevPerReview', 'DECIMAL(10,2)'),
+    ('Profit_Potential', 'ProfitPotential', 'DECIMAL(15,2)'),
+    ('Weight', 'Weight', 'DECIMAL(8,3)'),
+    ('Seller_Type', 'SellerType', 'NVARCHAR(20)'),
+    ('Variants', 'Variants', 'INT'),
+    ('URL', 'URL', 'NVARCHAR(500)'),
+    ('Cantidad_de_Búsquedas', 'SearchCount', 'INT'),
+    ('Término_de_Búsqueda', 'SearchTerm', 'NVARCHAR(200)'),
+    ('A+', 'HasAPlus', 'BIT'),
+    ('Available_from', 'AvailableFrom', 'DATE'),
+    ('Best_Seller_in_', 'BestSellerIn', 'NVARCHAR(200)'),
+]
+
+# Columnas que el CSV trae como porcentaje ("13.83%") y Products guarda como fracción
+PERCENT_COLUMNS = {'PageSalesShare', 'PageRevShare'}
+
+PRODUCT_KEY = 'ASIN'
+
+# Producto de referencia (Proteo50); no viene del CSV
+REFERENCE_ASIN = 'PROTEO50-REF'
+
+
+def csv_to_product_names():
+    """Diccionario columna CSV limpia -> columna de Products"""
+    return {csv_col: product_col for csv_col, product_col, _ in PRODUCT_COLUMNS}
+
+
+def product_column_types():
+    """Diccionario columna de Products -> tipo SQL"""
+    return {product_col: sql_type for _, product_col, sql_type in PRODUCT_COLUMNS}
+
+
+def unknown_asin(product_name):
+    """
+    Clave estable para productos sin ASIN
+    A diferencia de ROW_NUMBER() no cambia entre corridas ni con el orden del CSV
+    """
+    digest = hashlib.sha1(str(product_name).encode('utf-8')).hexdigest()
+    return 'UNK-' + digest[:16]
+
+
+def to_products_frame(chunk):
+    """
+    Seleccionar y renombrar las columnas del CSV a los nombres de Products
+    Descarta filas sin nombre y asigna claves UNK- a las que no traen ASIN
+    """
+    names = csv_to_product_names()
+    present = [col for col in names if col in chunk.columns]
+    frame = chunk[present].rename(columns=names)
+
+    frame = frame[frame['ProductName'].notna()].copy()
+    missing = frame[PRODUCT_KEY].isna() | (frame[PRODUCT_KEY].astype(str).str.strip() == '')
+    if missing.any():
+        frame.loc[missing, PRODUCT_KEY] = frame.loc[missing, 'ProductName'].map(unknown_asin)
+    frame[PRODUCT_KEY] = frame[PRODUCT_KEY].astype(str).str.strip()
+    return frame
+
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Resúmenes de mercado precalculados (MarketSummary) por marca, categoría y global
+Guardan agregados combinables (sumas, conteos, mínimos y máximos) en lugar de
+promedios, así que se pueden actualizar sumando el aporte de las filas nuevas
+y restando el de las anteriores. sp_GetMarketAnalysis y sp_GetBrandAnalysis
+leen de aquí (05_market_summary.sql) en lugar de agrupar Products en cada
+consulta del dashboard.
+
+MarketSummaryState guarda el aporte actual de cada producto (por ASIN); con
+él una actualización solo lee los productos modificados. Un mínimo o máximo
+que deja de ser válido obliga a recalcular ese grupo, y solo ese grupo.
+"""
+
+from sql_profiler import raw_connection
+
+STAGING_TABLE = 'temp_market_summary'
+KEYS_TABLE = 'temp_market_summary_keys'
+
+GLOBAL_KEY = '*'
+
+# Dimensión -> columna de Products por la que se agrupa (None: un solo grupo)
+DIMENSIONS = {
+    'brand': 'Brand',
+    'category': 'Category',
+    'global': None,
+}
+
+# Columnas de aporte por producto (MarketSummaryState) y su tipo SQL
+CONTRIBUTION_COLUMNS = [
+    ('ASIN', 'NVARCHAR(20)'),
+    ('Brand', 'NVARCHAR(100)'),
+    ('Category', 'NVARCHAR(100)'),
+    ('Price', 'DECIMAL(10,2)'),
+    ('Rating', 'DECIMAL(3,2)'),
+    ('EstRevenue', 'DECIMAL(15,2)'),
+    ('ReviewCount', 'INT'),
+    ('Protein', 'DECIMAL(5,2)'),
+]
+
+# Columnas agregadas de MarketSummary y su tipo SQL
+SUMMARY_COLUMNS = [
+    ('ProductCount', 'INT'),
+    ('PriceSum', 'DECIMAL(18,2)'),
+    ('PriceCount', 'INT'),
+    ('PositivePriceSum', 'DECIMAL(18,2)'),
+    ('PositivePriceCount', 'INT'),
+    ('PriceMin', 'DECIMAL(10,2)'),
+    ('PriceMax', 'DECIMAL(10,2)'),
+    ('RatingSum', 'DECIMAL(18,2)'),
+    ('RatingCount', 'INT'),
+    ('RevenueSum', 'DECIMAL(19,2)'),
+    ('RevenueCount', 'INT'),
+    ('ReviewSum', 'BIGINT'),
+    ('ReviewCount', 'INT'),
+    ('ProteinSum', 'DECIMAL(18,2)'),
+    ('ProteinCount', 'INT'),
+]
+
+SUMMARY_TABLES_SQL = """
+IF OBJECT_ID('MarketSummary', 'U') IS NULL
+BEGIN
+    CREATE TABLE MarketSummary (
+        Dimension NVARCHAR(20) NOT NULL,
+        DimensionKey NVARCHAR(100) NOT NULL,
+        {summary_columns},
+        UpdatedAt DATETIME2 DEFAULT GETDATE(),
+        CONSTRAINT PK_MarketSummary PRIMARY KEY (Dimension, DimensionKey)
+    );
+END;
+
+IF OBJECT_ID('MarketSummaryState', 'U') IS NULL
+BEGIN
+    CREATE TABLE MarketSummaryState (
+        {contribution_columns},
+        CONSTRAINT PK_MarketSummaryState PRIMARY KEY (ASIN)
+    );
+END;
+""".format(
+    summary_columns=',\n        '.join(
+        f"{column} {sql_type} {'NOT NULL' if column == 'ProductCount' else 'NULL'}"
+        for column, sql_type in SUMMARY_COLUMNS),
+    contribution_columns=',\n        '.join(
+        f"{column} {sql_type} {'NOT NULL' if column == 'ASIN' else 'NULL'}"
+        for column, sql_type in CONTRIBUTION_COLUMNS),
+)
+
+# Aporte actual de cada producto; la nutrición se reduce a una fila por producto
+CONTRIBUTIONS_SQL = """
+SELECT p.ASIN, p.Brand, p.Category, p.Price, p.Rating, p.EstRevenue, p.ReviewCount, n.Protein
+FROM Products p
+LEFT JOIN (
+    SELECT ProductId, MAX(Protein) AS Protein FROM NutritionalInfo GROUP BY ProductId
+) n ON n.ProductId = p.Id
+"""
+
+SUM_COLUMNS = ['ProductCount', 'PriceSum', 'PriceCount', 'PositivePriceSum', 'PositivePriceCount',
+               'RatingSum', 'RatingCount', 'RevenueSum', 'RevenueCount', 'ReviewSum', 'ReviewCount',
+               'ProteinSum', 'ProteinCount']
+
+
+def aggregate_sql(dimension, source='contributions'):
+    """SELECT con los agregados de una dimensión sobre el aporte de los productos"""
+    group_column = DIMENSIONS[dimension]
+    key = f"c.{group_column}" if group_column else f"'{GLOBAL_KEY}'"
+    select = f"""
+    SELECT
+        '{dimension}' AS Dimension,
+        {key} AS DimensionKey,
+        COUNT(*) AS ProductCount,
+        SUM(c.Price) AS PriceSum,
+        COUNT(c.Price) AS PriceCount,
+        SUM(CASE WHEN c.Price > 0 THEN c.Price END) AS PositivePriceSum,
+        COUNT(CASE WHEN c.Price > 0 THEN 1 END) AS PositivePriceCount,
+        MIN(c.Price) AS PriceMin,
+        MAX(c.Price) AS PriceMax,
+        SUM(c.Rating) AS RatingSum,
+        COUNT(c.Rating) AS RatingCount,
+        SUM(c.EstRevenue) AS RevenueSum,
+        COUNT(c.EstRevenue) AS RevenueCount,
+        SUM(CAST(c.ReviewCount AS BIGINT)) AS ReviewSum,
+        COUNT(c.ReviewCount) AS ReviewCount,
+        SUM(c.Protein) AS ProteinSum,
+        COUNT(c.Protein) AS ProteinCount
+    FROM ({CONTRIBUTIONS_SQL}) c
+    """
+    if group_column:
+        # Los productos sin marca o categoría solo cuentan en el global
+        select += f"    WHERE c.{group_column} IS NOT NULL\n"
+    if source == 'keys' and group_column:
+        # Solo los grupos listados en la tabla de claves
+        select += f"""
+        AND c.{group_column} IN (
+            SELECT DimensionKey FROM {KEYS_TABLE} WHERE Dimension = '{dimension}'
+        )
+    """
+    if group_column:
+        select += f"    GROUP BY c.{group_column}\n    HAVING COUNT(*) > 0\n"
+    return select
+
+
+def summarize(contributions, sign=1):
+    """
+    Agregados de un frame de aportes, con la misma semántica que aggregate_sql
+    sign=-1 niega sumas y conteos (aporte a restar); mínimo y máximo no se niegan
+    """
+    import pandas as pd
+
+    frame = contributions.copy()
+    price = pd.to_numeric(frame['Price'], errors='coerce')
+    positive = price.where(price > 0)
+    parts = pd.DataFrame({
+        'ProductCount': 1,
+        'PriceSum': price, 'PriceCount': price.notna().astype(int),
+        'PositivePriceSum': positive, 'PositivePriceCount': positive.notna().astype(int),
+        'PriceMin': price, 'PriceMax': price,
+    }, index=frame.index)
+    for source, prefix in (('Rating', 'Rating'), ('EstRevenue', 'Revenue'),
+                           ('ReviewCount', 'Review'), ('Protein', 'Protein')):
+        values = pd.to_numeric(frame[source], errors='coerce')
+        parts[f"{prefix}Sum"] = values
+        parts[f"{prefix}Count"] = values.notna().astype(int)
+
+    results = []
+    for dimension, group_column in DIMENSIONS.items():
+        keys = frame[group_column] if group_column else pd.Series(GLOBAL_KEY, index=frame.index)
+        valid = keys.notna()
+        if not valid.any():
+            continue
+        grouped = parts[valid].groupby(keys[valid].astype(str))
+        aggregated = grouped[SUM_COLUMNS].sum(min_count=0)
+        aggregated['PriceMin'] = grouped['PriceMin'].min()
+        aggregated['PriceMax'] = grouped['PriceMax'].max()
+        # SUM de SQL es NULL si no hubo valores: se conserva el conteo para distinguirlo
+        aggregated[SUM_COLUMNS] = aggregated[SUM_COLUMNS] * sign
+        aggregated.index.name = 'DimensionKey'
+        aggregated = aggregated.reset_index()
+        aggregated.insert(0, 'Dimension', dimension)
+        results.append(aggregated)
+
+    columns = ['Dimension', 'DimensionKey'] + [column for column, _ in SUMMARY_COLUMNS]
+    if not results:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(results, ignore_index=True)[columns]
+
+
+def _finalize(frame):
+    """SUM sin valores es NULL; redondear a la escala de las columnas"""
+    for prefix in ('Price', 'PositivePrice', 'Rating', 'Revenue', 'Review', 'Protein'):
+        frame[f"{prefix}Sum"] = frame[f"{prefix}Sum"].where(frame[f"{prefix}Count"] > 0)
+    for column, sql_type in SUMMARY_COLUMNS:
+        if sql_type.startswith('DECIMAL'):
+            frame[column] = frame[column].astype('float64').round(2)
+        else:
+            frame[column] = frame[column].round().astype('Int64')
+    return frame
+
+
+class MarketSummary:
+    """Mantener MarketSummary a partir de los productos modificados"""
+
+    def __init__(self, engine, bulk_loader):
+        self.engine = engine
+        self.bulk_loader = bulk_loader
+
+    def ensure_tables(self):
+        """Crear MarketSummary y MarketSummaryState si no existen"""
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            conn.execute(text(SUMMARY_TABLES_SQL))
+            conn.commit()
+
+    def _query(self, sql, params=None):
+        import pandas as pd
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(sql), conn, params=params)
+
+    def state_rows(self):
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM MarketSummaryState")).scalar()
+
+    def rebuild(self):
+        """Recalcular todo en el servidor (carga completa o primera corrida)"""
+        columns = ', '.join(column for column, _ in CONTRIBUTION_COLUMNS)
+        summary_columns = ', '.join(['Dimension', 'DimensionKey'] + [c for c, _ in SUMMARY_COLUMNS])
+        connection = raw_connection(self.engine)
+        try:
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM MarketSummary")
+            for dimension in DIMENSIONS:
+                cursor.execute(f"INSERT INTO MarketSummary ({summary_columns}) {aggregate_sql(dimension)}")
+            cursor.execute("DELETE FROM MarketSummaryState")
+            cursor.execute(f"INSERT INTO MarketSummaryState ({columns}) {CONTRIBUTIONS_SQL}")
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        return {'mode': 'full', 'products': self.state_rows(), 'groups': len(self.load_summary())}
+
+    def load_summary(self):
+        return self._query("SELECT * FROM MarketSummary")
+
+    def apply_changes(self, asins):
+        """
+        Actualizar los grupos tocados por los ASIN indicados (nuevos, modificados o borrados)
+        Devuelve {'mode', 'products', 'groups', 'recomputed'}
+        """
+        import pandas as pd
+
+        asins = sorted(set(asins))
+        counts = {'mode': 'incremental', 'products': len(asins), 'groups': 0, 'recomputed': 0}
+        if not asins:
+            return counts
+
+        contribution_names = [column for column, _ in CONTRIBUTION_COLUMNS]
+        summary_names = ['Dimension', 'DimensionKey'] + [column for column, _ in SUMMARY_COLUMNS]
+        keys = pd.DataFrame({'ASIN': asins})
+
+        connection = raw_connection(self.engine)
+        try:
+            cursor = connection.cursor()
+            self.bulk_loader.load(connection, f"{KEYS_TABLE}_asins", keys, create=True,
+                                  column_types={'ASIN': 'NVARCHAR(20)'})
+
+            def fetch(sql):
+                cursor.execute(sql)
+                names = [column[0] for column in cursor.description]
+                return pd.DataFrame.from_records(cursor.fetchall(), columns=names)
+
+            old = fetch(f"""
+            SELECT {', '.join(contribution_names)} FROM MarketSummaryState
+            WHERE ASIN IN (SELECT ASIN FROM {KEYS_TABLE}_asins)
+            """)
+            new = fetch(f"""
+            SELECT c.* FROM ({CONTRIBUTIONS_SQL}) c
+            WHERE c.ASIN IN (SELECT ASIN FROM {KEYS_TABLE}_asins)
+            """)
+
+            added = summarize(new)
+            removed = summarize(old, sign=-1)
+            touched = pd.concat([added[['Dimension', 'DimensionKey']],
+                                 removed[['Dimension', 'DimensionKey']]]).drop_duplicates()
+            counts['groups'] = len(touched)
+
+            # Resumen actual de los grupos tocados
+            self.bulk_loader.load(connection, KEYS_TABLE, touched, create=True,
+                                  column_types={'Dimension': 'NVARCHAR(20)', 'DimensionKey': 'NVARCHAR(100)'})
+            current = fetch(f"""
+            SELECT s.* FROM MarketSummary s
+            INNER JOIN {KEYS_TABLE} k ON k.Dimension = s.Dimension AND k.DimensionKey = s.DimensionKey
+            """)
+            current = current.reindex(columns=summary_names)
+
+            merged = self._merge(current, added, removed, touched)
+            dirty = merged['Dirty']
+            counts['recomputed'] = int(dirty.sum())
+
+            # Grupos limpios: combinación directa; grupos con mín./máx. inválido: recálculo
+            clean = _finalize(merged[~dirty & (merged['ProductCount'] > 0)][summary_names].copy())
+            dirty_keys = merged[dirty][['Dimension', 'DimensionKey']]
+
+            # Primero actualizar el estado: el recálculo de grupos lee Products, no el estado
+            cursor.execute(f"DELETE FROM MarketSummaryState WHERE ASIN IN (SELECT ASIN FROM {KEYS_TABLE}_asins)")
+            if not new.empty:
+                state = new[contribution_names]
+                self.bulk_loader.load(connection, f"{STAGING_TABLE}_state", state, create=True,
+                                      column_types=dict(CONTRIBUTION_COLUMNS))
+                cursor.execute(f"""
+                INSERT INTO MarketSummaryState ({', '.join(contribution_names)})
+                SELECT {', '.join(contribution_names)} FROM {STAGING_TABLE}_state
+                """)
+                cursor.execute(f"DROP TABLE {STAGING_TABLE}_state")
+
+            cursor.execute(f"""
+            DELETE FROM MarketSummary
+            WHERE EXISTS (
+                SELECT 1 FROM {KEYS_TABLE} k
+                WHERE k.Dimension = MarketSummary.Dimension AND k.DimensionKey = MarketSummary.DimensionKey
+            )
+            """)
+            if not clean.empty:
+                self.bulk_loader.load(connection, STAGING_TABLE, clean, create=True,
+                                      column_types=dict([('Dimension', 'NVARCHAR(20)'),
+                                                         ('DimensionKey', 'NVARCHAR(100)')] + SUMMARY_COLUMNS))
+                cursor.execute(f"""
+                INSERT INTO MarketSummary ({', '.join(summary_names)})
+                SELECT {', '.join(summary_names)} FROM {STAGING_TABLE}
+                """)
+                cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+
+            if not dirty_keys.empty:
+                self.bulk_loader.load(connection, KEYS_TABLE, dirty_keys, create=True,
+                                      column_types={'Dimension': 'NVARCHAR(20)', 'DimensionKey': 'NVARCHAR(100)'})
+                for dimension in dirty_keys['Dimension'].unique():
+                    cursor.execute(f"INSERT INTO MarketSummary ({', '.join(summary_names)}) "
+                                   f"{aggregate_sql(dimension, source='keys')}")
+
+            cursor.execute(f"DROP TABLE {KEYS_TABLE}")
+            cursor.execute(f"DROP TABLE {KEYS_TABLE}_asins")
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        return counts
+
+    @staticmethod
+    def _merge(current, added, removed, touched):
+        """
+        Resumen actual + aporte nuevo - aporte anterior por grupo
+        Dirty marca los grupos cuyo mínimo o máximo salió con una fila quitada
+        """
+        import pandas as pd
+
+        keys = ['Dimension', 'DimensionKey']
+        base = touched.merge(current, on=keys, how='left')
+        plus = touched.merge(added, on=keys, how='left')
+        minus = touched.merge(removed, on=keys, how='left')
+
+        merged = base[keys].copy()
+        for column in SUM_COLUMNS:
+            merged[column] = (pd.to_numeric(base[column]).fillna(0)
+                              + pd.to_numeric(plus[column]).fillna(0)
+                              + pd.to_numeric(minus[column]).fillna(0))
+
+        current_min = pd.to_numeric(base['PriceMin'])
+        current_max = pd.to_numeric(base['PriceMax'])
+        merged['PriceMin'] = pd.concat([current_min, pd.to_numeric(plus['PriceMin'])], axis=1).min(axis=1)
+        merged['PriceMax'] = pd.concat([current_max, pd.to_numeric(plus['PriceMax'])], axis=1).max(axis=1)
+
+        # Un precio quitado igual al mínimo o máximo vigente deja el extremo desconocido
+        removed_min = pd.to_numeric(minus['PriceMin'])
+        removed_max = pd.to_numeric(minus['PriceMax'])
+        merged['Dirty'] = ((removed_min.notna() & (removed_min <= current_min))
+                           | (removed_max.notna() & (removed_max >= current_max)))
+        # Un aporte a restar de un grupo ausente del resumen: recalcular ese grupo
+        merged['Dirty'] |= base['ProductCount'].isna() & minus['ProductCount'].notna()
+        merged['Dirty'] &= merged['ProductCount'] > 0
+        return merged
+
+    def check(self, tolerance=0.01):
+        """
+        Comparar MarketSummary con un recálculo completo
+        Devuelve [(dimensión, clave, columna, guardado, esperado)] con las diferencias
+        """
+        import pandas as pd
+
+        expected = pd.concat([self._query(aggregate_sql(dimension)) for dimension in DIMENSIONS],
+                             ignore_index=True)
+        stored = self.load_summary()
+        keys = ['Dimension', 'DimensionKey']
+        merged = expected.merge(stored, on=keys, how='outer', suffixes=('_expected', '_stored'),
+                                indicator=True)
+
+        mismatches = []
+        for _, row in merged.iterrows():
+            if row['_merge'] != 'both':
+                side = 'falta en el resumen' if row['_merge'] == 'left_only' else 'sobra en el resumen'
+                mismatches.append((row['Dimension'], row['DimensionKey'], '*', side, None))
+                continue
+            for column, _ in SUMMARY_COLUMNS:
+                stored_value = row[f"{column}_stored"]
+                expected_value = row[f"{column}_expected"]
+                if pd.isna(stored_value) and pd.isna(expected_value):
+                    continue
+                if pd.isna(stored_value) or pd.isna(expected_value) or \
+                        abs(float(stored_value) - float(expected_value)) > tolerance:
+                    mismatches.append((row['Dimension'], row['DimensionKey'], column,
+                                       stored_value, expected_value))
+        return mismatches
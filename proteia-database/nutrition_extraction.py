@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Extracción de NutritionalInfo desde la columna Nutritional_Values
+El texto libre de Selected_Products_AI.csv ("Proteína: 19%; Grasas: 13%")
+se procesa en bloque con una expresión regular compilada sobre toda la
+columna (str.extractall). Las etiquetas se comparan sin acentos ni
+mayúsculas y los valores se convierten a la unidad de cada columna.
+
+Las filas extraídas se cargan en una tabla de staging y se aplican a
+NutritionalInfo con un único INSERT ... SELECT por ASIN.
+"""
+
+import re
+import unicodedata
+
+from sql_profiler import raw_connection
+from type_coercion import parse_decimal
+
+STAGING_TABLE = 'temp_nutritional_info'
+
+# (columna de NutritionalInfo, tipo SQL, unidad en la que se guarda)
+NUTRITION_COLUMNS = [
+    ('Energy', 'DECIMAL(8,2)', 'kcal'),
+    ('Protein', 'DECIMAL(5,2)', 'g'),
+    ('TotalFat', 'DECIMAL(5,2)', 'g'),
+    ('SaturatedFat', 'DECIMAL(5,2)', 'g'),
+    ('TransFat', 'DECIMAL(5,2)', 'mg'),
+    ('Carbohydrates', 'DECIMAL(5,2)', 'g'),
+    ('Sugars', 'DECIMAL(5,2)', 'g'),
+    ('AddedSugars', 'DECIMAL(5,2)', 'g'),
+    ('DietaryFiber', 'DECIMAL(5,2)', 'g'),
+    ('Sodium', 'DECIMAL(8,2)', 'mg'),
+    ('Potassium', 'DECIMAL(8,2)', 'mg'),
+    ('Calcium', 'DECIMAL(8,2)', 'mg'),
+    ('Iron', 'DECIMAL(8,2)', 'mg'),
+    ('Phosphorus', 'DECIMAL(8,2)', 'mg'),
+    ('Polyalcohols', 'DECIMAL(5,2)', 'g'),
+]
+
+# Etiquetas normalizadas (sin acentos, minúsculas) -> columna de NutritionalInfo
+# "Carbohidratos netos" no se mapea: no equivale a carbohidratos totales
+LABELS = {
+    'calorias': 'Energy', 'energia': 'Energy', 'valor energetico': 'Energy', 'calories': 'Energy',
+    'proteina': 'Protein', 'proteinas': 'Protein', 'protein': 'Protein',
+    'grasa': 'TotalFat', 'grasas': 'TotalFat', 'grasa total': 'TotalFat', 'grasas totales': 'TotalFat',
+    'fat': 'TotalFat', 'total fat': 'TotalFat',
+    'grasa saturada': 'SaturatedFat', 'grasas saturadas': 'SaturatedFat', 'saturated fat': 'SaturatedFat',
+    'grasa trans': 'TransFat', 'grasas trans': 'TransFat', 'trans fat': 'TransFat',
+    'carbohidratos': 'Carbohydrates', 'carbohidratos totales': 'Carbohydrates',
+    'hidratos de carbono': 'Carbohydrates', 'carbohydrates': 'Carbohydrates',
+    'azucar': 'Sugars', 'azucares': 'Sugars', 'azucares totales': 'Sugars', 'sugar': 'Sugars', 'sugars': 'Sugars',
+    'azucares anadidos': 'AddedSugars', 'azucar anadida': 'AddedSugars', 'added sugars': 'AddedSugars',
+    'fibra': 'DietaryFiber', 'fibra dietetica': 'DietaryFiber', 'fiber': 'DietaryFiber',
+    'sodio': 'Sodium', 'sodium': 'Sodium',
+    'potasio': 'Potassium', 'potassium': 'Potassium',
+    'calcio': 'Calcium', 'calcium': 'Calcium',
+    'hierro': 'Iron', 'iron': 'Iron',
+    'fosforo': 'Phosphorus', 'phosphorus': 'Phosphorus',
+    'polialcoholes': 'Polyalcohols', 'alcoholes de azucar': 'Polyalcohols', 'sugar alcohols': 'Polyalcohols',
+}
+
+# Factores a la unidad base de cada familia (g para masa, kcal para energía).
+# Un porcentaje en un análisis garantizado equivale a g por 100 g
+MASS_UNITS = {'g': 1.0, '%': 1.0, 'mg': 1e-3, 'mcg': 1e-6, 'µg': 1e-6, 'ug': 1e-6}
+ENERGY_UNITS = {'kcal': 1.0, 'cal': 1.0, 'kj': 1 / 4.184}
+
+# "Etiqueta: [menos de|<] valor [unidad]" entre separadores ; o ,
+# Los valores acotados ("<1g", "menos de 1g") se guardan con su cota
+NUTRIENT_PATTERN = re.compile(
+    r'(?P<label>[^:;,]+?)\s*:\s*'
+    r'(?:menos de|less than|<|>|~)?\s*'
+    r'(?P<value>\d+(?:[.,]\d+)?)\s*'
+    r'(?P<unit>kcal|kj|mcg|µg|ug|mg|g|%|cal)?(?![a-z])',
+    re.IGNORECASE
+)
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_label(label):
+    """Etiqueta sin acentos, en minúsculas y con espacios simples"""
+    decomposed = unicodedata.normalize('NFKD', str(label))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _SPACES.sub(' ', stripped).strip().lower()
+
+
+def _target_units():
+    return {column: unit for column, _, unit in NUTRITION_COLUMNS}
+
+
+def _conversion_factor(unit, target):
+    """Factor para llevar un valor de unit a la unidad target (NaN si no son compatibles)"""
+    if target == 'kcal':
+        return ENERGY_UNITS.get(unit or 'kcal', float('nan'))
+    # Sin unidad se asume la unidad de la columna (p. ej. "Sodio: 50")
+    if not unit:
+        return 1.0
+    source = MASS_UNITS.get(unit)
+    if source is None:
+        return float('nan')
+    return source / MASS_UNITS[target]
+
+
+def extract_nutrition(frame, text_column='Nutritional_Values', key_column='ASIN'):
+    """
+    Frame con key_column y una columna por nutriente reconocido
+    Cada fila del resultado es un producto con al menos un valor extraído;
+    si una etiqueta aparece dos veces se conserva la primera.
+    """
+    import pandas as pd
+
+    columns = [column for column, _, _ in NUTRITION_COLUMNS]
+    empty = pd.DataFrame(columns=[key_column] + columns)
+    if frame.empty or text_column not in frame.columns:
+        return empty
+
+    source = frame[[key_column, text_column]].dropna()
+    source = source[source[key_column].astype(str).str.strip() != '']
+    matches = source[text_column].astype(str).str.extractall(NUTRIENT_PATTERN)
+    if matches.empty:
+        return empty
+
+    # Normalizar solo las etiquetas distintas y mapear el resultado a todas las filas
+    labels = matches['label'].unique()
+    label_columns = {label: LABELS.get(normalize_label(label)) for label in labels}
+    matches['column'] = matches['label'].map(label_columns)
+    matches = matches[matches['column'].notna()]
+    if matches.empty:
+        return empty
+
+    units = matches['unit'].fillna('').str.lower()
+    targets = matches['column'].map(_target_units())
+    pairs = pd.Series(list(zip(units, targets)), index=matches.index)
+    factors = pairs.map({pair: _conversion_factor(*pair) for pair in pairs.unique()})
+    values = pd.to_numeric(matches['value'].str.replace(',', '.', regex=False), errors='coerce')
+    matches['amount'] = values * factors
+
+    # Primera aparición de cada nutriente por fila de origen -> una columna por nutriente
+    matches.index.names = ['row', 'match']
+    matches = matches[matches['amount'].notna()].reset_index().sort_values(['row', 'match'])
+    matches = matches.drop_duplicates(subset=['row', 'column'], keep='first')
+    wide = matches.pivot(index='row', columns='column', values='amount')
+
+    result = wide.reindex(columns=columns)
+    result.columns.name = None
+    for column, sql_type, _ in NUTRITION_COLUMNS:
+        precision, scale = (int(part) for part in re.findall(r'\d+', sql_type))
+        result[column] = parse_decimal(result[column], precision, scale)
+
+    result.insert(0, key_column, source.loc[result.index, key_column].astype(str).str.strip())
+    result = result.dropna(subset=columns, how='all')
+    return result.drop_duplicates(subset=key_column, keep='first').reset_index(drop=True)
+
+
+def nutrition_column_types(key_column='ASIN'):
+    """Tipos SQL de la tabla de staging"""
+    types = {column: sql_type for column, sql_type, _ in NUTRITION_COLUMNS}
+    types[key_column] = 'NVARCHAR(20)'
+    return types
+
+
+class NutritionLoader:
+    """Reemplazar NutritionalInfo de los productos del CSV con los valores extraídos"""
+
+    def __init__(self, engine, bulk_loader):
+        self.engine = engine
+        self.bulk_loader = bulk_loader
+
+    def apply_sql(self):
+        """Borrar la fila previa de cada producto extraído e insertar la nueva en bloque"""
+        columns = ', '.join(column for column, _, _ in NUTRITION_COLUMNS)
+        source_columns = ', '.join(f"s.{column}" for column, _, _ in NUTRITION_COLUMNS)
+        delete_sql = f"""
+        DELETE FROM NutritionalInfo
+        WHERE ProductId IN (
+            SELECT p.Id FROM Products p INNER JOIN {STAGING_TABLE} s ON p.ASIN = s.ASIN
+        )
+        """
+        insert_sql = f"""
+        INSERT INTO NutritionalInfo (ProductId, {columns})
+        SELECT p.Id, {source_columns}
+        FROM {STAGING_TABLE} s
+        INNER JOIN Products p ON p.ASIN = s.ASIN
+        """
+        return delete_sql, insert_sql
+
+    def load(self, nutrition):
+        """
+        Aplicar el frame de extract_nutrition en una sola transacción
+        Devuelve {'extracted', 'replaced', 'inserted'}
+        """
+        counts = {'extracted': len(nutrition), 'replaced': 0, 'inserted': 0}
+        if nutrition.empty:
+            return counts
+
+        delete_sql, insert_sql = self.apply_sql()
+        connection = raw_connection(self.engine)
+        try:
+            self.bulk_loader.load(connection, STAGING_TABLE, nutrition, create=True,
+                                  column_types=nutrition_column_types())
+            cursor = connection.cursor()
+            cursor.execute(delete_sql)
+            counts['replaced'] = max(cursor.rowcount, 0)
+            cursor.execute(insert_sql)
+            counts['inserted'] = max(cursor.rowcount, 0)
+            cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        return counts
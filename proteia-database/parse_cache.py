@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Caché en disco de CSV ya parseados y tipados
+Cada entrada se identifica por el hash del contenido del archivo, la tabla
+de destino y la versión del parser, y guarda los lotes ya convertidos como
+archivos Parquet (o pickle si pyarrow no está instalado). Las corridas
+repetidas y los dry-runs leen columnas tipadas sin volver a parsear el CSV.
+
+El tamaño total se limita con desalojo LRU (por fecha de último uso).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from instrumentation import METRICS
+
+# Subir cuando cambie la limpieza o la conversión de tipos de los CSV
+PARSER_VERSION = 1
+
+META_FILE = 'meta.json'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# (ruta, tamaño, mtime) -> hash: el caché y el estado del importador hashean los mismos archivos
+_digests = {}
+
+
+def file_digest(path):
+    """Hash BLAKE2b del contenido del archivo, leído por bloques"""
+    info = os.stat(path)
+    signature = (os.path.abspath(path), info.st_size, info.st_mtime_ns)
+    if signature in _digests:
+        return _digests[signature]
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    _digests[signature] = digest.hexdigest()
+    return _digests[signature]
+
+
+def _parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ParseCache:
+    """Caché LRU de lotes tipados por archivo fuente"""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        self.format = 'parquet' if _parquet_available() else 'pickle'
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes_read': 0, 'bytes_written': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, csv_path, table_name, schema=None):
+        """Clave de la entrada: contenido del CSV + tabla + versión del parser + esquema"""
+        parts = [file_digest(csv_path), table_name, str(PARSER_VERSION), self.format, repr(schema)]
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self.stats[counter] += amount
+
+    def get(self, key):
+        """
+        Lotes cacheados como generador de DataFrames, o None si no hay entrada
+        Un acierto actualiza la fecha de uso para el orden LRU
+        """
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            self._count('misses')
+            return None
+
+        with open(meta_path, encoding='utf-8') as file:
+            meta = json.load(file)
+        os.utime(meta_path)
+        self._count('hits')
+        return self._read_parts(entry, meta)
+
+    def _read_parts(self, entry, meta):
+        import pandas as pd
+
+        for part in meta['parts']:
+            path = os.path.join(entry, part)
+            size = os.path.getsize(path)
+            self._count('bytes_read', size)
+            METRICS.add(bytes_read=size)
+            if meta['format'] == 'parquet':
+                yield pd.read_parquet(path)
+            else:
+                yield pd.read_pickle(path)
+
+    def write_through(self, key, frames):
+        """
+        Devolver los mismos lotes mientras se guardan en el caché
+        La entrada solo se publica si el generador se consume completo
+        """
+        entry = self._entry_dir(key)
+        staging = f"{entry}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(staging, exist_ok=True)
+        parts = []
+        rows = 0
+        completed = False
+
+        try:
+            for index, frame in enumerate(frames):
+                extension = 'parquet' if self.format == 'parquet' else 'pkl'
+                name = f"part-{index:05d}.{extension}"
+                path = os.path.join(staging, name)
+                if self.format == 'parquet':
+                    frame.to_parquet(path, index=False)
+                else:
+                    frame.to_pickle(path)
+                self._count('bytes_written', os.path.getsize(path))
+                parts.append(name)
+                rows += len(frame)
+                yield frame
+            completed = True
+        finally:
+            if completed:
+                self._publish(staging, entry, {
+                    'format': self.format,
+                    'parser_version': PARSER_VERSION,
+                    'parts': parts,
+                    'rows': rows,
+                    'created': time.time(),
+                })
+            else:
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def _publish(self, staging, entry, meta):
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        if os.path.exists(entry):
+            # Otro proceso publicó la misma entrada primero
+            shutil.rmtree(staging, ignore_errors=True)
+        else:
+            os.replace(staging, entry)
+        self.evict()
+
+    def _entries(self):
+        """Entradas publicadas con su tamaño y fecha de último uso"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry, META_FILE)
+            if '.tmp-' in name or not os.path.exists(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(meta_path), size, entry))
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Borrar las entradas usadas hace más tiempo hasta respetar max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self._count('evictions')
+
+    def frames(self, key, parse):
+        """
+        Lotes de la entrada si existe; si no, parse() y guardar el resultado
+        parse es una función sin argumentos que devuelve un iterable de DataFrames
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        return self.write_through(key, parse())
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
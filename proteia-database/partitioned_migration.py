@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Migración particionada de una tabla de staging a su tabla final
+Un solo INSERT ... SELECT de toda la staging es una transacción enorme: el
+log crece con la tabla y SQL Server escala los bloqueos de fila a un bloqueo
+de Products durante minutos. Aquí la staging se divide en rangos contiguos de
+la clave (NTILE sobre un índice de staging) de partition_rows filas como
+máximo, que se insertan en paralelo por varias conexiones del pool, cada uno
+en su propia transacción corta:
+
+- Rangos de la clave: cada partición escribe en otra zona del índice único
+  de la tabla final, así las sesiones casi no compiten por las mismas páginas
+- partition_rows queda bajo el umbral de escalamiento de bloqueos de SQL
+  Server (5.000 por sentencia): ninguna partición bloquea la tabla completa
+- Cada partición es un upsert idempotente: actualiza las claves que ya están
+  en la tabla final y cuyo contenido cambió (comparación NULL-safe con
+  EXCEPT) e inserta las que faltan (NOT EXISTS). Un reintento o una corrida
+  repetida no duplica filas, y un CSV con precios nuevos sí se aplica
+- Las claves que cada partición va a escribir se leen en su misma
+  transacción (changed_keys): el llamador actualiza solo lo que cambió
+  (p. ej. MarketSummary) en lugar de recalcular toda la tabla
+- Los errores transitorios (throttling, conexión caída, "database is locked")
+  se reintentan por partición con la política de adaptive_loader
+"""
+
+import math
+import threading
+import time
+
+from adaptive_loader import RetryPolicy, classify_error
+from bulk_loader import quote_identifier
+from instrumentation import METRICS
+
+# Líneas de progreso por migración (aprox. una cada 10% de las particiones)
+PROGRESS_STEPS = 10
+
+
+class PartitionedMigration:
+    """INSERT ... SELECT de source a target por rangos de key en paralelo"""
+
+    def __init__(self, engine, source, target, columns, key, where=None,
+                 partition_rows=4000, max_workers=4, retry=None, touch=None):
+        self.engine = engine
+        self.source = source
+        self.target = target
+        self.columns = list(columns)
+        self.key = key
+        self.where = where  # Condición sobre la staging (alias s)
+        self.touch = touch  # Columna de la tabla final que se fija en la hora actual al actualizar
+        self.partition_rows = max(1, partition_rows)
+        self.max_workers = max(1, max_workers)
+        self.retry = retry or RetryPolicy()
+        self.partitions = []
+        self.progress = {}  # índice -> {'rows', 'inserted', 'updated', 'attempts', 'seconds', 'status'}
+        self.changed_keys = set()  # Claves insertadas o actualizadas por las particiones confirmadas
+        self._lock = threading.Lock()
+        self._reported = 0
+
+    @property
+    def index_name(self):
+        return f"IX_{self.source}_{self.key}"
+
+    def ensure_source_index(self):
+        """Índice de la clave en staging: cada partición lee solo su rango"""
+        from sqlalchemy import inspect, text
+
+        with self.engine.connect() as conn:
+            # La etapa puede repetirse sin recargar la staging (reanudación): el índice ya existe
+            if any(index['name'] == self.index_name for index in inspect(conn).get_indexes(self.source)):
+                return
+            index, source, key = (quote_identifier(name) for name in (self.index_name, self.source, self.key))
+            conn.execute(text(f"CREATE INDEX {index} ON {source} ({key})"))
+            conn.commit()
+
+    def _filter(self):
+        return self.where or '1 = 1'
+
+    def plan(self):
+        """
+        Dividir la staging en rangos [low, high) de la clave
+        Un solo rango (sin límites) si la tabla cabe en una partición
+        """
+        from sqlalchemy import text
+
+        source, key = quote_identifier(self.source), quote_identifier(self.key)
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {source} s WHERE {self._filter()}")).scalar()
+            count = math.ceil(rows / self.partition_rows)
+            if count <= 1:
+                self.partitions = [(1, None, None, rows)] if rows else []
+                return self.partitions
+            # El límite inferior de cada rango es el primer valor de su NTILE: rangos
+            # contiguos y sin solapamiento aunque una clave se repita en dos grupos
+            bounds = conn.execute(text(f"""
+                SELECT Bucket, MIN({key}) AS LowKey, COUNT(*) AS BucketRows
+                FROM (
+                    SELECT s.{key}, NTILE({int(count)}) OVER (ORDER BY s.{key}) AS Bucket
+                    FROM {source} s
+                    WHERE {self._filter()}
+                ) AS buckets
+                GROUP BY Bucket
+                ORDER BY Bucket
+            """)).fetchall()
+        lows = [row[1] for row in bounds]
+        self.partitions = [
+            (row[0], lows[i] if i else None, lows[i + 1] if i + 1 < len(lows) else None, row[2])
+            for i, row in enumerate(bounds)
+        ]
+        return self.partitions
+
+    def _range(self, low, high):
+        """Condiciones del filtro y del rango [low, high) de la clave en la staging"""
+        key = quote_identifier(self.key)
+        conditions = [self._filter()]
+        if low is not None:
+            conditions.append(f"s.{key} >= :low")
+        if high is not None:
+            conditions.append(f"s.{key} < :high")
+        return conditions
+
+    def _differs(self, alias):
+        """La fila de staging s tiene contenido distinto de la fila alias de la tabla final"""
+        values = [quote_identifier(col) for col in self.columns if col != self.key]
+        # EXCEPT compara NULL con NULL como iguales: solo cuentan las filas que cambiaron
+        return (f"EXISTS (SELECT {', '.join(f's.{col}' for col in values)} "
+                f"EXCEPT SELECT {', '.join(f'{alias}.{col}' for col in values)})")
+
+    def keys_sql(self, low, high):
+        """Claves del rango que el upsert va a escribir: nuevas o con contenido distinto"""
+        target, key = quote_identifier(self.target), quote_identifier(self.key)
+        conditions = self._range(low, high)
+        conditions.append(f"(NOT EXISTS (SELECT 1 FROM {target} t WHERE t.{key} = s.{key}) "
+                          f"OR EXISTS (SELECT 1 FROM {target} t "
+                          f"WHERE t.{key} = s.{key} AND {self._differs('t')}))")
+        return f"""
+        SELECT DISTINCT s.{key}
+        FROM {quote_identifier(self.source)} s
+        WHERE {' AND '.join(conditions)}
+        """
+
+    def update_sql(self, low, high):
+        """UPDATE de las claves del rango que ya están en la tabla final con contenido distinto"""
+        target, key = quote_identifier(self.target), quote_identifier(self.key)
+        values = [col for col in self.columns if col != self.key]
+        assignments = [f"{quote_identifier(col)} = s.{quote_identifier(col)}" for col in values]
+        if self.touch:
+            # CURRENT_TIMESTAMP (no GETDATE) también corre en SQLite sin traducir
+            assignments.append(f"{quote_identifier(self.touch)} = CURRENT_TIMESTAMP")
+        conditions = self._range(low, high) + [f"{target}.{key} = s.{key}", self._differs(target)]
+        return f"""
+        UPDATE {target}
+        SET {', '.join(assignments)}
+        FROM {quote_identifier(self.source)} s
+        WHERE {' AND '.join(conditions)}
+        """
+
+    def insert_sql(self, low, high):
+        """INSERT idempotente de las claves del rango que faltan en la tabla final"""
+        column_list = ', '.join(quote_identifier(col) for col in self.columns)
+        select_list = ', '.join(f"s.{quote_identifier(col)}" for col in self.columns)
+        key = quote_identifier(self.key)
+        conditions = self._range(low, high)
+        conditions.append(f"NOT EXISTS (SELECT 1 FROM {quote_identifier(self.target)} t WHERE t.{key} = s.{key})")
+        return f"""
+        INSERT INTO {quote_identifier(self.target)} ({column_list})
+        SELECT {select_list}
+        FROM {quote_identifier(self.source)} s
+        WHERE {' AND '.join(conditions)}
+        """
+
+    def _upsert(self, keys_sql, update_sql, insert_sql, parameters):
+        """(actualizadas, insertadas, claves escritas) de una partición, en una transacción"""
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            keys = [row[0] for row in conn.execute(text(keys_sql), parameters)]
+            updated = conn.execute(text(update_sql), parameters).rowcount
+            inserted = conn.execute(text(insert_sql), parameters).rowcount
+            conn.commit()
+            return max(updated, 0), max(inserted, 0), keys
+
+    def _migrate(self, partition, parent):
+        """Migrar una partición con reintentos; devuelve las filas escritas"""
+        index, low, high, rows = partition
+        statements = self.keys_sql(low, high), self.update_sql(low, high), self.insert_sql(low, high)
+        parameters = {name: value for name, value in (('low', low), ('high', high)) if value is not None}
+        status = self.progress[index]
+        with METRICS.attach(parent), METRICS.span('partition', index=index, rows=rows):
+            started = time.perf_counter()
+            while True:
+                status['attempts'] += 1
+                try:
+                    updated, inserted, keys = self._upsert(*statements, parameters)
+                    break
+                except Exception as e:
+                    kind = classify_error(e)
+                    if kind is None or status['attempts'] > self.retry.max_retries:
+                        status['status'] = 'failed'
+                        raise
+                    METRICS.add(retries=1, throttles=int(kind == 'throttle'))
+                    seconds = self.retry.wait(status['attempts'] - 1, e)
+                    print(f"  ⏳ Partición {index} falló ({kind}); reintento "
+                          f"{status['attempts']}/{self.retry.max_retries} en {seconds:.1f}s")
+            METRICS.add(rows=updated + inserted)
+        with self._lock:
+            self.changed_keys.update(keys)
+        status.update(rows=updated + inserted, updated=updated, inserted=inserted,
+                      seconds=time.perf_counter() - started, status='ok')
+        self._report()
+        return updated + inserted
+
+    def _report(self):
+        """Línea de progreso cada ~10% de las particiones terminadas"""
+        with self._lock:
+            done = [status for status in self.progress.values() if status['status'] == 'ok']
+            total = len(self.progress)
+            step = max(1, math.ceil(total / PROGRESS_STEPS))
+            if len(done) < total and len(done) - self._reported < step:
+                return
+            self._reported = len(done)
+            rows = sum(status['rows'] for status in done)
+        print(f"  ▸ Particiones {len(done)}/{total} ({len(done) / total:.0%}), {rows:,} filas")
+
+    def run(self):
+        """
+        Migrar todas las particiones; devuelve {'inserted', 'updated', 'keys'}
+        (keys: claves insertadas o actualizadas, ordenadas)
+        Si alguna falla, las demás quedan confirmadas (sus claves en changed_keys)
+        y se lanza RuntimeError: repetir la migración solo escribe lo que falta o cambió
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        self.ensure_source_index()
+        partitions = self.plan()
+        self.progress = {index: {'rows': 0, 'inserted': 0, 'updated': 0, 'attempts': 0, 'seconds': 0.0,
+                                 'status': 'pending'}
+                         for index, _, _, _ in partitions}
+        self._reported = 0
+        self.changed_keys = set()
+        parent = METRICS.current()
+        failures = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(partitions), 1)),
+                                thread_name_prefix='partition') as executor:
+            futures = {executor.submit(self._migrate, partition, parent): partition[0]
+                       for partition in partitions}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failures.append((futures[future], e))
+        if failures:
+            index, error = min(failures, key=lambda failure: failure[0])
+            raise RuntimeError(f"{len(failures)} de {len(partitions)} particiones fallaron "
+                               f"(partición {index}: {error})")
+        counts = {name: sum(status[name] for status in self.progress.values()) for name in ('inserted', 'updated')}
+        counts['keys'] = sorted(self.changed_keys)
+        return counts
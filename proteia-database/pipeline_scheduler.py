@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Planificador de etapas del importador con dependencias declaradas
+Las etapas independientes (por ejemplo las cargas de CSV a staging) corren
+en paralelo sobre un pool de hilos acotado; cada etapa toma su propia
+conexión del pool compartido, así que el tiempo total tiende a la ruta
+crítica y no a la suma de todas las etapas.
+
+Con un PipelineState, las etapas que declaran sus entradas (inputs) se
+saltan si ya se completaron con las mismas entradas en una corrida previa.
+Cada etapa ejecutada se mide como un span de instrumentation.METRICS.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from instrumentation import METRICS
+from pipeline_state import input_hash
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+
+class Stage:
+    """
+    Unidad de trabajo: una función sin argumentos y las etapas de las que depende
+    Con blocking=False un fallo no impide correr a las etapas dependientes
+    (la dependencia solo fija el orden). inputs describe lo que determina el
+    resultado (hashes de archivos, configuración); sin inputs la etapa y las
+    que dependen de ella corren siempre. output_rows() cuenta las filas que
+    produjo, para registrarlas y comprobar que sigan ahí antes de saltarla.
+    """
+
+    def __init__(self, name, func, depends_on=(), blocking=True, inputs=None, output_rows=None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.blocking = blocking
+        self.inputs = inputs
+        self.output_rows = output_rows
+
+
+class StageResult:
+    """Resultado de una etapa con sus tiempos de inicio y fin"""
+
+    def __init__(self, name, status, started=None, finished=None, value=None, error=None, reused=False):
+        self.name = name
+        self.status = status
+        self.started = started
+        self.finished = finished
+        self.value = value
+        self.error = error
+        self.reused = reused
+
+    @property
+    def seconds(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class StageScheduler:
+    """Ejecutar etapas respetando dependencias con a lo sumo max_workers en paralelo"""
+
+    def __init__(self, max_workers=4, progress=print, state=None):
+        self.max_workers = max_workers
+        self.progress = progress
+        self.state = state
+        self.stages = {}
+        self.hashes = {}
+        self.reused = set()
+        self._print_lock = threading.Lock()
+
+    def add(self, name, func, depends_on=(), blocking=True, inputs=None, output_rows=None):
+        """Registrar una etapa; las dependencias pueden declararse antes o después"""
+        if name in self.stages:
+            raise ValueError(f"Etapa duplicada: {name}")
+        self.stages[name] = Stage(name, func, depends_on, blocking, inputs, output_rows)
+        return self.stages[name]
+
+    def validate(self):
+        """Verificar que las dependencias existan y no formen ciclos"""
+        for stage in self.stages.values():
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"La etapa {stage.name} depende de una etapa inexistente: {dependency}")
+
+        visiting, done = set(), set()
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependencia circular: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name, [])
+
+    def _log(self, message):
+        if self.progress:
+            with self._print_lock:
+                self.progress(message)
+
+    def stage_hash(self, stage):
+        """Hash de las entradas de la etapa y de sus dependencias (None si alguna no declara inputs)"""
+        if stage.inputs is None:
+            return None
+        dependency_hashes = [self.hashes.get(dependency) for dependency in stage.depends_on]
+        if any(value is None for value in dependency_hashes):
+            return None
+        return input_hash(stage.name, stage.inputs, *dependency_hashes)
+
+    def _can_reuse(self, stage, stage_hash):
+        """La etapa ya se completó con estas entradas y su salida sigue completa"""
+        if self.state is None or stage_hash is None:
+            return False
+        record = self.state.completed(stage.name, stage_hash)
+        if record is None:
+            return False
+        if stage.output_rows is None:
+            return True
+        try:
+            return stage.output_rows() == record['rows']
+        except Exception:
+            return False
+
+    def _run_stage(self, stage, stage_hash=None):
+        started = time.perf_counter()
+        with METRICS.span(stage.name, blocking=stage.blocking) as span:
+            try:
+                value = stage.func()
+            except Exception as e:
+                span.status, span.error = STATUS_FAILED, str(e)
+                result = StageResult(stage.name, STATUS_FAILED, started, time.perf_counter(), error=e)
+            else:
+                # Los métodos del importador reportan fallas devolviendo False
+                status = STATUS_FAILED if value is False else STATUS_OK
+                span.status = status
+                result = StageResult(stage.name, status, started, time.perf_counter(), value=value)
+        if self.state is not None and stage_hash is not None:
+            result = self._record(stage, stage_hash, result)
+        return result
+
+    def _record(self, stage, stage_hash, result):
+        rows = None
+        if result.status == STATUS_OK and stage.output_rows is not None:
+            try:
+                rows = stage.output_rows()
+            except Exception as e:
+                # Sin conteo no se puede validar la salida: la próxima corrida la repite
+                result = StageResult(stage.name, STATUS_FAILED, result.started, result.finished, error=e)
+        elif isinstance(result.value, int) and not isinstance(result.value, bool):
+            rows = result.value
+        self.state.record_stage(stage.name, stage_hash, result.status, rows, result.seconds, result.error)
+        return result
+
+    def run(self):
+        """
+        Ejecutar todas las etapas y devolver {nombre: StageResult}
+        Si una etapa falla, las que dependen de ella se marcan como omitidas
+        """
+        self.validate()
+        self.hashes, self.reused = {}, set()
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='proteia-stage') as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    dependency_results = [results.get(dep) for dep in stage.depends_on]
+                    if any(r is not None and r.status != STATUS_OK and self.stages[r.name].blocking
+                           for r in dependency_results):
+                        results[name] = StageResult(name, STATUS_SKIPPED)
+                        del pending[name]
+                        self._log(f"⏭️  {name}: omitida (falló una dependencia)")
+                    elif all(r is not None for r in dependency_results):
+                        del pending[name]
+                        self.hashes[name] = stage_hash = self.stage_hash(stage)
+                        if self._can_reuse(stage, stage_hash):
+                            results[name] = StageResult(name, STATUS_OK, value=True, reused=True)
+                            self.reused.add(name)
+                            self._log(f"↷ {name}: sin cambios desde la última corrida")
+                            continue
+                        self._log(f"▶️  {name}")
+                        running[executor.submit(self._run_stage, stage, stage_hash)] = name
+
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    results[running.pop(future)] = result
+                    if result.status == STATUS_OK:
+                        self._log(f"✓ {result.name} ({result.seconds:.2f}s)")
+                    else:
+                        detail = f": {result.error}" if result.error else ""
+                        self._log(f"✗ {result.name} ({result.seconds:.2f}s){detail}")
+
+        return results
+
+    def critical_path(self, results):
+        """Ruta de dependencias más larga según los tiempos medidos: (etapas, segundos)"""
+        longest = {}
+
+        def path_to(name):
+            if name not in longest:
+                best_path, best_seconds = [], 0.0
+                for dependency in self.stages[name].depends_on:
+                    path, seconds = path_to(dependency)
+                    if seconds > best_seconds:
+                        best_path, best_seconds = path, seconds
+                longest[name] = (best_path + [name], best_seconds + results[name].seconds)
+            return longest[name]
+
+        return max((path_to(name) for name in self.stages), key=lambda item: item[1], default=([], 0.0))
+
+    def summary(self, results, wall_seconds):
+        """Texto con tiempo total, suma de etapas y ruta crítica"""
+        total = sum(result.seconds for result in results.values())
+        path, path_seconds = self.critical_path(results)
+        reused = f" · {len(self.reused)} etapas sin cambios" if self.reused else ""
+        return (f"⏱️  Tiempo total {wall_seconds:.2f}s · suma de etapas {total:.2f}s · "
+                f"ruta crítica {path_seconds:.2f}s ({' → '.join(path)}){reused}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Estado del importador entre corridas (archivo SQLite local)
+Cada etapa completada se guarda con el hash de sus entradas (archivos,
+configuración y hashes de las etapas de las que depende) y sus filas. Al
+repetir la importación, las etapas cuyas entradas no cambiaron se saltan y
+la corrida retoma desde la etapa que falló.
+
+Las cargas a staging por lotes guardan además su avance: si la conexión se
+cae a mitad de un CSV, la siguiente corrida continúa desde las filas ya
+confirmadas en la tabla en lugar de empezar de cero.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS stages (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rows INTEGER,
+    seconds REAL,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (scope, name)
+);
+CREATE TABLE IF NOT EXISTS loads (
+    scope TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    chunks INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (scope, table_name)
+);
+"""
+
+
+def input_hash(*parts):
+    """Hash estable de las entradas de una etapa"""
+    return hashlib.sha1('|'.join(repr(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+class PipelineState:
+    """
+    Etapas completadas y cargas en curso de una base de datos (scope)
+    Es seguro usarlo desde los hilos del planificador
+    """
+
+    def __init__(self, path, scope=''):
+        self.path = os.path.expanduser(path)
+        self.scope = scope
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA_SQL)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._db:
+            return self._db.execute(sql, params).fetchall()
+
+    # ---- Etapas ----
+
+    def completed(self, name, stage_hash):
+        """Filas registradas si la etapa ya se completó con estas entradas; None si no"""
+        rows = self._execute(
+            "SELECT rows FROM stages WHERE scope = ? AND name = ? AND input_hash = ? AND status = 'ok'",
+            (self.scope, name, stage_hash))
+        if not rows:
+            return None
+        return {'rows': rows[0][0]}
+
+    def record_stage(self, name, stage_hash, status, rows=None, seconds=None, error=None):
+        self._execute(
+            "INSERT OR REPLACE INTO stages (scope, name, input_hash, status, rows, seconds, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.scope, name, stage_hash, status, rows, seconds,
+             str(error) if error is not None else None, time.time()))
+
+    def stages(self):
+        """Estado guardado de cada etapa: [(nombre, estado, filas, segundos, error)]"""
+        return self._execute(
+            "SELECT name, status, rows, seconds, error FROM stages WHERE scope = ? ORDER BY updated_at",
+            (self.scope,))
+
+    # ---- Cargas por lotes ----
+
+    def load_progress(self, table_name, load_hash):
+        """Filas y lotes confirmados de una carga en curso con estas entradas (None si no hay)"""
+        rows = self._execute(
+            "SELECT rows, chunks FROM loads WHERE scope = ? AND table_name = ? AND input_hash = ?",
+            (self.scope, table_name, load_hash))
+        if not rows:
+            return None
+        return {'rows': rows[0][0], 'chunks': rows[0][1]}
+
+    def record_load(self, table_name, load_hash, rows, chunks):
+        """Anotar el avance después de confirmar un lote"""
+        self._execute(
+            "INSERT OR REPLACE INTO loads (scope, table_name, input_hash, rows, chunks, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.scope, table_name, load_hash, rows, chunks, time.time()))
+
+    def finish_load(self, table_name):
+        self._execute("DELETE FROM loads WHERE scope = ? AND table_name = ?", (self.scope, table_name))
+
+    def reset(self):
+        """Olvidar todas las etapas y cargas de este scope"""
+        self._execute("DELETE FROM stages WHERE scope = ?", (self.scope,))
+        self._execute("DELETE FROM loads WHERE scope = ?", (self.scope,))
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Deduplicación de productos por ASIN y familias de variantes antes de cargar
+Products_market.csv trae ASIN repetidos (y filas sin ASIN con el mismo
+nombre, que reciben la misma clave UNK-) y muchas variantes casi idénticas
+del mismo producto (sabores y tamaños). Un ASIN repetido en staging rompe el
+UNIQUE de Products a mitad de la migración y la revierte completa.
+
+La deduplicación se hace en dos pasadas vectorizadas sobre los lotes ya
+tipados, así que funciona igual en modo streaming:
+1. plan(): por cada lote solo se guardan arreglos numéricos (hash de 64 bits
+   del ASIN, hash de la familia, ingresos y posición). El ganador de cada
+   grupo sale de un lexsort, sin recorrer filas en Python.
+2. apply(): los mismos lotes se filtran por posición global con la máscara
+   del plan (con caché de parseo la segunda lectura no vuelve a parsear).
+
+Reglas para un ASIN repetido (DEDUPE_RULES):
+- first: la primera aparición (comportamiento anterior de la sincronización)
+- latest: la última aparición en el archivo (la exportación más reciente)
+- highest_revenue: la de mayor EstRevenue (empate: la última)
+
+La familia de variantes es marca + nombre normalizado (sin acentos,
+paréntesis, tamaños, porciones ni sabores, primeras FAMILY_NAME_WORDS
+palabras). Con collapse_variants solo queda el ganador de cada familia,
+con la misma regla.
+"""
+
+from market_schema import PRODUCT_KEY
+
+DEDUPE_RULES = ('first', 'latest', 'highest_revenue')
+
+REVENUE_COLUMN = 'EstRevenue'
+
+# Palabras del nombre que identifican la familia
+FAMILY_NAME_WORDS = 6
+
+# Sabores frecuentes en el catálogo (ya sin acentos y en minúsculas)
+FLAVOR_WORDS = (
+    'chocolate', 'choco', 'doble', 'blanco', 'vainilla', 'vanilla', 'fresa', 'strawberry', 'moka', 'mocha',
+    'cafe', 'coffee', 'capuccino', 'cappuccino', 'blueberry', 'cookies', 'cream', 'galleta', 'natural',
+    'neutro', 'sin sabor', 'platano', 'banana', 'mango', 'coco', 'canela', 'cajeta', 'caramelo', 'caramel',
+    'mazapan', 'horchata', 'limon', 'naranja', 'frutos rojos', 'berry', 'bronze', 'menta',
+)
+
+# Tamaños, presentaciones y porciones: "1700g", "2 Lb", "60 Porciones", "10 Sobres"
+_SIZE_PATTERN = (r'\b\d+(?:[.,]\d+)?\s*(?:kg|kgs|g|gr|grs|gramos|lb|lbs|oz|ml|l|lt|litros?|piezas?|pzas?|'
+                 r'porciones|servicios|servings|sobres|capsulas|caps|tabletas|scoops)\b')
+_FLAVOR_PATTERN = r'\b(?:sabor\s+)?(?:' + '|'.join(FLAVOR_WORDS) + r')\b'
+
+_PAIR_SEPARATOR = '\x1f'
+
+
+def normalize_names(names):
+    """Nombres sin acentos, paréntesis, tamaños, sabores ni puntuación (vectorizado)"""
+    text = (names.astype('string').fillna('').str.lower()
+            .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii'))
+    text = text.str.replace(r'\([^)]*\)', ' ', regex=True)
+    text = text.str.replace(_SIZE_PATTERN, ' ', regex=True)
+    text = text.str.replace(r'\bsabor\b', ' ', regex=True)
+    text = text.str.replace(_FLAVOR_PATTERN, ' ', regex=True)
+    text = text.str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+    return text
+
+
+def _family_key_values(brands, names, words):
+    """Claves de familia de pares (marca, nombre) distintos"""
+    import pandas as pd
+
+    brand = normalize_names(brands)
+    name = normalize_names(names)
+    # Muchos nombres empiezan con la marca: se quita para que cuenten las palabras del producto
+    # (una operación vectorizada por marca, no por fila)
+    name = pd.concat([group.str.removeprefix(value).str.strip() if value else group
+                      for value, group in name.groupby(brand, sort=False)]).reindex(name.index)
+    name = name.str.split().str[:words].str.join(' ')
+    brand = brand.where(brand != '', name.str.split().str[0].fillna(''))
+    return brand.str.cat(name, sep='|')
+
+
+def family_keys(frame, words=FAMILY_NAME_WORDS):
+    """
+    Clave de familia de variantes: marca normalizada | primeras palabras del nombre
+    Se normaliza una vez cada par (marca, nombre) distinto y se reparte por sus códigos
+    """
+    import pandas as pd
+
+    brand = frame['Brand'] if 'Brand' in frame.columns else pd.Series('', index=frame.index)
+    pairs = brand.astype('string').fillna('').str.cat(frame['ProductName'].astype('string').fillna(''),
+                                                       sep=_PAIR_SEPARATOR)
+    codes, uniques = pd.factorize(pairs)
+    parts = pd.Series(uniques, dtype='string').str.split(_PAIR_SEPARATOR, n=1, expand=True)
+    if parts.empty:
+        return pd.Series([], index=frame.index, dtype='string')
+    keys = _family_key_values(parts[0], parts[1], words)
+    return pd.Series(keys.to_numpy()[codes], index=frame.index)
+
+
+def _hash(series):
+    """Hash de 64 bits por valor (tabla de hash de pandas, sin objetos por fila)"""
+    import pandas as pd
+
+    return pd.util.hash_array(series.astype('string').fillna('').to_numpy(dtype=object), categorize=True)
+
+
+def _winners(groups, priority, positions):
+    """Posición ganadora de cada grupo: mayor prioridad, luego la posición más alta"""
+    import numpy as np
+
+    if not len(groups):
+        return positions
+    order = np.lexsort((positions, priority, groups))
+    sorted_groups = groups[order]
+    last = np.append(sorted_groups[1:] != sorted_groups[:-1], True)
+    return positions[order[last]]
+
+
+class ProductDeduplicator:
+    """Plan de deduplicación por ASIN y familias sobre lotes de Products ya tipados"""
+
+    def __init__(self, rule='latest', collapse_variants=False):
+        if rule not in DEDUPE_RULES:
+            raise ValueError(f"Regla de deduplicación desconocida: {rule} (opciones: {', '.join(DEDUPE_RULES)})")
+        self.rule = rule
+        self.collapse_variants = collapse_variants
+        self.keep = None
+        self.stats = {}
+        self.families = {}  # hash de familia -> [clave, productos]
+
+    def _priority(self, revenue, positions):
+        import numpy as np
+
+        if self.rule == 'first':
+            return -positions
+        if self.rule == 'highest_revenue':
+            return np.nan_to_num(revenue, nan=-np.inf)
+        return np.zeros(len(positions))
+
+    def plan(self, frames):
+        """Primera pasada: decidir qué posiciones se conservan"""
+        import numpy as np
+        import pandas as pd
+
+        asins, families, revenues, labels = [], [], [], []
+        rows = 0
+        for frame in frames:
+            keys = family_keys(frame)
+            asins.append(_hash(frame[PRODUCT_KEY]))
+            families.append(_hash(keys))
+            revenue = frame[REVENUE_COLUMN] if REVENUE_COLUMN in frame.columns else pd.Series(np.nan, index=frame.index)
+            revenues.append(pd.to_numeric(revenue, errors='coerce').to_numpy(dtype='float64', na_value=np.nan))
+            labels.append(pd.DataFrame({'hash': families[-1], 'key': keys.to_numpy()}).drop_duplicates('hash'))
+            rows += len(frame)
+
+        asin = np.concatenate(asins) if asins else np.array([], dtype='uint64')
+        family = np.concatenate(families) if families else np.array([], dtype='uint64')
+        revenue = np.concatenate(revenues) if revenues else np.array([], dtype='float64')
+        positions = np.arange(rows)
+        priority = self._priority(revenue, positions)
+
+        keep = np.zeros(rows, dtype=bool)
+        keep[_winners(asin, priority, positions)] = True
+        unique_rows = int(keep.sum())
+
+        # Familias sobre los productos ya sin ASIN repetidos
+        family_ids, counts = np.unique(family[keep], return_counts=True)
+        if self.collapse_variants:
+            kept = positions[keep]
+            keep[:] = False
+            keep[_winners(family[kept], priority[kept], kept)] = True
+
+        label = pd.concat(labels, ignore_index=True).drop_duplicates('hash') if labels else None
+        multi = counts > 1
+        if label is not None and multi.any():
+            names = dict(zip(label['hash'], label['key']))
+            self.families = {int(h): [names.get(h, ''), int(c)] for h, c in zip(family_ids[multi], counts[multi])}
+
+        self.keep = keep
+        asin_counts = np.unique(asin, return_counts=True)[1]
+        self.stats = {
+            'rows': rows,
+            'kept': int(keep.sum()),
+            'duplicate_rows': rows - unique_rows,
+            'duplicate_asins': int((asin_counts > 1).sum()),
+            'families': int(multi.sum()),
+            'variant_products': int(counts[multi].sum()),
+            'collapsed': unique_rows - int(keep.sum()),
+        }
+        return self
+
+    def apply(self, frames):
+        """Segunda pasada: los mismos lotes, solo con las filas conservadas"""
+        if self.keep is None:
+            raise RuntimeError("apply() requiere un plan()")
+        offset = 0
+        for frame in frames:
+            mask = self.keep[offset:offset + len(frame)]
+            offset += len(frame)
+            if len(mask) != len(frame):
+                raise RuntimeError("Los lotes no coinciden con los del plan (el archivo cambió entre pasadas)")
+            if mask.all():
+                yield frame
+            elif mask.any():
+                yield frame[mask].reset_index(drop=True)
+        if offset != len(self.keep):
+            raise RuntimeError(f"El plan tiene {len(self.keep):,} filas y los lotes {offset:,}")
+
+    def frames(self, make_frames):
+        """Planear y aplicar; make_frames() devuelve un iterable nuevo de lotes en cada llamada"""
+        self.plan(make_frames())
+        return self.apply(make_frames())
+
+    def deduplicate(self, frame):
+        """Un solo DataFrame ya en memoria"""
+        self.plan([frame])
+        return next(self.apply([frame]), frame.iloc[0:0])
+
+    def largest_families(self, n=5):
+        """[(clave, productos)] de las familias con más variantes"""
+        return sorted((tuple(value) for value in self.families.values()), key=lambda item: -item[1])[:n]
+
+    def report(self):
+        """Resumen de una línea (más las familias principales) para los scripts"""
+        stats = self.stats
+        lines = [f"🧹 Deduplicación ({self.rule}): {stats['rows']:,} -> {stats['kept']:,} filas, "
+                 f"{stats['duplicate_rows']:,} repetidas de {stats['duplicate_asins']:,} ASIN; "
+                 f"{stats['families']:,} familias de variantes ({stats['variant_products']:,} productos)"]
+        if self.collapse_variants:
+            lines.append(f"   {stats['collapsed']:,} variantes colapsadas en su familia")
+        for key, count in self.largest_families(3):
+            lines.append(f"   👪 {count} variantes: {key}")
+        return '\n'.join(lines)
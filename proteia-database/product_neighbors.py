@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Índice precalculado de productos similares (top-k vecinos por producto)
+Cada producto se representa con un vector denso por bloques (nutrición,
+precio por peso, KeyLabels e IntendedSegment con hashing de palabras). Cada
+bloque se normaliza y se escala por la raíz de su peso, así que el producto
+punto entre dos vectores es la suma ponderada de los cosenos por bloque.
+
+Los k vecinos se calculan por bloques de filas y columnas (Q · Eᵀ), con lo
+que la memoria queda acotada por block_rows × block_cols y no por n².
+El índice se guarda en la tabla ProductNeighbors (clave ProductId, Rank:
+una búsqueda es un seek sobre la clave primaria) y opcionalmente en archivos
+.npy que se abren con memory-map.
+
+Con el directorio local, una actualización incremental solo recalcula los
+productos cuyos vectores cambiaron y los que los tenían (o ahora los tendrían)
+como vecinos.
+"""
+
+import os
+import zlib
+
+from similarity_scoring import BLOCK_WEIGHTS, FEATURE_SQL, NUTRITION_FEATURES, text_tokens
+from sql_profiler import raw_connection
+
+STAGING_TABLE = 'temp_product_neighbors'
+
+NEIGHBORS_TABLE_SQL = """
+IF OBJECT_ID('ProductNeighbors', 'U') IS NULL
+BEGIN
+    CREATE TABLE ProductNeighbors (
+        ProductId INT NOT NULL,
+        Rank TINYINT NOT NULL,
+        NeighborId INT NOT NULL,
+        Score DECIMAL(5,4) NOT NULL,
+        CONSTRAINT PK_ProductNeighbors PRIMARY KEY (ProductId, Rank)
+    );
+END
+"""
+
+# Dimensiones del hashing de palabras por bloque de texto
+HASH_DIMS = 32
+
+# Rango de log10(precio / peso) que se proyecta sobre un cuarto de círculo
+PRICE_LOG_RANGE = (-1.0, 4.0)
+
+INDEX_FILES = ('product_ids', 'embeddings', 'neighbor_ids', 'scores')
+
+
+def _token_block(series, dims):
+    """Bolsa de palabras con hashing (crc32 % dims), normalizada por fila"""
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    block = np.zeros((len(uniques) + 1, dims), dtype=np.float32)
+    for position, value in enumerate(uniques):
+        for token in text_tokens(value):
+            block[position, zlib.crc32(token.encode('utf-8')) % dims] = 1.0
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    np.divide(block, norms, out=block, where=norms > 0)
+    # El código -1 (nulo) toma la última fila, que queda en ceros
+    return block[codes]
+
+
+def _nutrition_block(features):
+    import numpy as np
+
+    columns = [column for column, _, _ in NUTRITION_FEATURES]
+    scales = np.array([scale for _, _, scale in NUTRITION_FEATURES])
+    weights = np.sqrt([weight for _, weight, _ in NUTRITION_FEATURES])
+    matrix = features[columns].to_numpy(dtype=np.float64, na_value=np.nan) / scales * weights
+    matrix = np.nan_to_num(matrix).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _price_block(features):
+    """Precio por peso como ángulo: el coseno entre dos productos decrece con la distancia en log"""
+    import numpy as np
+
+    price = features['Price'].to_numpy(dtype=np.float64, na_value=np.nan)
+    weight = features['Weight'].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_weight = np.log10(price / weight)
+    low, high = PRICE_LOG_RANGE
+    angle = (np.clip(per_weight, low, high) - low) / (high - low) * (np.pi / 2)
+    known = np.isfinite(angle)
+    block = np.zeros((len(features), 2), dtype=np.float32)
+    block[known, 0] = np.cos(angle[known])
+    block[known, 1] = np.sin(angle[known])
+    return block
+
+
+def build_embeddings(features, hash_dims=HASH_DIMS):
+    """Matriz float32 (n × d) con los bloques ya ponderados"""
+    import numpy as np
+
+    blocks = [
+        (_nutrition_block(features), BLOCK_WEIGHTS['nutrition']),
+        (_price_block(features), BLOCK_WEIGHTS['price']),
+        (_token_block(features['KeyLabels'], hash_dims), BLOCK_WEIGHTS['labels']),
+        (_token_block(features['IntendedSegment'], hash_dims), BLOCK_WEIGHTS['segment']),
+    ]
+    return np.hstack([block * np.float32(np.sqrt(weight)) for block, weight in blocks])
+
+
+def _merge_top_k(best_ids, best_scores, ids, scores, k):
+    """Conservar los k mayores por fila entre los actuales y un bloque nuevo"""
+    import numpy as np
+
+    all_ids = np.concatenate([best_ids, ids], axis=1)
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    if all_scores.shape[1] > k:
+        keep = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+        all_ids = np.take_along_axis(all_ids, keep, axis=1)
+        all_scores = np.take_along_axis(all_scores, keep, axis=1)
+    order = np.argsort(-all_scores, axis=1, kind='stable')
+    return np.take_along_axis(all_ids, order, axis=1), np.take_along_axis(all_scores, order, axis=1)
+
+
+def top_k_neighbors(embeddings, k, rows=None, block_rows=2048, block_cols=32768):
+    """
+    k vecinos (posiciones y puntajes) de las filas pedidas contra todas las filas
+    Nunca se materializa más de block_rows × block_cols puntajes a la vez.
+    Las filas sin k vecinos posibles se completan con posición -1.
+    """
+    import numpy as np
+
+    count = len(embeddings)
+    rows = np.arange(count) if rows is None else np.asarray(rows, dtype=np.int64)
+    neighbor_ids = np.full((len(rows), k), -1, dtype=np.int64)
+    neighbor_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+
+    for row_start in range(0, len(rows), block_rows):
+        query_rows = rows[row_start:row_start + block_rows]
+        query = embeddings[query_rows]
+        best_ids = neighbor_ids[row_start:row_start + len(query_rows)]
+        best_scores = neighbor_scores[row_start:row_start + len(query_rows)]
+
+        for col_start in range(0, count, block_cols):
+            candidates = embeddings[col_start:col_start + block_cols]
+            scores = query @ candidates.T
+            # Un producto no es vecino de sí mismo
+            own = (query_rows >= col_start) & (query_rows < col_start + len(candidates))
+            scores[np.flatnonzero(own), query_rows[own] - col_start] = -np.inf
+
+            take = min(k, scores.shape[1])
+            # argpartition sobre scores (sin negar) evita copiar el bloque
+            top = np.argpartition(scores, scores.shape[1] - take, axis=1)[:, -take:]
+            best_ids, best_scores = _merge_top_k(best_ids, best_scores, top + col_start,
+                                                 np.take_along_axis(scores, top, axis=1), k)
+
+        neighbor_ids[row_start:row_start + len(query_rows)] = best_ids
+        neighbor_scores[row_start:row_start + len(query_rows)] = best_scores
+
+    neighbor_ids[~np.isfinite(neighbor_scores)] = -1
+    return neighbor_ids, neighbor_scores
+
+
+class NeighborIndex:
+    """Índice top-k en memoria: ids de producto, vectores, vecinos y puntajes"""
+
+    def __init__(self, product_ids, embeddings, neighbor_ids, scores):
+        self.product_ids = product_ids
+        self.embeddings = embeddings
+        self.neighbor_ids = neighbor_ids
+        self.scores = scores
+
+    @property
+    def k(self):
+        return self.neighbor_ids.shape[1]
+
+    def save(self, directory):
+        """Guardar como archivos .npy (se reemplazan de forma atómica)"""
+        import numpy as np
+
+        directory = os.path.expanduser(directory)
+        os.makedirs(directory, exist_ok=True)
+        for name in INDEX_FILES:
+            path = os.path.join(directory, f"{name}.npy")
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as file:
+                np.save(file, getattr(self, name))
+            os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Abrir un índice guardado (memory-map por defecto); None si no existe"""
+        import numpy as np
+
+        directory = os.path.expanduser(directory)
+        paths = [os.path.join(directory, f"{name}.npy") for name in INDEX_FILES]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        return cls(*(np.load(path, mmap_mode=mmap_mode) for path in paths))
+
+    def lookup(self, product_id):
+        """[(NeighborId, Score)] de un producto; product_ids está ordenado"""
+        import numpy as np
+
+        position = np.searchsorted(self.product_ids, product_id)
+        if position >= len(self.product_ids) or self.product_ids[position] != product_id:
+            return []
+        return [(int(neighbor), round(float(score), 4))
+                for neighbor, score in zip(self.neighbor_ids[position], self.scores[position])
+                if neighbor >= 0]
+
+
+def build_index(features, k, block_rows=2048, block_cols=32768):
+    """Índice completo desde el frame de características (una fila por producto)"""
+    import numpy as np
+
+    features = features.sort_values('ProductId').reset_index(drop=True)
+    product_ids = features['ProductId'].to_numpy(dtype=np.int64)
+    embeddings = build_embeddings(features)
+    positions, scores = top_k_neighbors(embeddings, k, block_rows=block_rows, block_cols=block_cols)
+    neighbor_ids = np.where(positions >= 0, product_ids[positions], -1)
+    return NeighborIndex(product_ids, embeddings, neighbor_ids, scores)
+
+
+def update_index(previous, features, block_rows=2048, block_cols=32768):
+    """
+    Actualizar un índice existente con el frame de características actual
+    Devuelve (índice nuevo, ProductIds cuyas listas cambiaron o que ya no existen)
+
+    Se recalculan por completo los productos nuevos o modificados y los que
+    tenían como vecino a un producto modificado o eliminado. Para el resto
+    basta combinar su lista actual con los puntajes contra los modificados.
+    """
+    import numpy as np
+
+    k = previous.k
+    features = features.sort_values('ProductId').reset_index(drop=True)
+    product_ids = features['ProductId'].to_numpy(dtype=np.int64)
+    embeddings = build_embeddings(features)
+
+    old_ids = np.asarray(previous.product_ids)
+    old_embeddings = np.asarray(previous.embeddings)
+    if old_embeddings.shape[1] != embeddings.shape[1]:
+        index = build_index(features, k, block_rows, block_cols)
+        return index, product_ids
+
+    # Posición de cada producto actual en el índice anterior (-1 si es nuevo)
+    old_positions = np.searchsorted(old_ids, product_ids)
+    old_positions[old_positions >= len(old_ids)] = 0
+    existed = old_ids[old_positions] == product_ids if len(old_ids) else np.zeros(len(product_ids), bool)
+    unchanged = existed.copy()
+    unchanged[existed] = np.all(old_embeddings[old_positions[existed]] == embeddings[existed], axis=1)
+    changed_rows = np.flatnonzero(~unchanged)
+    removed_ids = np.setdiff1d(old_ids, product_ids)
+    stale_ids = np.concatenate([product_ids[changed_rows], removed_ids])
+
+    # Vecinos anteriores de los productos que siguen igual
+    neighbor_ids = np.full((len(product_ids), k), -1, dtype=np.int64)
+    scores = np.full((len(product_ids), k), -np.inf, dtype=np.float32)
+    neighbor_ids[unchanged] = np.asarray(previous.neighbor_ids)[old_positions[unchanged]]
+    scores[unchanged] = np.asarray(previous.scores)[old_positions[unchanged]]
+
+    if len(stale_ids) == 0:
+        return NeighborIndex(product_ids, embeddings, neighbor_ids, scores), np.array([], dtype=np.int64)
+
+    # Un vecino modificado o eliminado invalida la lista: se recalcula completa
+    recompute = ~unchanged | np.isin(neighbor_ids, stale_ids).any(axis=1)
+    recompute_rows = np.flatnonzero(recompute)
+    if len(recompute_rows):
+        positions, new_scores = top_k_neighbors(embeddings, k, rows=recompute_rows,
+                                                block_rows=block_rows, block_cols=block_cols)
+        neighbor_ids[recompute_rows] = np.where(positions >= 0, product_ids[positions], -1)
+        scores[recompute_rows] = new_scores
+
+    # El resto solo puede ganar como vecinos a los productos nuevos o modificados
+    merge_rows = np.flatnonzero(~recompute)
+    changed_embeddings = embeddings[changed_rows]
+    for start in range(0, len(merge_rows), block_rows):
+        rows = merge_rows[start:start + block_rows]
+        block_scores = embeddings[rows] @ changed_embeddings.T
+        block_ids = np.broadcast_to(product_ids[changed_rows], block_scores.shape)
+        merged_ids, merged_scores = _merge_top_k(neighbor_ids[rows], scores[rows],
+                                                 block_ids, block_scores, k)
+        neighbor_ids[rows] = merged_ids
+        scores[rows] = merged_scores
+    neighbor_ids[~np.isfinite(scores)] = -1
+
+    # Listas que cambiaron respecto del índice anterior (vecinos o puntajes)
+    previous_lists = np.full_like(neighbor_ids, -2)
+    previous_lists[existed] = np.asarray(previous.neighbor_ids)[old_positions[existed]]
+    previous_scores = np.full_like(scores, np.nan)
+    previous_scores[existed] = np.asarray(previous.scores)[old_positions[existed]]
+    touched = np.any(previous_lists != neighbor_ids, axis=1) | np.any(
+        np.round(previous_scores, 4) != np.round(scores, 4), axis=1)
+
+    # Los productos eliminados también se informan para borrar sus filas
+    touched_ids = np.concatenate([product_ids[touched], removed_ids])
+    return NeighborIndex(product_ids, embeddings, neighbor_ids, scores), touched_ids
+
+
+def previous_rows(index):
+    """Filas de ProductNeighbors que corresponden al índice"""
+    import numpy as np
+
+    return int(np.count_nonzero(np.asarray(index.neighbor_ids) >= 0))
+
+
+def neighbors_frame(index, product_ids=None):
+    """Filas de ProductNeighbors (ProductId, Rank, NeighborId, Score) del índice"""
+    import numpy as np
+    import pandas as pd
+
+    rows = np.arange(len(index.product_ids))
+    if product_ids is not None:
+        rows = rows[np.isin(index.product_ids, product_ids)]
+    neighbor_ids = np.asarray(index.neighbor_ids)[rows]
+    scores = np.asarray(index.scores)[rows]
+    ranks = np.broadcast_to(np.arange(1, index.k + 1), neighbor_ids.shape)
+    owners = np.broadcast_to(np.asarray(index.product_ids)[rows][:, None], neighbor_ids.shape)
+    valid = neighbor_ids >= 0
+    return pd.DataFrame({
+        'ProductId': owners[valid].astype('int64'),
+        'Rank': ranks[valid].astype('int64'),
+        'NeighborId': neighbor_ids[valid].astype('int64'),
+        'Score': np.clip(scores[valid], 0.0, 1.0).round(4).astype('float64'),
+    })
+
+
+class ProductNeighborsJob:
+    """Construir o actualizar ProductNeighbors (y el índice local si hay directorio)"""
+
+    def __init__(self, engine, bulk_loader, k=20, index_dir=None, block_rows=2048, block_cols=32768):
+        self.engine = engine
+        self.bulk_loader = bulk_loader
+        self.k = k
+        self.index_dir = index_dir
+        self.block_rows = block_rows
+        self.block_cols = block_cols
+
+    def ensure_table(self):
+        """Crear ProductNeighbors si no existe"""
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            conn.execute(text(NEIGHBORS_TABLE_SQL))
+            conn.commit()
+
+    def load_features(self):
+        """Una fila de características por producto (misma consulta que la similitud)"""
+        import pandas as pd
+
+        features = pd.read_sql(FEATURE_SQL, self.engine)
+        return features.drop_duplicates(subset='ProductId', keep='first')
+
+    def stored_rows(self):
+        """Filas actuales de ProductNeighbors"""
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM ProductNeighbors")).scalar()
+
+    def write(self, frame, product_ids, full):
+        """Reemplazar las filas de los productos indicados en una transacción"""
+        import pandas as pd
+
+        connection = raw_connection(self.engine)
+        try:
+            cursor = connection.cursor()
+            if full:
+                cursor.execute("DELETE FROM ProductNeighbors")
+            else:
+                keys = pd.DataFrame({'ProductId': pd.Series(product_ids, dtype='int64')})
+                self.bulk_loader.load(connection, f"{STAGING_TABLE}_keys", keys, create=True,
+                                      column_types={'ProductId': 'INT'})
+                cursor.execute(f"""
+                DELETE FROM ProductNeighbors
+                WHERE ProductId IN (SELECT ProductId FROM {STAGING_TABLE}_keys)
+                """)
+                cursor.execute(f"DROP TABLE {STAGING_TABLE}_keys")
+
+            if not frame.empty:
+                self.bulk_loader.load(connection, STAGING_TABLE, frame, create=True, column_types={
+                    'ProductId': 'INT', 'Rank': 'TINYINT', 'NeighborId': 'INT', 'Score': 'DECIMAL(5,4)'
+                })
+                cursor.execute(f"""
+                INSERT INTO ProductNeighbors (ProductId, Rank, NeighborId, Score)
+                SELECT ProductId, Rank, NeighborId, Score FROM {STAGING_TABLE}
+                """)
+                cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def run(self, full=False):
+        """
+        Construir el índice (o actualizarlo si existe el directorio local)
+        Devuelve {'products', 'updated', 'rows', 'mode'}
+        """
+        self.ensure_table()
+        features = self.load_features()
+
+        previous = None
+        if self.index_dir and not full:
+            previous = NeighborIndex.load(self.index_dir, mmap_mode=None)
+        if previous is not None and (previous.k != self.k or self.stored_rows() != previous_rows(previous)):
+            # El índice local no corresponde a la tabla (otra base, k distinto): reconstruir
+            previous = None
+
+        if previous is None:
+            index = build_index(features, self.k, self.block_rows, self.block_cols)
+            frame = neighbors_frame(index)
+            self.write(frame, index.product_ids, full=True)
+            updated, mode = len(index.product_ids), 'full'
+        else:
+            index, touched = update_index(previous, features, self.block_rows, self.block_cols)
+            frame = neighbors_frame(index, touched)
+            if len(touched):
+                self.write(frame, touched, full=False)
+            updated, mode = len(touched), 'incremental'
+
+        if self.index_dir:
+            index.save(self.index_dir)
+        return {'products': len(index.product_ids), 'updated': updated, 'rows': len(frame), 'mode': mode}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+proteia-db: punto de entrada único para las herramientas de base de datos
+
+Cada subcomando carga su módulo (y con él pandas, SQLAlchemy o pyodbc) solo
+cuando se ejecuta, así que los comandos livianos arrancan de inmediato.
+
+Uso:
+    python3 proteia_db.py import
+    python3 proteia_db.py parse
+    python3 proteia_db.py neighbors
+    python3 proteia_db.py verify tables
+    python3 proteia_db.py verify import
+    python3 proteia_db.py verify summaries
+    python3 proteia_db.py analysis market|brand|category|protein
+    python3 proteia_db.py check-users
+    python3 proteia_db.py fix columns
+    python3 proteia_db.py fix tables
+    python3 proteia_db.py test-connection
+    python3 proteia_db.py advise indexes > index_suggestions.sql
+
+Con --local, import, neighbors, verify import, verify summaries y analysis usan el archivo
+SQLite de IMPORT_CONFIG['local_path'] en lugar de Azure SQL:
+    python3 proteia_db.py --local import
+
+Los scripts .sql y los CSV se buscan en IMPORT_CONFIG['sql_dir'] y
+IMPORT_CONFIG['data_dir'] (relativos a proteia-database); --sql-dir y
+--data-dir los reemplazan en una corrida (relativos al directorio actual):
+    python3 proteia_db.py --data-dir ~/datos/proteia import
+
+Cada corrida se mide con instrumentation.METRICS (IMPORT_CONFIG['metrics_dir']):
+spans en spans.jsonl y la última corrida en proteia_<comando>.prom. Con
+sql_profile, al terminar se imprimen las sentencias SQL con más tiempo total
+y su histograma queda en sql_profile_<comando>.json.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+# (subcomando, acción) -> (módulo, función, descripción)
+COMMANDS = {
+    ('import', None): ('import_data', 'main', "Importar CSV y migrar datos a Azure SQL"),
+    ('parse', None): ('import_data', 'parse_main', "Parsear los CSV sin base de datos (llena el caché)"),
+    ('neighbors', None): ('import_data', 'neighbors_main', "Construir o actualizar ProductNeighbors"),
+    ('verify', 'tables'): ('verify_tables', 'verify_tables', "Verificar que existan las tablas requeridas"),
+    ('verify', 'import'): ('verify_import', 'verify_database_status', "Verificar el estado de la importación"),
+    ('verify', 'summaries'): ('import_data', 'verify_summaries_main', "Comparar MarketSummary con un recálculo completo"),
+    ('analysis', 'market'): ('import_data', 'market_analysis_main', "Métricas globales del mercado"),
+    ('analysis', 'brand'): ('import_data', 'brand_analysis_main', "Análisis por marca"),
+    ('analysis', 'category'): ('import_data', 'category_analysis_main', "Análisis por categoría"),
+    ('analysis', 'protein'): ('import_data', 'protein_analysis_main', "Ranking por precio por gramo de proteína"),
+    ('check-users', None): ('check_users', 'check_users', "Revisar usuarios y credenciales"),
+    ('fix', 'columns'): ('fix_columns', 'fix_column_migration', "Corregir la migración de columnas"),
+    ('fix', 'tables'): ('fix_missing_tables', 'fix_database', "Crear tablas faltantes y migrar datos"),
+    ('test-connection', None): ('test_connection', 'main', "Probar la conexión a Azure SQL"),
+    ('advise', 'indexes'): ('index_advisor', 'main', "Sugerir índices a partir de los procedimientos y vistas (.sql)"),
+}
+
+
+def resolve_command(command, action=None):
+    """Importar el módulo del subcomando y devolver su función"""
+    module_name, function_name, _ = COMMANDS[(command, action)]
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
+
+def build_parser():
+    """Parser con un subcomando por herramienta (sin importar ningún módulo)"""
+    parser = argparse.ArgumentParser(
+        prog='proteia-db',
+        description="Herramientas de base de datos Proteia"
+    )
+    parser.add_argument('--local', action='store_true',
+                        help="Usar la base SQLite local (IMPORT_CONFIG['local_path']) en lugar de Azure SQL")
+    parser.add_argument('--sql-dir', help="Directorio de los scripts .sql (IMPORT_CONFIG['sql_dir'])")
+    parser.add_argument('--data-dir', help="Directorio de los CSV a importar (IMPORT_CONFIG['data_dir'])")
+    subparsers = parser.add_subparsers(dest='command', metavar='comando')
+    subparsers.required = True
+
+    groups = {}
+    for (command, action), (_, _, description) in COMMANDS.items():
+        if action is None:
+            subparser = subparsers.add_parser(command, help=description)
+            subparser.set_defaults(action=None)
+            continue
+
+        if command not in groups:
+            group_parser = subparsers.add_parser(command, help=f"Subcomandos de {command}")
+            groups[command] = group_parser.add_subparsers(dest='action', metavar='acción')
+            groups[command].required = True
+        groups[command].add_parser(action, help=description)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from connection_config import IMPORT_CONFIG
+    from instrumentation import METRICS
+    from sql_profiler import PROFILER
+
+    if args.local:
+        IMPORT_CONFIG['backend'] = 'sqlite'
+    if args.sql_dir:
+        IMPORT_CONFIG['sql_dir'] = os.path.abspath(args.sql_dir)
+    if args.data_dir:
+        IMPORT_CONFIG['data_dir'] = os.path.abspath(args.data_dir)
+    handler = resolve_command(args.command, args.action)
+
+    PROFILER.configure(IMPORT_CONFIG['sql_profile'], IMPORT_CONFIG['slow_query_ms'], IMPORT_CONFIG['slow_query_log'])
+    METRICS.configure(IMPORT_CONFIG['metrics_dir'], trace=PROFILER.enabled)
+    name = args.command if args.action is None else f"{args.command}_{args.action}"
+    try:
+        with METRICS.run(name, backend=IMPORT_CONFIG['backend']) as run:
+            result = handler()
+            if result is False or (isinstance(result, int) and not isinstance(result, bool) and result != 0):
+                run.status = 'failed'
+    finally:
+        METRICS.close()
+        if PROFILER.statements:
+            print(PROFILER.report(IMPORT_CONFIG['sql_profile_top']))
+            if METRICS.directory:
+                PROFILER.write_json(os.path.join(METRICS.directory, f"sql_profile_{name}.json"))
+        PROFILER.close()
+
+    # Las herramientas devuelven True/False, un código de salida o nada
+    if result is False:
+        return 1
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
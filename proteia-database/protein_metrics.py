@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Métricas de valor proteico precalculadas (ProductProteinMetrics)
+fn_PricePerProteinGram hacía un join por cada producto: ordenar el catálogo
+por valor proteico la evaluaba fila por fila. Aquí las métricas de todos los
+productos salen de una consulta y operaciones de NumPy sobre las columnas:
+
+- ProteinGrams: proteína del envase (Protein por 100 g × Weight en kg × 10)
+- PricePerProteinGram: Price / ProteinGrams (la fórmula de la función)
+- PricePerKg: Price / Weight
+- ProteinDensity: gramos de proteína por cada 100 kcal
+
+Solo se escriben los productos cuyas métricas cambiaron (y se borran las de
+productos que ya no existen). El índice por PricePerProteinGram incluye las
+demás métricas, así que el ranking es un recorrido ordenado del índice
+(sp_GetProteinValueRanking en 05_market_summary.sql). La tabla y el índice
+también están en 05_market_summary.sql; ensure_table los crea si la
+importación corre antes del despliegue. Un valor fuera del rango de su
+DECIMAL (Price / ProteinGrams con muy poca proteína) queda NULL, como en
+type_coercion. fn_PricePerProteinGram sigue calculando en vivo un solo producto.
+"""
+
+from sql_profiler import raw_connection
+from type_coercion import coerce_column
+
+STAGING_TABLE = 'temp_protein_metrics'
+
+RANKING_INDEX = 'IX_ProductProteinMetrics_PricePerProteinGram'
+
+# Columnas de métricas, su tipo SQL y decimales guardados
+METRIC_COLUMNS = [
+    ('ProteinGrams', 'DECIMAL(12,2)', 2),
+    ('PricePerProteinGram', 'DECIMAL(10,4)', 4),
+    ('PricePerKg', 'DECIMAL(12,2)', 2),
+    ('ProteinDensity', 'DECIMAL(8,2)', 2),
+]
+
+METRICS_TABLE_SQL = """
+IF OBJECT_ID('ProductProteinMetrics', 'U') IS NULL
+BEGIN
+    CREATE TABLE ProductProteinMetrics (
+        ProductId INT NOT NULL,
+        {metric_columns},
+        UpdatedAt DATETIME2 DEFAULT GETDATE(),
+        CONSTRAINT PK_ProductProteinMetrics PRIMARY KEY (ProductId),
+        FOREIGN KEY (ProductId) REFERENCES Products(Id) ON DELETE CASCADE
+    );
+END
+""".format(metric_columns=',\n        '.join(f"{column} {sql_type} NULL" for column, sql_type, _ in METRIC_COLUMNS))
+
+RANKING_INDEX_SQL = f"""
+CREATE INDEX {RANKING_INDEX} ON ProductProteinMetrics (PricePerProteinGram)
+INCLUDE (ProteinGrams, PricePerKg, ProteinDensity)
+"""
+
+# Una fila por producto: la nutrición se reduce como en MarketSummary
+FEATURE_SQL = """
+SELECT p.Id AS ProductId, p.Price, p.Weight, n.Protein, n.Energy
+FROM Products p
+LEFT JOIN (
+    SELECT ProductId, MAX(Protein) AS Protein, MAX(Energy) AS Energy
+    FROM NutritionalInfo GROUP BY ProductId
+) n ON n.ProductId = p.Id
+"""
+
+
+def compute_metrics(features):
+    """Frame ProductId + METRIC_COLUMNS (NULL donde falta un dato, no es positivo o no cabe en el DECIMAL)"""
+    import numpy as np
+    import pandas as pd
+
+    def column(name):
+        values = features[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        # Cero o negativo es un dato faltante, no un divisor válido
+        return np.where(values > 0, values, np.nan)
+
+    price, weight = column('Price'), column('Weight')
+    protein, energy = column('Protein'), column('Energy')
+
+    protein_grams = protein * weight * 10
+    metrics = pd.DataFrame({
+        'ProductId': features['ProductId'].astype('int64'),
+        'ProteinGrams': protein_grams,
+        'PricePerProteinGram': price / protein_grams,
+        'PricePerKg': price / weight,
+        'ProteinDensity': protein / energy * 100,
+    })
+    for name, sql_type, _ in METRIC_COLUMNS:
+        metrics[name] = coerce_column(metrics[name], name, sql_type)
+    return metrics
+
+
+def changed_rows(metrics, stored):
+    """Filas de metrics nuevas o con algún valor distinto del guardado"""
+    import numpy as np
+
+    names = [name for name, _, _ in METRIC_COLUMNS]
+    merged = metrics.merge(stored, on='ProductId', how='left', suffixes=('', '_stored'), indicator=True)
+    changed = merged['_merge'] == 'left_only'
+    for name, _, decimals in METRIC_COLUMNS:
+        new = merged[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        old = merged[f"{name}_stored"].to_numpy(dtype=np.float64, na_value=np.nan)
+        both_null = np.isnan(new) & np.isnan(old)
+        changed |= ~both_null & ~(np.abs(new - old) < 0.5 * 10 ** -decimals)
+    return metrics[changed.to_numpy()][['ProductId'] + names]
+
+
+class ProteinMetrics:
+    """Mantener ProductProteinMetrics a partir de Products y NutritionalInfo"""
+
+    def __init__(self, engine, bulk_loader):
+        self.engine = engine
+        self.bulk_loader = bulk_loader
+
+    def ensure_table(self):
+        """Crear ProductProteinMetrics y su índice de ranking si no existen"""
+        from sqlalchemy import inspect, text
+
+        with self.engine.connect() as conn:
+            conn.execute(text(METRICS_TABLE_SQL))
+            if not any(index['name'] == RANKING_INDEX
+                       for index in inspect(conn).get_indexes('ProductProteinMetrics')):
+                conn.execute(text(RANKING_INDEX_SQL))
+            conn.commit()
+
+    def _query(self, sql):
+        import pandas as pd
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(sql), conn)
+
+    def load_features(self):
+        return self._query(FEATURE_SQL).drop_duplicates(subset='ProductId', keep='first')
+
+    def load_stored(self):
+        columns = ', '.join(['ProductId'] + [name for name, _, _ in METRIC_COLUMNS])
+        return self._query(f"SELECT {columns} FROM ProductProteinMetrics")
+
+    def write(self, changed, removed):
+        """Reemplazar las filas cambiadas y borrar las de productos que ya no existen, en una transacción"""
+        import pandas as pd
+
+        names = ['ProductId'] + [name for name, _, _ in METRIC_COLUMNS]
+        column_types = dict([('ProductId', 'INT')] + [(name, sql_type) for name, sql_type, _ in METRIC_COLUMNS])
+        keys = pd.concat([changed['ProductId'], pd.Series(removed, dtype='int64')], ignore_index=True)
+
+        connection = raw_connection(self.engine)
+        try:
+            cursor = connection.cursor()
+            self.bulk_loader.load(connection, f"{STAGING_TABLE}_keys", keys.to_frame('ProductId'), create=True,
+                                  column_types={'ProductId': 'INT'})
+            cursor.execute(f"""
+            DELETE FROM ProductProteinMetrics
+            WHERE ProductId IN (SELECT ProductId FROM {STAGING_TABLE}_keys)
+            """)
+            if not changed.empty:
+                self.bulk_loader.load(connection, STAGING_TABLE, changed, create=True, column_types=column_types)
+                cursor.execute(f"""
+                INSERT INTO ProductProteinMetrics ({', '.join(names)})
+                SELECT {', '.join(names)} FROM {STAGING_TABLE}
+                """)
+                cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+            cursor.execute(f"DROP TABLE {STAGING_TABLE}_keys")
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def refresh(self):
+        """
+        Recalcular las métricas de todos los productos y guardar solo las diferencias
+        Devuelve {'products', 'changed', 'removed', 'ranked'}
+        """
+        self.ensure_table()
+        metrics = compute_metrics(self.load_features())
+        stored = self.load_stored()
+        changed = changed_rows(metrics, stored)
+        removed = sorted(set(stored['ProductId'].astype('int64')) - set(metrics['ProductId']))
+        if not changed.empty or removed:
+            self.write(changed, removed)
+        return {
+            'products': len(metrics),
+            'changed': len(changed),
+            'removed': len(removed),
+            'ranked': int(metrics['PricePerProteinGram'].notna().sum()),
+        }
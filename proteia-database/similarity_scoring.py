@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Similitud de cada producto con Proteo50 (ProductAnalysis.SimilarityScore)
+Se arma una matriz de características para todos los productos en una sola
+consulta y el puntaje se calcula con operaciones de NumPy sobre la matriz
+completa, sin recorrer filas:
+
+- Perfil nutricional (proteína, fibra, carbohidratos, grasa, sodio, energía):
+  cercanía por nutriente a la referencia, ponderada
+- Precio por unidad de peso: cercanía en escala logarítmica
+- KeyLabels e IntendedSegment: coseno entre bolsas de palabras
+
+Los bloques sin datos cuentan como no similares. Los puntajes se escriben
+en bloque: carga a staging y un UPDATE por conjunto. Solo se actualizan los
+análisis que ya existen: un producto sin análisis queda sin puntaje en lugar
+de recibir una fila vacía que migrate_analysis_data después duplicaría.
+"""
+
+import re
+
+from market_schema import REFERENCE_ASIN
+from nutrition_extraction import normalize_label
+from sql_profiler import raw_connection
+
+STAGING_TABLE = 'temp_similarity_scores'
+
+FEATURE_SQL = """
+SELECT
+    p.Id AS ProductId, p.ASIN, p.Price, p.Weight,
+    n.Energy, n.Protein, n.TotalFat, n.Carbohydrates, n.DietaryFiber, n.Sodium,
+    pa.KeyLabels, pa.IntendedSegment
+FROM Products p
+LEFT JOIN NutritionalInfo n ON n.ProductId = p.Id
+LEFT JOIN ProductAnalysis pa ON pa.ProductId = p.Id
+"""
+
+# (columna, peso dentro del bloque, diferencia a la que la similitud llega a 0)
+NUTRITION_FEATURES = [
+    ('Protein', 0.35, 50.0),
+    ('DietaryFiber', 0.25, 30.0),
+    ('Carbohydrates', 0.20, 50.0),
+    ('TotalFat', 0.10, 30.0),
+    ('Sodium', 0.05, 1000.0),
+    ('Energy', 0.05, 400.0),
+]
+
+# Peso de cada bloque en el puntaje final (suman 1)
+BLOCK_WEIGHTS = {
+    'nutrition': 0.60,
+    'price': 0.10,
+    'labels': 0.15,
+    'segment': 0.15,
+}
+
+# Una diferencia de un orden de magnitud en precio por peso lleva la similitud a 0
+PRICE_LOG_SCALE = 1.0
+
+# Palabras sin contenido que no cuentan como coincidencia entre etiquetas
+STOPWORDS = {'de', 'del', 'en', 'y', 'e', 'o', 'la', 'el', 'los', 'las', 'con', 'sin', 'para',
+             'por', 'a', 'al', 'un', 'una', 'the', 'and', 'of', 'for', 'with'}
+
+_TOKEN_SPLIT = re.compile(r'[^0-9a-z]+')
+
+
+def text_tokens(value):
+    """Conjunto de palabras normalizadas (sin acentos ni palabras vacías) de un texto"""
+    if value is None or value != value:
+        return frozenset()
+    words = _TOKEN_SPLIT.split(normalize_label(value))
+    return frozenset(word for word in words if len(word) > 1 and word not in STOPWORDS)
+
+
+def token_similarity(series, reference_tokens):
+    """
+    Coseno entre bolsas de palabras binarias contra la referencia
+    |A ∩ R| / sqrt(|A| · |R|). Se tokenizan solo los textos distintos
+    (pd.factorize) y el resultado se reparte a las filas por código.
+    Devuelve (similitudes, máscara de filas con palabras)
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series)
+    token_sets = [text_tokens(value) for value in uniques]
+    sizes = np.array([len(tokens) for tokens in token_sets] + [0], dtype=np.float64)
+    overlap = np.array([len(tokens & reference_tokens) for tokens in token_sets] + [0], dtype=np.float64)
+
+    # El código -1 (nulo) apunta al último elemento, que vale 0
+    sizes, overlap = sizes[codes], overlap[codes]
+    has_tokens = sizes > 0
+    if not reference_tokens:
+        return np.zeros(len(series)), has_tokens
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = overlap / np.sqrt(sizes * len(reference_tokens))
+    return np.nan_to_num(similarity), has_tokens
+
+
+def nutrition_similarity(features, reference):
+    """
+    Cercanía ponderada por nutriente: 1 - |x - r| / escala, entre 0 y 1
+    Solo pesan los nutrientes conocidos en ambos lados; devuelve (similitud, máscara)
+    """
+    import numpy as np
+
+    columns = [column for column, _, _ in NUTRITION_FEATURES]
+    weights = np.array([weight for _, weight, _ in NUTRITION_FEATURES])
+    scales = np.array([scale for _, _, scale in NUTRITION_FEATURES])
+
+    matrix = features[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    ref = reference[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    closeness = np.clip(1.0 - np.abs(matrix - ref) / scales, 0.0, 1.0)
+    known = ~np.isnan(closeness)
+    # Matriz (n × k) por vector de pesos (k): suma ponderada y peso disponible por fila
+    weighted = np.where(known, closeness, 0.0) @ weights
+    available = known @ weights
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(available > 0, weighted / available, 0.0)
+    return similarity, available > 0
+
+
+def price_similarity(features, reference):
+    """Cercanía del precio por unidad de peso en escala log10"""
+    import numpy as np
+
+    price = features['Price'].to_numpy(dtype=np.float64, na_value=np.nan)
+    weight = features['Weight'].to_numpy(dtype=np.float64, na_value=np.nan)
+    ref_price = float(reference['Price']) if reference['Price'] is not None else np.nan
+    ref_weight = float(reference['Weight']) if reference['Weight'] is not None else np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_weight = np.log10(price / weight)
+        ref_per_weight = np.log10(ref_price / ref_weight)
+    distance = np.abs(per_weight - ref_per_weight)
+    known = np.isfinite(distance)
+    similarity = np.where(known, np.clip(1.0 - distance / PRICE_LOG_SCALE, 0.0, 1.0), 0.0)
+    return similarity, known
+
+
+def score_products(features, reference_asin=REFERENCE_ASIN):
+    """
+    Puntaje de similitud (0 a 1, 4 decimales) para cada fila de features
+    La referencia obtiene 1.0 siempre que tenga datos en todos los bloques
+    """
+    import numpy as np
+
+    asins = features['ASIN'].astype(str).to_numpy()
+    positions = np.flatnonzero(asins == reference_asin)
+    if len(positions) == 0:
+        raise ValueError(f"No existe el producto de referencia {reference_asin}")
+    reference = features.iloc[positions[0]]
+
+    blocks = {
+        'nutrition': nutrition_similarity(features, reference),
+        'price': price_similarity(features, reference),
+    }
+    for block, column in (('labels', 'KeyLabels'), ('segment', 'IntendedSegment')):
+        blocks[block] = token_similarity(features[column], text_tokens(reference[column]))
+
+    score = np.zeros(len(features))
+    for block, (similarity, known) in blocks.items():
+        score += BLOCK_WEIGHTS[block] * np.where(known, similarity, 0.0)
+    return np.round(np.clip(score, 0.0, 1.0), 4)
+
+
+class SimilarityScorer:
+    """Calcular y guardar SimilarityScore para todos los productos"""
+
+    def __init__(self, engine, bulk_loader, reference_asin=REFERENCE_ASIN):
+        self.engine = engine
+        self.bulk_loader = bulk_loader
+        self.reference_asin = reference_asin
+
+    def load_features(self):
+        """Todas las características en una consulta (una fila por producto)"""
+        import pandas as pd
+
+        features = pd.read_sql(FEATURE_SQL, self.engine)
+        return features.drop_duplicates(subset='ProductId', keep='first').reset_index(drop=True)
+
+    def score(self, features=None):
+        """Frame ProductId, SimilarityScore"""
+        import pandas as pd
+
+        if features is None:
+            features = self.load_features()
+        scores = score_products(features, self.reference_asin)
+        return pd.DataFrame({'ProductId': features['ProductId'].astype('int64'),
+                             'SimilarityScore': scores})
+
+    def write(self, scores):
+        """
+        Actualizar los análisis existentes en una transacción
+        Devuelve {'scored', 'updated', 'unanalyzed'} (unanalyzed: productos sin análisis)
+        """
+        counts = {'scored': len(scores), 'updated': 0, 'unanalyzed': 0}
+        if scores.empty:
+            return counts
+
+        connection = raw_connection(self.engine)
+        try:
+            self.bulk_loader.load(connection, STAGING_TABLE, scores, create=True,
+                                  column_types={'ProductId': 'INT', 'SimilarityScore': 'DECIMAL(5,4)'})
+            cursor = connection.cursor()
+            cursor.execute(f"""
+            UPDATE ProductAnalysis
+            SET SimilarityScore = s.SimilarityScore
+            FROM {STAGING_TABLE} s
+            WHERE ProductAnalysis.ProductId = s.ProductId
+            """)
+            counts['updated'] = max(cursor.rowcount, 0)
+            cursor.execute(f"""
+            SELECT COUNT(*)
+            FROM {STAGING_TABLE} s
+            WHERE NOT EXISTS (SELECT 1 FROM ProductAnalysis pa WHERE pa.ProductId = s.ProductId)
+            """)
+            counts['unanalyzed'] = cursor.fetchone()[0]
+            cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+            cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        return counts
+
+    def run(self):
+        """Cargar características, puntuar y guardar"""
+        return self.write(self.score())
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Perfilador de sentencias SQL del importador y de los scripts de mantenimiento
+Cada sentencia (SQLAlchemy o cursor DB-API) se normaliza a una huella: sin
+comentarios, con literales y números como ? y las listas de parámetros
+colapsadas, así que "WHERE ASIN = 'B0X'" y "WHERE ASIN = 'B0Y'" cuentan como
+la misma sentencia. Por huella se guarda un histograma de duraciones, filas
+afectadas, forma de los parámetros y etapas que la ejecutaron.
+
+- Las sentencias más lentas que slow_query_ms van a slow_query_log (JSON lines,
+  solo el texto normalizado: nunca valores ni parámetros)
+- report() imprime las N sentencias con más tiempo total al final de la corrida
+
+Hooks: eventos de SQLAlchemy (profile_engine) y conexiones DB-API envueltas
+(raw_connection y pooled_connection de connection_config).
+"""
+
+import functools
+import os
+import re
+import threading
+import time
+
+from instrumentation import METRICS
+
+# Límites superiores de los baldes del histograma (ms)
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_LITERAL = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w@:.\]\[])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_NAMED_PARAM = re.compile(r"(?<![\w@:]):\w+|(?<![\w@])@(?!@)\w+")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_ROWS = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Largo máximo del texto normalizado en el log de lentas (los lotes de DDL son enormes)
+SLOW_LOG_SQL_CHARS = 4000
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """Texto normalizado de la sentencia (la misma consulta con otros valores da el mismo texto)"""
+    text = _COMMENT.sub(' ', sql)
+    text = _LITERAL.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _NAMED_PARAM.sub('?', text)
+    text = _PARAM_LIST.sub('(?+)', text)
+    text = _REPEATED_ROWS.sub('(?+), ...', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """(huella, texto normalizado) de una sentencia"""
+    import hashlib
+
+    normalized = normalize_sql(sql)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12], normalized
+
+
+def params_shape(params, executemany=False):
+    """Forma de los parámetros sin sus valores: '-', '3', '2 nombrados' o '1000×12' (executemany)"""
+    if not params:
+        return '-'
+    if executemany:
+        rows = params if isinstance(params, (list, tuple)) else list(params)
+        first = rows[0] if rows else ()
+        return f"{len(rows)}×{len(first) if hasattr(first, '__len__') else 1}"
+    if isinstance(params, dict):
+        return f"{len(params)} nombrados"
+    return str(len(params)) if hasattr(params, '__len__') else '1'
+
+
+class StatementStats:
+    """Histograma y totales de una huella"""
+
+    def __init__(self, key, sql):
+        self.key = key
+        self.sql = sql
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.buckets = [0] * len(HISTOGRAM_BUCKETS_MS)
+        self.shapes = set()
+        self.stages = set()
+
+    def add(self, seconds, rows, shape, stage, error=False):
+        self.count += 1
+        self.errors += int(error)
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if rows is not None and rows > 0:
+            self.rows += rows
+        milliseconds = seconds * 1000
+        for index, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if milliseconds <= bound:
+                self.buckets[index] += 1
+                break
+        self.shapes.add(shape)
+        if stage:
+            self.stages.add(stage)
+
+    def percentile_ms(self, quantile):
+        """Límite superior del balde que contiene el percentil (ms)"""
+        target = quantile * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return HISTOGRAM_BUCKETS_MS[-1]
+
+    def as_dict(self):
+        return {
+            'fingerprint': self.key,
+            'sql': self.sql,
+            'count': self.count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 6),
+            'max_seconds': round(self.max_seconds, 6),
+            'rows': self.rows,
+            'histogram_ms': {str(bound): count for bound, count in zip(HISTOGRAM_BUCKETS_MS, self.buckets) if count},
+            'shapes': sorted(self.shapes),
+            'stages': sorted(self.stages),
+        }
+
+
+class SqlProfiler:
+    """Estadísticas por huella de todas las sentencias del proceso (un solo objeto: PROFILER)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = None
+        self.slow_log_path = None
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._slow_log = None
+
+    def configure(self, enabled, slow_ms=None, slow_log_path=None):
+        """Habilitar el perfilador; con slow_ms y slow_log_path se escribe el log de sentencias lentas"""
+        self.enabled = bool(enabled)
+        self.slow_ms = slow_ms
+        self.slow_log_path = os.path.expanduser(slow_log_path) if slow_log_path else None
+        self.statements = {}
+
+    def record(self, sql, params, seconds, rows=None, executemany=False, error=None):
+        """Registrar una ejecución (la etapa sale del span actual de instrumentation)"""
+        if not self.enabled:
+            return
+        key, normalized = fingerprint(sql)
+        shape = params_shape(params, executemany)
+        span = METRICS.current() if METRICS.enabled else None
+        stage = span.path if span is not None else None
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(key, normalized)
+            stats.add(seconds, rows, shape, stage, error is not None)
+            if self.slow_ms is not None and self.slow_log_path and seconds * 1000 >= self.slow_ms:
+                self._write_slow({
+                    'ts': round(time.time(), 3),
+                    'fingerprint': key,
+                    'seconds': round(seconds, 6),
+                    'rows': rows if rows is not None and rows >= 0 else None,
+                    'params': shape,
+                    'stage': stage,
+                    'error': str(error) if error is not None else None,
+                    'sql': normalized[:SLOW_LOG_SQL_CHARS],
+                })
+
+    def _write_slow(self, entry):
+        import json
+
+        if self._slow_log is None:
+            directory = os.path.dirname(self.slow_log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._slow_log = open(self.slow_log_path, 'a', encoding='utf-8')
+        self._slow_log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._slow_log.flush()
+
+    def top(self, n=10):
+        """Las n huellas con más tiempo total"""
+        with self._lock:
+            statements = list(self.statements.values())
+        return sorted(statements, key=lambda stats: stats.seconds, reverse=True)[:n]
+
+    def report(self, n=10, width=90):
+        """Texto del reporte "top N sentencias por tiempo total" """
+        with self._lock:
+            statements = list(self.statements.values())
+        if not statements:
+            return "🐢 Perfil SQL: sin sentencias registradas"
+        total = sum(stats.seconds for stats in statements)
+        executions = sum(stats.count for stats in statements)
+        lines = [f"🐢 Sentencias SQL por tiempo total (top {min(n, len(statements))} de "
+                 f"{len(statements)} huellas, {executions:,} ejecuciones, {total:.2f}s)"]
+        for position, stats in enumerate(self.top(n), 1):
+            share = stats.seconds / total * 100 if total else 0.0
+            p95 = stats.percentile_ms(0.95)
+            p95_text = "∞" if p95 == float('inf') else f"{p95:g}ms"
+            errors = f" · {stats.errors} errores" if stats.errors else ""
+            stages = ', '.join(sorted(stats.stages)[:3]) or '-'
+            sql = stats.sql if len(stats.sql) <= width else stats.sql[:width - 1] + '…'
+            lines.append(f"  {position:>2}. {stats.seconds:8.3f}s {share:5.1f}%  ×{stats.count:<6,} "
+                         f"p95≤{p95_text:<8} máx {stats.max_seconds * 1000:,.1f}ms  "
+                         f"{stats.rows:,} filas{errors}  [{stages}]")
+            lines.append(f"      {stats.key}  {sql}")
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        """Guardar el histograma de cada huella (ordenadas por tiempo total)"""
+        import json
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        statements = [stats.as_dict() for stats in self.top(len(self.statements))]
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'buckets_ms': [str(bound) for bound in HISTOGRAM_BUCKETS_MS],
+                       'statements': statements}, file, ensure_ascii=False, indent=2)
+        return path
+
+    def close(self):
+        with self._lock:
+            if self._slow_log is not None:
+                self._slow_log.close()
+                self._slow_log = None
+
+
+class ProfiledCursor:
+    """Cursor DB-API que registra cada execute en PROFILER"""
+
+    def __init__(self, cursor):
+        object.__setattr__(self, '_cursor', cursor)
+
+    def _timed(self, method, sql, params, executemany):
+        started = time.perf_counter()
+        try:
+            result = method(sql, params) if params is not None else method(sql)
+        except Exception as e:
+            PROFILER.record(sql, params, time.perf_counter() - started, executemany=executemany, error=e)
+            raise
+        rowcount = getattr(self._cursor, 'rowcount', None)
+        PROFILER.record(sql, params, time.perf_counter() - started, rowcount, executemany)
+        return result
+
+    def execute(self, sql, *params):
+        # pyodbc acepta parámetros sueltos además de una secuencia
+        params = params[0] if len(params) == 1 else (params or None)
+        result = self._timed(self._cursor.execute, sql, params, False)
+        return self if result is self._cursor else result
+
+    def executemany(self, sql, params):
+        return self._timed(self._cursor.executemany, sql, params, True)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # fast_executemany y similares se configuran en el cursor real
+        setattr(self._cursor, name, value)
+
+
+class ProfiledConnection:
+    """Conexión DB-API cuyos cursores se perfilan"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def raw_connection(engine):
+    """Conexión DB-API del pool del engine, perfilada si PROFILER está habilitado"""
+    connection = engine.raw_connection()
+    return ProfiledConnection(connection) if PROFILER.enabled else connection
+
+
+def profile_engine(engine):
+    """Registrar en PROFILER cada sentencia que SQLAlchemy ejecuta en este engine"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if PROFILER.enabled:
+            conn.info.setdefault('proteia_profile_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('proteia_profile_started')
+        if started:
+            PROFILER.record(statement, parameters, time.perf_counter() - started.pop(),
+                            getattr(cursor, 'rowcount', None), executemany)
+
+    @event.listens_for(engine, 'handle_error')
+    def on_error(context):
+        started = context.connection.info.get('proteia_profile_started') if context.connection else None
+        if started and context.statement:
+            PROFILER.record(context.statement, context.parameters, time.perf_counter() - started.pop(),
+                            executemany=bool(context.execution_context and context.execution_context.executemany),
+                            error=context.original_exception)
+
+
+PROFILER = SqlProfiler()
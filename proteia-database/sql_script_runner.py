@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Ejecución de scripts .sql por lotes (separados por GO)
+El archivo se lee línea por línea y un tokenizador lleva el estado de
+cadenas ('...'), identificadores ([...] y "...") y comentarios (-- y /* */,
+anidados como en T-SQL). GO solo separa lotes cuando está solo en su línea
+y fuera de cadenas o comentarios; "GO 5" repite el lote cinco veces.
+
+Todos los lotes corren sobre una sola conexión del pool. El alcance de la
+transacción es configurable:
+- deployment: todos los archivos en una transacción (todo o nada)
+- script: una transacción por archivo
+- batch: commit después de cada lote (comportamiento anterior)
+"""
+
+import os
+import re
+import time
+
+from instrumentation import METRICS
+from sql_profiler import raw_connection
+
+TRANSACTION_SCOPES = ('deployment', 'script', 'batch')
+
+GO_LINE = re.compile(r'^\s*GO(?:\s+(\d+))?\s*(?:--.*)?$', re.IGNORECASE)
+
+# Próximo carácter relevante según el estado del tokenizador
+_NEXT_TOKEN = {
+    None: re.compile(r"'|\[|\"|--|/\*"),
+    'string': re.compile(r"'"),
+    'bracket': re.compile(r'\]'),
+    'quoted': re.compile(r'"'),
+    'block': re.compile(r'/\*|\*/'),
+}
+_OPENERS = {"'": 'string', '[': 'bracket', '"': 'quoted'}
+_CLOSERS = {'string': "'", 'bracket': ']', 'quoted': '"'}
+
+
+class SqlScriptError(Exception):
+    """Error en un lote: archivo y línea donde empieza el lote"""
+
+    def __init__(self, path, line, message):
+        super().__init__(f"{os.path.basename(path)}:{line}: {message}")
+        self.path = path
+        self.line = line
+
+
+class SqlBatch:
+    """Lote de un script: texto, repeticiones (GO n) y línea donde empieza"""
+
+    def __init__(self, number, sql, repeat, line):
+        self.number = number
+        self.sql = sql
+        self.repeat = repeat
+        self.line = line
+
+
+class BatchResult:
+    """Tiempo y filas afectadas de un lote ejecutado"""
+
+    def __init__(self, path, batch, seconds, rows):
+        self.path = path
+        self.number = batch.number
+        self.line = batch.line
+        self.repeat = batch.repeat
+        self.seconds = seconds
+        self.rows = rows
+
+
+def scan_line(line, state=None, depth=0):
+    """
+    Avanzar el tokenizador sobre una línea
+    Devuelve (estado al final de la línea, profundidad de /* */, hay código fuera de comentarios)
+    """
+    position, has_code = 0, False
+    while True:
+        match = _NEXT_TOKEN[state].search(line, position)
+        end = match.start() if match else len(line)
+        if state is None and line[position:end].strip():
+            has_code = True
+        if match is None:
+            return state, depth, has_code
+
+        token = match.group()
+        position = match.end()
+        if state is None:
+            if token == '--':
+                return None, depth, has_code
+            if token == '/*':
+                state, depth = 'block', 1
+            else:
+                state, has_code = _OPENERS[token], True
+        elif state == 'block':
+            depth += 1 if token == '/*' else -1
+            if depth == 0:
+                state = None
+        elif line.startswith(_CLOSERS[state], position):
+            # '' , ]] y "" son el delimitador escapado dentro del literal
+            position += 1
+        else:
+            state = None
+
+
+def iter_batches(lines):
+    """Lotes de un iterable de líneas, sin cargar el archivo completo"""
+    buffer, has_code = [], False
+    state, depth = None, 0
+    start_line, number = 1, 0
+
+    for line_number, line in enumerate(lines, 1):
+        go = GO_LINE.match(line) if state is None else None
+        if go:
+            if has_code:
+                number += 1
+                yield SqlBatch(number, ''.join(buffer), int(go.group(1) or 1), start_line)
+            buffer, has_code, start_line = [], False, line_number + 1
+            continue
+
+        state, depth, line_code = scan_line(line, state, depth)
+        buffer.append(line)
+        has_code = has_code or line_code
+
+    if state is not None:
+        raise ValueError(f"Fin de archivo dentro de {'un comentario' if state == 'block' else 'un literal'} "
+                         f"(lote que empieza en la línea {start_line})")
+    if has_code:
+        yield SqlBatch(number + 1, ''.join(buffer), 1, start_line)
+
+
+def read_batches(path):
+    """Lotes de un archivo .sql leído en streaming"""
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        yield from iter_batches(file)
+
+
+def _affected_rows(cursor):
+    """
+    Filas afectadas por todas las sentencias del lote
+    Recorrer nextset() también hace aparecer los errores de sentencias posteriores a la primera
+    """
+    total = 0
+    while True:
+        if cursor.rowcount and cursor.rowcount > 0:
+            total += cursor.rowcount
+        nextset = getattr(cursor, 'nextset', None)
+        if nextset is None or not nextset():
+            return total
+
+
+class SqlScriptRunner:
+    """Ejecutar scripts .sql sobre una conexión del pool con el alcance de transacción elegido"""
+
+    def __init__(self, engine, transaction='deployment', progress=print):
+        if transaction not in TRANSACTION_SCOPES:
+            raise ValueError(f"Alcance de transacción desconocido: {transaction} "
+                             f"(opciones: {', '.join(TRANSACTION_SCOPES)})")
+        self.engine = engine
+        self.transaction = transaction
+        self.progress = progress
+        self.results = []
+
+    def _run_file(self, connection, path):
+        cursor = connection.cursor()
+        try:
+            with METRICS.span(os.path.basename(path)):
+                METRICS.add(bytes_read=os.path.getsize(path))
+                for batch in read_batches(path):
+                    started = time.perf_counter()
+                    rows = 0
+                    try:
+                        for _ in range(batch.repeat):
+                            cursor.execute(batch.sql)
+                            rows += _affected_rows(cursor)
+                    except Exception as e:
+                        raise SqlScriptError(path, batch.line, e) from e
+                    METRICS.add(rows=rows, round_trips=batch.repeat)
+                    self.results.append(BatchResult(path, batch, time.perf_counter() - started, rows))
+                    if self.transaction == 'batch':
+                        connection.commit()
+        except ValueError as e:
+            raise SqlScriptError(path, 0, e) from e
+        finally:
+            cursor.close()
+
+    def run(self, paths):
+        """
+        Ejecutar los archivos en orden; ante un error se revierte la transacción
+        abierta y se lanza SqlScriptError (self.results conserva los lotes ejecutados)
+        """
+        self.results = []
+        connection = raw_connection(self.engine)
+        try:
+            for path in paths:
+                self.progress(f"  Ejecutando {os.path.basename(path)}...")
+                self._run_file(connection, path)
+                if self.transaction == 'script':
+                    connection.commit()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        return self.results
+
+    def report(self, wall_seconds=None, slowest=5):
+        """Texto con el tiempo por archivo y los lotes más lentos"""
+        if wall_seconds is None:
+            wall_seconds = sum(result.seconds for result in self.results)
+        lines = [f"📜 {len(self.results)} lotes en {wall_seconds:.2f}s (transacción: {self.transaction})"]
+
+        per_file = {}
+        for result in self.results:
+            batches, seconds, rows = per_file.get(result.path, (0, 0.0, 0))
+            per_file[result.path] = (batches + 1, seconds + result.seconds, rows + result.rows)
+        for path, (batches, seconds, rows) in per_file.items():
+            lines.append(f"   {os.path.basename(path):<28} {batches:>3} lotes {seconds:>8.3f}s {rows:>9,} filas")
+
+        ranked = sorted(self.results, key=lambda result: result.seconds, reverse=True)[:slowest]
+        if ranked:
+            lines.append("   Lotes más lentos:")
+        for result in ranked:
+            repeat = f" ×{result.repeat}" if result.repeat > 1 else ""
+            lines.append(f"   {result.seconds:>8.3f}s  {os.path.basename(result.path)}:{result.line} "
+                         f"(lote {result.number}{repeat}, {result.rows:,} filas)")
+        return '\n'.join(lines)
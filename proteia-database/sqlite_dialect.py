@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Traducción de T-SQL a SQLite para el backend local
+La traducción ocurre en el cursor DB-API (TSqlConnection / TSqlCursor), así
+que todo el código que ya escribe T-SQL (text() de SQLAlchemy, pd.read_sql,
+cursores de raw_connection, bulk_loader y sql_script_runner) funciona contra
+un archivo SQLite sin cambios.
+
+Se traducen:
+- Tipos: INT IDENTITY(1,1) PRIMARY KEY, NVARCHAR(MAX), DECIMAL(p,s)
+- Funciones: TRY_CAST, ISNULL, LEN, STRING_AGG (WITHIN GROUP se ignora),
+  GETDATE, SCOPE_IDENTITY, NEWID
+- SELECT TOP (n) y OFFSET ... FETCH -> LIMIT/OFFSET
+- IF OBJECT_ID(...) IS NULL CREATE TABLE -> CREATE TABLE IF NOT EXISTS
+- IF NOT EXISTS (SELECT ... FROM sys.indexes ...) CREATE INDEX -> CREATE INDEX IF NOT EXISTS
+- Lotes con varias sentencias y variables DECLARE @x = ... (parámetros :x)
+- CREATE PROCEDURE sin parámetros: el cuerpo se guarda y EXEC lo ejecuta
+
+Lo que no tiene equivalente (MERGE, funciones, triggers, procedimientos con
+parámetros) falla con NotSupportedError o se omite al desplegar.
+"""
+
+import datetime
+import functools
+import re
+import sqlite3
+
+PROCEDURES_TABLE = '_tsql_procedures'
+
+# Literales se reemplazan por marcadores \x00n\x00 y los comentarios por un espacio
+_LITERAL_OR_COMMENT = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_PLACEHOLDER = re.compile(r'\x00(\d+)\x00')
+
+_NAME = r'((?:\[[^\]]+\]|\w+)(?:\.(?:\[[^\]]+\]|\w+))*)'
+
+_REWRITES = [(re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in [
+    (r'\bN(?=\x00)', ''),
+    (r'\b(?:BIG)?INT(?:EGER)?\s+IDENTITY\s*\(\s*\d+\s*,\s*\d+\s*\)\s+PRIMARY\s+KEY\b', 'INTEGER PRIMARY KEY'),
+    (r'\bIDENTITY\s*\(\s*\d+\s*,\s*\d+\s*\)', ''),
+    (r'\bN?VARCHAR\s*\(\s*MAX\s*\)', 'TEXT'),
+    (r'\bVARBINARY\s*\(\s*MAX\s*\)', 'BLOB'),
+    # DECIMAL con afinidad NUMERIC guarda 10.0 como entero y 10 / 4 daría 2
+    (r'\b(?:DECIMAL|NUMERIC)\s*\(\s*\d+\s*(?:,\s*\d+\s*)?\)', 'REAL'),
+    (r'\b(?:GETDATE|GETUTCDATE|SYSDATETIME|SYSUTCDATETIME)\s*\(\s*\)', 'CURRENT_TIMESTAMP'),
+    (r'\bSCOPE_IDENTITY\s*\(\s*\)', 'last_insert_rowid()'),
+    (r'\bNEWID\s*\(\s*\)', 'lower(hex(randomblob(16)))'),
+    (r'\bISNULL\s*\(', 'IFNULL('),
+    (r'\bLEN\s*\(', 'LENGTH('),
+    (r'\bSTRING_AGG\s*\(', 'GROUP_CONCAT('),
+    (r'\bREFERENCES\s+\w+\.', 'REFERENCES '),
+    (r'(?:\[dbo\]|\bdbo)\.', ''),
+    (r'\bWITH\s*\(\s*NOLOCK\s*\)', ''),
+    (r'\bCREATE\s+(UNIQUE\s+)?(?:NON)?CLUSTERED\s+INDEX\b', r'CREATE \1INDEX'),
+    (r'\bOFFSET\s+(\S+)\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+(\S+)\s+ROWS?\s+ONLY\b', r'LIMIT \2 OFFSET \1'),
+    # Variables de T-SQL como parámetros con nombre de sqlite3 (@@ROWCOUNT no)
+    (r'(?<![@\w])@(\w+)', r':\1'),
+]]
+
+_TRY_CAST = re.compile(r'\bTRY_CAST\s*\(', re.IGNORECASE)
+_WITHIN_GROUP = re.compile(r'\bWITHIN\s+GROUP\s*\(', re.IGNORECASE)
+_INCLUDE = re.compile(r'\)\s*INCLUDE\s*\(', re.IGNORECASE)
+_TOP = re.compile(r'\bSELECT\s+(DISTINCT\s+)?TOP\s*(?:\(\s*([^()]+?)\s*\)|(\d+))', re.IGNORECASE)
+_AS = re.compile(r'\bAS\b', re.IGNORECASE)
+
+_IF_TABLE_MISSING = re.compile(r'\bIF\s+OBJECT_ID\s*\(\s*\x00\d+\x00\s*(?:,\s*\x00\d+\x00\s*)?\)\s+IS\s+NULL\s+'
+                               r'(BEGIN\s+)?CREATE\s+TABLE\s+', re.IGNORECASE)
+_IF_TABLE_EXISTS = re.compile(r'\bIF\s+OBJECT_ID\s*\(\s*\x00\d+\x00\s*(?:,\s*\x00\d+\x00\s*)?\)\s+IS\s+NOT\s+NULL\s+'
+                              r'DROP\s+TABLE\s+', re.IGNORECASE)
+_IF_INDEX_MISSING = re.compile(r'\bIF\s+NOT\s+EXISTS\s*\(\s*SELECT\s+[^()]*?\bFROM\s+sys\.indexes\b', re.IGNORECASE)
+_CREATE_INDEX = re.compile(r'\s*CREATE\s+(UNIQUE\s+)?(?:(?:NON)?CLUSTERED\s+)?INDEX\s+', re.IGNORECASE)
+_BLOCK_END = re.compile(r'\s*;?\s*END\b', re.IGNORECASE)
+
+_PROCEDURE = re.compile(r'^\s*CREATE\s+(?:OR\s+ALTER\s+)?PROC(?:EDURE)?\s+' + _NAME + r'(.*?)\bAS\b(.*)$',
+                        re.IGNORECASE | re.DOTALL)
+_PROCEDURE_BODY = re.compile(r'^\s*BEGIN\b(.*)\bEND\s*;?\s*$', re.IGNORECASE | re.DOTALL)
+_UNSUPPORTED_OBJECT = re.compile(r'^\s*CREATE\s+(?:OR\s+ALTER\s+)?(FUNCTION|TRIGGER)\b', re.IGNORECASE)
+_ALTER_VIEW = re.compile(r'^\s*CREATE\s+OR\s+ALTER\s+VIEW\s+' + _NAME, re.IGNORECASE)
+_EXEC = re.compile(r'^\s*EXEC(?:UTE)?\s+' + _NAME + r'\s*(.*?)\s*$', re.IGNORECASE | re.DOTALL)
+_DECLARE = re.compile(r'^\s*DECLARE\s+@(\w+)\s+\w+(?:\s*\([^)]*\))?\s*(?:=\s*(.+?))?\s*$',
+                      re.IGNORECASE | re.DOTALL)
+_MERGE = re.compile(r'^\s*MERGE\b', re.IGNORECASE)
+# Sentencias de sesión sin efecto en SQLite
+_IGNORED = re.compile(r'^\s*(?:SET\s+(?:NOCOUNT|XACT_ABORT|ANSI_\w+|QUOTED_IDENTIFIER)\b|PRINT\b|USE\b)',
+                      re.IGNORECASE)
+_NAMED_PARAMETER = re.compile(r'(?<![:\w]):\w+')
+
+
+def _mask(sql):
+    """Reemplazar literales por marcadores y quitar comentarios"""
+    literals = []
+
+    def replace(match):
+        token = match.group()
+        if not token.startswith("'"):
+            return ' '
+        literals.append(token)
+        return f'\x00{len(literals) - 1}\x00'
+
+    return _LITERAL_OR_COMMENT.sub(replace, sql), literals
+
+
+def _unmask(code, literals):
+    return _PLACEHOLDER.sub(lambda match: literals[int(match.group(1))], code)
+
+
+def _matching_paren(code, open_index):
+    """Posición del paréntesis que cierra el de open_index"""
+    depth = 0
+    for index in range(open_index, len(code)):
+        if code[index] == '(':
+            depth += 1
+        elif code[index] == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    raise sqlite3.OperationalError("Paréntesis sin cerrar en la sentencia T-SQL")
+
+
+def _scope_end(code, start):
+    """Fin del SELECT que empieza en start: el paréntesis que lo encierra o el final"""
+    depth = 0
+    for index in range(start, len(code)):
+        if code[index] == '(':
+            depth += 1
+        elif code[index] == ')':
+            if depth == 0:
+                return index
+            depth -= 1
+    return len(code.rstrip())
+
+
+def _split_statements(code):
+    """Sentencias de un lote separadas por ; fuera de paréntesis"""
+    statements, depth, start = [], 0, 0
+    for index, char in enumerate(code):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ';' and depth == 0:
+            statements.append(code[start:index])
+            start = index + 1
+    statements.append(code[start:])
+    return [statement for statement in statements if statement.strip()]
+
+
+def _object_key(name):
+    """Nombre de objeto sin corchetes ni esquema, en minúsculas (collation CI)"""
+    return name.replace('[', '').replace(']', '').split('.')[-1].lower()
+
+
+def _rewrite_object_checks(code):
+    """
+    IF OBJECT_ID(...) IS [NOT] NULL alrededor de CREATE/DROP TABLE e
+    IF NOT EXISTS (... sys.indexes ...) antes de CREATE INDEX -> IF [NOT] EXISTS
+    """
+    code = _IF_TABLE_EXISTS.sub('DROP TABLE IF EXISTS ', code)
+    start = 0
+    while True:
+        match = _IF_INDEX_MISSING.search(code, start)
+        if match is None:
+            break
+        end = _matching_paren(code, code.index('(', match.start())) + 1
+        create = _CREATE_INDEX.match(code, end)
+        if create is None:
+            start = end
+            continue
+        code = f"{code[:match.start()]}CREATE {create.group(1) or ''}INDEX IF NOT EXISTS {code[create.end():]}"
+    while True:
+        match = _IF_TABLE_MISSING.search(code)
+        if match is None:
+            return code
+        end = _matching_paren(code, code.index('(', match.end())) + 1
+        rest = code[end:]
+        if match.group(1):
+            block_end = _BLOCK_END.match(rest)
+            if block_end:
+                rest = ';' + rest[block_end.end():]
+        code = code[:match.start()] + 'CREATE TABLE IF NOT EXISTS ' + code[match.end():end] + rest
+
+
+def _rewrite_calls(code):
+    """Traducciones que necesitan ubicar el paréntesis de cierre"""
+    while True:
+        match = _TRY_CAST.search(code)
+        if match is None:
+            break
+        close = _matching_paren(code, match.end() - 1)
+        inner = code[match.end():close]
+        split = [found for found in _AS.finditer(inner)
+                 if inner[:found.start()].count('(') == inner[:found.start()].count(')')]
+        if not split:
+            raise sqlite3.OperationalError("TRY_CAST sin AS")
+        expression, type_name = inner[:split[-1].start()], inner[split[-1].end():].strip()
+        code = f"{code[:match.start()]}tsql_try_cast({expression}, '{type_name.upper()}'){code[close + 1:]}"
+
+    for pattern in (_WITHIN_GROUP, _INCLUDE):
+        while True:
+            match = pattern.search(code)
+            if match is None:
+                break
+            close = _matching_paren(code, match.end() - 1)
+            # INCLUDE (...) conserva el ) de la lista de columnas del índice
+            keep = ')' if pattern is _INCLUDE else ''
+            code = code[:match.start()] + keep + code[close + 1:]
+
+    while True:
+        match = _TOP.search(code)
+        if match is None:
+            return code
+        limit = match.group(2) or match.group(3)
+        end = _scope_end(code, match.end())
+        code = (f"{code[:match.start()]}SELECT {match.group(1) or ''}{code[match.end():end].rstrip()} "
+                f"LIMIT {limit}{code[end:]}")
+
+
+def _rewrite(code):
+    for pattern, replacement in _REWRITES:
+        code = pattern.sub(replacement, code)
+    return _rewrite_calls(code)
+
+
+def _sql_op(code, literals):
+    sql = _unmask(code, literals).strip()
+    return ('sql', sql, bool(_NAMED_PARAMETER.search(code)))
+
+
+def _statement_ops(code, literals):
+    """Operaciones de una sentencia (ya sin literales ni comentarios)"""
+    if _IGNORED.match(code):
+        return []
+    if _MERGE.match(code):
+        return [('unsupported', "MERGE no está disponible en SQLite (incremental_sync requiere Azure SQL)")]
+
+    execute = _EXEC.match(code)
+    if execute:
+        if execute.group(2):
+            return [('unsupported', f"EXEC con parámetros no está disponible en SQLite: {execute.group(1)}")]
+        return [('exec', _object_key(execute.group(1)))]
+
+    declare = _DECLARE.match(code)
+    if declare:
+        expression = declare.group(2)
+        select = _unmask('SELECT ' + _rewrite(expression), literals) if expression else None
+        return [('declare', declare.group(1), select)]
+
+    view = _ALTER_VIEW.match(code)
+    if view:
+        drop = ('sql', f"DROP VIEW IF EXISTS {view.group(1)}", False)
+        return [drop, _sql_op(_rewrite('CREATE VIEW ' + view.group(1) + code[view.end():]), literals)]
+
+    return [_sql_op(_rewrite(code), literals)]
+
+
+@functools.lru_cache(maxsize=1024)
+def translate_batch(sql):
+    """
+    Operaciones SQLite de un lote T-SQL (tupla, en caché por texto):
+    ('sql', sentencia, usa_variables), ('declare', nombre, select),
+    ('procedure', nombre, cuerpo), ('exec', nombre), ('skip', motivo)
+    y ('unsupported', mensaje)
+    """
+    code, literals = _mask(sql)
+
+    procedure = _PROCEDURE.match(code)
+    if procedure:
+        name, parameters, body = procedure.groups()
+        if '@' in parameters:
+            return (('skip', f"procedimiento con parámetros {name}"),)
+        block = _PROCEDURE_BODY.match(body)
+        return (('procedure', _object_key(name), _unmask(block.group(1) if block else body, literals).strip()),)
+
+    unsupported = _UNSUPPORTED_OBJECT.match(code)
+    if unsupported:
+        return (('skip', unsupported.group(1).upper()),)
+
+    ops = []
+    for statement in _split_statements(_rewrite_object_checks(code)):
+        ops.extend(_statement_ops(statement, literals))
+    return tuple(ops)
+
+
+def translate_sql(sql):
+    """Sentencias SQLite equivalentes a un lote T-SQL (solo las que se ejecutan tal cual)"""
+    return [op[1] for op in translate_batch(sql) if op[0] == 'sql']
+
+
+def _type_family(type_name):
+    """Afinidad de un tipo T-SQL con las reglas de SQLite (más fechas)"""
+    upper = type_name.upper()
+    if 'DATE' in upper or 'TIME' in upper:
+        return 'datetime' if 'TIME' in upper else 'date'
+    if 'INT' in upper or upper == 'BIT':
+        return 'integer'
+    if any(part in upper for part in ('CHAR', 'TEXT', 'CLOB')):
+        return 'text'
+    return 'real'
+
+
+def try_cast(value, type_name):
+    """TRY_CAST de T-SQL: el valor convertido o NULL si no se puede convertir"""
+    if value is None:
+        return None
+    family = _type_family(type_name)
+    try:
+        if family == 'text':
+            return str(value)
+        if family == 'integer':
+            return int(value.strip()) if isinstance(value, str) else int(value)
+        if family == 'real':
+            return float(value.strip()) if isinstance(value, str) else float(value)
+        text = str(value).strip()
+        for parse in (datetime.datetime.fromisoformat,
+                      lambda raw: datetime.datetime.strptime(raw, '%m/%d/%Y')):
+            try:
+                parsed = parse(text)
+            except ValueError:
+                continue
+            return parsed.date().isoformat() if family == 'date' else parsed.isoformat(sep=' ')
+        return None
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class TSqlCursor(sqlite3.Cursor):
+    """Cursor que traduce T-SQL antes de ejecutarlo"""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._total_rows = None
+
+    @property
+    def rowcount(self):
+        # Un lote con varias sentencias reporta la suma, como SQL Server
+        return super().rowcount if self._total_rows is None else self._total_rows
+
+    def execute(self, sql, parameters=()):
+        ops = translate_batch(sql)
+        if len(ops) == 1 and ops[0][0] == 'sql' and not ops[0][2]:
+            self._total_rows = None
+            return super().execute(ops[0][1], parameters)
+        self._total_rows = self._run(ops, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        ops = translate_batch(sql)
+        if len(ops) != 1 or ops[0][0] != 'sql':
+            raise sqlite3.NotSupportedError("executemany requiere una sola sentencia")
+        self._total_rows = None
+        return super().executemany(ops[0][1], seq_of_parameters)
+
+    def _run(self, ops, parameters):
+        """Ejecutar las operaciones de un lote; devuelve las filas afectadas"""
+        variables, total = {}, 0
+        for op in ops:
+            kind = op[0]
+            if kind == 'sql':
+                super().execute(op[1], variables if op[2] else parameters)
+                total += max(super().rowcount, 0)
+            elif kind == 'declare':
+                variables[op[1]] = super().execute(op[2], variables).fetchone()[0] if op[2] else None
+            elif kind == 'procedure':
+                super().execute(f"CREATE TABLE IF NOT EXISTS {PROCEDURES_TABLE} "
+                                "(Name TEXT PRIMARY KEY, Body TEXT NOT NULL)")
+                super().execute(f"INSERT OR REPLACE INTO {PROCEDURES_TABLE} (Name, Body) VALUES (?, ?)",
+                                (op[1], op[2]))
+            elif kind == 'exec':
+                total += self._run(translate_batch(self._procedure_body(op[1])), ())
+            elif kind == 'unsupported':
+                raise sqlite3.NotSupportedError(op[1])
+        return total
+
+    def _procedure_body(self, name):
+        try:
+            row = super().execute(f"SELECT Body FROM {PROCEDURES_TABLE} WHERE Name = ?", (name,)).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is None:
+            raise sqlite3.OperationalError(f"Procedimiento no encontrado: {name}")
+        return row[0]
+
+
+class TSqlConnection(sqlite3.Connection):
+    """
+    Conexión sqlite3 cuyos cursores aceptan T-SQL
+    Uso: sqlite3.connect(path, factory=TSqlConnection)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.create_function('tsql_try_cast', 2, try_cast, deterministic=True)
+
+    def cursor(self, factory=TSqlCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
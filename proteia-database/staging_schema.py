@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Esquemas compactos de las tablas de staging
+Sin tipos declarados, el texto de staging se creaba como NVARCHAR(MAX): el
+optimizador estima la mitad del ancho declarado por fila para la concesión de
+memoria de los sorts y hash joins de la migración, y una columna MAX no puede
+ser clave de índice (el join de temp_selected_analysis con Products.ASIN).
+Aquí cada columna recibe el tipo más chico que alcanza:
+
+- Columnas que terminan en Products o ProductAnalysis: el tipo de la tabla
+  final; el texto se achica al ancho observado en la muestra si es menor
+- Columnas sin destino: el tipo de su dtype, o texto del ancho observado
+
+La muestra es el primer lote del CSV. El ancho de texto es el máximo
+observado con WIDTH_HEADROOM de holgura, redondeado al siguiente de
+STRING_WIDTHS. Un lote posterior con texto más largo ensancha la columna
+antes de cargarse (ALTER COLUMN a un NVARCHAR mayor no reescribe filas en
+SQL Server; SQLite no aplica los anchos).
+"""
+
+import math
+import re
+
+from bulk_loader import column_sql_type, quote_identifier
+
+# (columna CSV limpia, columna destino, tipo SQL del destino)
+# ASIN y Product_Name no se copian a ProductAnalysis: se unen con Products
+ANALYSIS_COLUMNS = [
+    ('ASIN', 'ASIN', 'NVARCHAR(20)'),
+    ('Product_Name', 'ProductName', 'NVARCHAR(500)'),
+    ('Value_Proposition', 'ValueProposition', 'NVARCHAR(1000)'),
+    ('Ingredients', 'Ingredients', 'NVARCHAR(2000)'),
+    ('Key_Labels', 'KeyLabels', 'NVARCHAR(500)'),
+    ('Primary_Colors', 'PrimaryColors', 'NVARCHAR(100)'),
+    ('Secondary_Colors', 'SecondaryColors', 'NVARCHAR(100)'),
+    ('Intended_Segment', 'IntendedSegment', 'NVARCHAR(200)'),
+    ('Additional_Notes', 'AdditionalNotes', 'NVARCHAR(1000)'),
+]
+
+# Anchos declarados posibles; más de 4000 caracteres es NVARCHAR(MAX)
+STRING_WIDTHS = (10, 20, 50, 100, 200, 500, 1000, 2000, 4000)
+
+WIDTH_HEADROOM = 1.25
+
+_STRING_TYPE = re.compile(r'^N?VARCHAR\((\d+|MAX)\)$', re.IGNORECASE)
+
+
+def analysis_column_types():
+    """Diccionario columna CSV de Selected_Products_AI -> tipo SQL de su destino"""
+    return {csv_col: sql_type for csv_col, _, sql_type in ANALYSIS_COLUMNS}
+
+
+def string_width(sql_type):
+    """(es texto, ancho): ancho None para MAX; (False, None) si no es texto"""
+    match = _STRING_TYPE.match(sql_type.strip())
+    if not match:
+        return False, None
+    return True, None if match.group(1).upper() == 'MAX' else int(match.group(1))
+
+
+def text_type(length, cap=None):
+    """
+    (tipo, ancho) para texto de hasta length caracteres
+    El tope (ancho del destino) solo se aplica si el texto cabe en él: uno más
+    largo falla en la migración, igual que antes, y no al cargar staging
+    """
+    needed = math.ceil(max(length, 1) * WIDTH_HEADROOM)
+    width = next((width for width in STRING_WIDTHS if width >= needed), None)
+    if cap is not None and length <= cap and (width is None or width > cap):
+        width = cap
+    return f"NVARCHAR({'MAX' if width is None else width})", width
+
+
+def max_length(series):
+    """Largo del texto más largo de la columna (0 si toda es nula)"""
+    import pandas as pd
+
+    length = series.astype('string').str.len().max()
+    return 0 if pd.isna(length) else int(length)
+
+
+def _is_text(series):
+    import pandas as pd
+
+    return (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+            or series.isna().all())
+
+
+class StagingSchema:
+    """Tipos de las columnas de una tabla de staging, ensanchados lote a lote"""
+
+    def __init__(self, table_name, targets=None):
+        self.table_name = table_name
+        self.targets = targets or {}
+        self.column_types = {}
+        self.text = {}  # columna de texto -> [ancho declarado (None = MAX), tope del destino]
+
+    def derive(self, sample):
+        """Tipos de todas las columnas a partir de la muestra; devuelve column_types"""
+        for column in sample.columns:
+            target = self.targets.get(column)
+            is_text, cap = string_width(target) if target else (_is_text(sample[column]), None)
+            if target and not is_text:
+                self.column_types[column] = target
+            elif is_text:
+                self.column_types[column], width = text_type(max_length(sample[column]), cap)
+                self.text[column] = [width, cap]
+            else:
+                self.column_types[column] = column_sql_type(sample[column])
+        return self.column_types
+
+    def observe(self, engine):
+        """Tomar los tipos de la tabla ya creada (carga reanudada)"""
+        from sqlalchemy import String, inspect
+
+        with engine.connect() as conn:
+            columns = inspect(conn).get_columns(self.table_name)
+        for column in columns:
+            target = self.targets.get(column['name'])
+            _, cap = string_width(target) if target else (False, None)
+            self.column_types[column['name']] = str(column['type'])
+            if isinstance(column['type'], String):
+                self.text[column['name']] = [getattr(column['type'], 'length', None), cap]
+        return self.column_types
+
+    def widen(self, frame):
+        """Columnas de texto que el lote desborda: {columna: tipo nuevo}"""
+        changes = {}
+        for column, (width, cap) in self.text.items():
+            if width is None or column not in frame.columns:
+                continue
+            length = max_length(frame[column])
+            if length > width:
+                sql_type, new_width = text_type(length, cap)
+                self.text[column][0] = new_width
+                self.column_types[column] = changes[column] = sql_type
+        return changes
+
+    def alter(self, engine, changes):
+        """Ensanchar las columnas de la tabla ya creada (no hace falta en SQLite)"""
+        from sqlalchemy import text
+
+        if not changes or engine.dialect.name == 'sqlite':
+            return
+        table = quote_identifier(self.table_name)
+        with engine.connect() as conn:
+            for column, sql_type in changes.items():
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {quote_identifier(column)} {sql_type} NULL"))
+            conn.commit()
+
+    def declared_width(self):
+        """Caracteres de texto declarados por fila (sin contar las columnas MAX)"""
+        return sum(width for width, _ in self.text.values() if width is not None)
+
+    def report(self):
+        """Resumen de una línea del esquema para los scripts"""
+        unbounded = sum(1 for width, _ in self.text.values() if width is None)
+        return (f"📐 Esquema de staging: {len(self.column_types)} columnas, "
+                f"{len(self.text)} de texto con {self.declared_width():,} caracteres declarados por fila, "
+                f"{unbounded} NVARCHAR(MAX)")
@@ -4,11 +4,12 @@ Script para probar la conexión a Azure SQL Database
 Configurado para: xworld-proteo.database.windows.net/proteo
 """
 
-import pyodbc
 import sys
-from connection_config import DATABASE_CONFIG, get_direct_connection_string
+from connection_config import AZURE_SQL_NOTES, DATABASE_CONFIG, pooled_connection
 
 def test_azure_sql_connection():
+    import pyodbc
+    
     print("🔍 Probando conexión a Azure SQL Database")
     print("=" * 50)
     print(f"🌐 Servidor: {DATABASE_CONFIG['server']}")
@@ -26,11 +27,8 @@ def test_azure_sql_connection():
     try:
         print("\n🔄 Conectando...")
         
-        # Construir cadena de conexión
-        conn_str = get_direct_connection_string(username, password)
-        
-        # Intentar conexión
-        with pyodbc.connect(conn_str) as conn:
+        # Intentar conexión (pool compartido)
+        with pooled_connection(username, password) as conn:
             cursor = conn.cursor()
             
             # Probar consulta básica
@@ -137,23 +135,29 @@ def check_prerequisites():
     
     return True
 
-if __name__ == "__main__":
+def main():
     print("🧪 Test de Conexión - Azure SQL Database Proteo")
     print("=" * 60)
+    print(AZURE_SQL_NOTES)
     
     # Verificar prerrequisitos
     if not check_prerequisites():
         print("\n❌ Faltan prerrequisitos. Instala las dependencias faltantes.")
-        sys.exit(1)
+        return 1
     
     # Probar conexión
     if test_azure_sql_connection():
         print("\n🎉 ¡Todo listo para la importación de datos!")
         print("\nPróximo paso:")
-        print("   python3 import_data.py")
+        print("   python3 proteia_db.py import")
+        return 0
     else:
         print("\n❌ Resuelve los problemas de conexión antes de continuar")
         print("\nSi necesitas ayuda:")
         print("   1. Verifica el firewall de Azure SQL")
         print("   2. Confirma las credenciales")
         print("   3. Asegúrate de tener los drivers ODBC instalados")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
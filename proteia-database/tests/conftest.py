@@ -0,0 +1,18 @@
+"""Fixtures compartidas: los módulos viven en proteia-database, sin paquete"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Engine del backend SQLite local (T-SQL traducido) sobre un archivo temporal"""
+    from backends import SQLiteBackend
+
+    engine = SQLiteBackend(str(tmp_path / 'proteia_test.db')).create_engine()
+    yield engine
+    engine.dispose()
@@ -0,0 +1,77 @@
+import sqlite3
+
+from sqlalchemy.exc import OperationalError
+
+from adaptive_loader import classify_error, error_codes, retry_after, sqlstate
+
+
+class DriverError(Exception):
+    """Error con los args de pyodbc: (SQLSTATE, mensaje con el número nativo al final)"""
+
+
+def pyodbc_error(state, message, native):
+    return DriverError(state, f"[{state}] [Microsoft][ODBC Driver 18 for SQL Server][SQL Server]{message} "
+                              f"({native}) (SQLExecDirectW)")
+
+
+def wrapped(orig):
+    """Como lo lanza SQLAlchemy: el error del driver en .orig"""
+    return OperationalError("INSERT INTO Products ...", {}, orig)
+
+
+def test_throttling():
+    error = wrapped(pyodbc_error('42000', "The request limit for the database is 30 and has been reached.", 10928))
+    assert error_codes(error) == {10928}
+    assert classify_error(error) == 'throttle'
+
+
+def test_transient_native_codes():
+    deadlock = pyodbc_error('40001', "Transaction (Process ID 52) was deadlocked on lock resources. "
+                                     "Rerun the transaction.", 1205)
+    assert classify_error(deadlock) == 'transient'
+    assert classify_error(wrapped(pyodbc_error('08S01', "TCP Provider: Error code 0x2746", 10054))) == 'transient'
+
+
+def test_pymssql_native_number():
+    assert classify_error(DriverError(40613, b"Database 'proteo' is not currently available.")) == 'transient'
+
+
+def test_numbers_in_the_message_are_not_codes():
+    """Un valor de clave (1205) o un tipo nvarchar(64) no son números de error"""
+    duplicate = wrapped(pyodbc_error('23000', "Violation of UNIQUE KEY constraint 'UQ_Products_ASIN'. Cannot "
+                                              "insert duplicate key in object 'dbo.Products'. "
+                                              "The duplicate key value is (1205).", 2627))
+    assert error_codes(duplicate) == {2627}
+    assert classify_error(duplicate) is None
+    truncated = wrapped(pyodbc_error('22001', "String or binary data would be truncated in column "
+                                              "nvarchar(64).", 2628))
+    assert classify_error(truncated) is None
+    assert classify_error(ValueError("error code 1205 (40501)")) is None
+
+
+def test_sqlstate_from_driver_args():
+    assert sqlstate(wrapped(pyodbc_error('HYT00', "Query timeout expired", 0))) == 'HYT00'
+    assert classify_error(wrapped(pyodbc_error('HYT00', "Query timeout expired", 0))) == 'transient'
+    # Un SQLSTATE transitorio dentro del texto no cuenta
+    invalid = wrapped(pyodbc_error('42S02', "Invalid object name 'HYT00_08S01'.", 208))
+    assert sqlstate(invalid) == '42S02'
+    assert classify_error(invalid) is None
+
+
+def test_sqlite_locks():
+    assert classify_error(wrapped(sqlite3.OperationalError('database is locked'))) == 'transient'
+    assert classify_error(sqlite3.OperationalError('database table is locked')) == 'transient'
+    assert classify_error(sqlite3.OperationalError('no such table: temp_products_market')) is None
+    assert classify_error(sqlite3.IntegrityError('database is locked')) is None
+
+
+def test_several_diagnostic_records():
+    error = DriverError('HY000', "[HY000] first (50000) (SQLExecDirectW); [01000] second (40501)")
+    assert error_codes(error) == {50000, 40501}
+    assert classify_error(error) == 'throttle'
+
+
+def test_retry_after():
+    error = pyodbc_error('42000', "Service is busy. Retry the request after 10 seconds.", 40501)
+    assert retry_after(error) == 10
+    assert retry_after(ValueError("sin espera")) == 0
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import text
+
+from partitioned_migration import PartitionedMigration
+
+COLUMNS = ['ASIN', 'ProductName', 'Price']
+
+
+@pytest.fixture
+def engine(sqlite_engine):
+    with sqlite_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE temp_products (ASIN NVARCHAR(20), ProductName NVARCHAR(500), "
+                          "Price DECIMAL(10,2))"))
+        conn.execute(text("CREATE TABLE Products (Id INT IDENTITY(1,1) PRIMARY KEY, ASIN NVARCHAR(20) NOT NULL "
+                          "UNIQUE, ProductName NVARCHAR(500), Price DECIMAL(10,2), UpdatedAt DATETIME2 NULL)"))
+    return sqlite_engine
+
+
+def stage(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM temp_products"))
+        conn.execute(text("INSERT INTO temp_products (ASIN, ProductName, Price) VALUES (:a, :n, :p)"),
+                     [{'a': asin, 'n': name, 'p': price} for asin, name, price in rows])
+
+
+def migrate(engine):
+    migration = PartitionedMigration(engine, 'temp_products', 'Products', COLUMNS, 'ASIN',
+                                     where="s.ProductName IS NOT NULL", partition_rows=3, max_workers=2,
+                                     touch='UpdatedAt')
+    return migration, migration.run()
+
+
+def products(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT ASIN, ProductName, Price FROM Products ORDER BY ASIN")).fetchall()
+
+
+ROWS = [(f"B{i:02d}", f"Producto {i}", 10.0 + i) for i in range(10)] + [('B99', None, 1.0)]
+
+
+def test_inserts_in_partitions(engine):
+    stage(engine, ROWS)
+    migration, counts = migrate(engine)
+    assert len(migration.partitions) == 4
+    assert sum(rows for _, _, _, rows in migration.partitions) == 10
+    assert counts == {'inserted': 10, 'updated': 0, 'keys': [f"B{i:02d}" for i in range(10)]}
+    assert products(engine) == [row for row in ROWS if row[1] is not None]
+
+
+def test_rerun_writes_nothing(engine):
+    stage(engine, ROWS)
+    migrate(engine)
+    _, counts = migrate(engine)
+    assert counts == {'inserted': 0, 'updated': 0, 'keys': []}
+
+
+def test_upsert_updates_changed_rows_only(engine):
+    rows = ROWS[:3] + [('B03', 'Producto 3', None)]
+    stage(engine, rows)
+    migrate(engine)
+    # B01 cambia de precio, B03 sigue con precio NULL (NULL = NULL no es un cambio), B50 es nuevo
+    changed = [('B00', 'Producto 0', 10.0), ('B01', 'Producto 1', 99.5), ('B02', 'Producto 2', 12.0),
+               ('B03', 'Producto 3', None), ('B50', 'Producto 50', 5.0)]
+    stage(engine, changed)
+    _, counts = migrate(engine)
+    assert counts == {'inserted': 1, 'updated': 1, 'keys': ['B01', 'B50']}
+    assert products(engine) == changed
+    with engine.connect() as conn:
+        touched = conn.execute(text("SELECT ASIN FROM Products WHERE UpdatedAt IS NOT NULL")).fetchall()
+    assert touched == [('B01',)]
+
+
+def test_empty_staging(engine):
+    migration, counts = migrate(engine)
+    assert migration.partitions == []
+    assert counts == {'inserted': 0, 'updated': 0, 'keys': []}
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from product_dedupe import ProductDeduplicator, family_keys, normalize_names
+
+VANILLA = 'Birdman Falcon Protein Vainilla 1 kg'
+CHOCOLATE = 'Birdman Falcon Protein Chocolate 2 Lb'
+
+
+@pytest.fixture
+def products():
+    """A repetido tres veces; A y B son variantes (sabor y tamaño) de la misma familia"""
+    return pd.DataFrame({
+        'ASIN': ['A', 'B', 'A', 'C', 'A'],
+        'Brand': ['Birdman', 'Birdman', 'Birdman', 'Optimum', 'Birdman'],
+        'ProductName': [VANILLA, CHOCOLATE, VANILLA, 'Gold Standard Whey (5 lb)', VANILLA],
+        'EstRevenue': [100.0, 50.0, 300.0, 10.0, 200.0],
+    })
+
+
+def kept(frame):
+    return list(zip(frame['ASIN'], frame['EstRevenue']))
+
+
+def test_normalize_names():
+    names = pd.Series(['Proteína Sabor Chocolate (Nueva) 1,5 kg 30 Porciones', None])
+    assert normalize_names(names).tolist() == ['proteina', '']
+
+
+def test_family_keys(products):
+    keys = family_keys(products)
+    assert keys[0] == keys[1] == 'birdman|falcon protein'
+    assert keys[3] == 'optimum|gold standard whey'
+
+
+@pytest.mark.parametrize('rule, expected', [
+    ('first', [('A', 100.0), ('B', 50.0), ('C', 10.0)]),
+    ('latest', [('B', 50.0), ('C', 10.0), ('A', 200.0)]),
+    ('highest_revenue', [('B', 50.0), ('A', 300.0), ('C', 10.0)]),
+])
+def test_rules(products, rule, expected):
+    dedupe = ProductDeduplicator(rule)
+    assert kept(dedupe.deduplicate(products)) == expected
+    assert dedupe.stats == {'rows': 5, 'kept': 3, 'duplicate_rows': 2, 'duplicate_asins': 1,
+                            'families': 1, 'variant_products': 2, 'collapsed': 0}
+
+
+@pytest.mark.parametrize('rule, expected', [
+    ('latest', [('C', 10.0), ('A', 200.0)]),
+    ('highest_revenue', [('A', 300.0), ('C', 10.0)]),
+])
+def test_collapse_variants(products, rule, expected):
+    dedupe = ProductDeduplicator(rule, collapse_variants=True)
+    assert kept(dedupe.deduplicate(products)) == expected
+    assert dedupe.stats['collapsed'] == 1
+
+
+def test_streaming_batches_match_single_frame(products):
+    dedupe = ProductDeduplicator('latest')
+    frames = list(dedupe.frames(lambda: [products.iloc[:2], products.iloc[2:]]))
+    assert [kept(frame) for frame in frames] == [[('B', 50.0)], [('C', 10.0), ('A', 200.0)]]
+
+
+def test_apply_rejects_other_batches(products):
+    dedupe = ProductDeduplicator('first').plan([products])
+    with pytest.raises(RuntimeError):
+        list(dedupe.apply([products.iloc[:3]]))
+
+
+def test_unknown_rule():
+    with pytest.raises(ValueError):
+        ProductDeduplicator('newest')
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import inspect, text
+
+from bulk_loader import BulkLoader
+from protein_metrics import RANKING_INDEX, ProteinMetrics, compute_metrics
+from sql_script_runner import SqlScriptRunner
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def deploy(engine, *names):
+    SqlScriptRunner(engine, 'script', progress=lambda message: None).run(
+        [os.path.join(SCRIPTS_DIR, name) for name in names])
+
+
+def test_compute_metrics():
+    features = pd.DataFrame({'ProductId': [1, 2], 'Price': [20.0, 5.0], 'Weight': [1.0, 0.5],
+                             'Protein': [25.0, None], 'Energy': [400.0, 100.0]})
+    metrics = compute_metrics(features)
+    assert metrics.loc[0, ['ProteinGrams', 'PricePerProteinGram', 'PricePerKg', 'ProteinDensity']].tolist() == [
+        250.0, 0.08, 20.0, 6.25]
+    assert metrics.loc[1, 'PricePerKg'] == 10.0
+    assert metrics.loc[1, ['ProteinGrams', 'PricePerProteinGram', 'ProteinDensity']].isna().all()
+
+
+def test_compute_metrics_out_of_range_is_null():
+    """30 / (0.001 g × 0.001 kg × 10) = 3,000,000 no cabe en DECIMAL(10,4)"""
+    features = pd.DataFrame({'ProductId': [1, 2], 'Price': [30.0, 30.0], 'Weight': [0.001, 0.01],
+                             'Protein': [0.001, 1.0], 'Energy': [10.0, 10.0]})
+    metrics = compute_metrics(features)
+    assert pd.isna(metrics.loc[0, 'PricePerProteinGram'])
+    assert metrics.loc[0, 'PricePerKg'] == 30000.0
+    assert metrics.loc[1, 'PricePerProteinGram'] == 300.0
+    assert (metrics['PricePerProteinGram'].dropna().abs() < 10 ** 6).all()
+
+
+def test_summary_script_adds_metrics_to_existing_database(sqlite_engine):
+    """Una base creada con 01 recibe la tabla, el índice y el ranking al desplegar 05 (repetible)"""
+    deploy(sqlite_engine, '01_create_tables.sql')
+    assert not inspect(sqlite_engine).has_table('ProductProteinMetrics')
+    deploy(sqlite_engine, '05_market_summary.sql')
+    deploy(sqlite_engine, '05_market_summary.sql')
+    indexes = [index['name'] for index in inspect(sqlite_engine).get_indexes('ProductProteinMetrics')]
+    assert indexes == [RANKING_INDEX]
+    with sqlite_engine.connect() as conn:
+        assert conn.execute(text("EXEC sp_GetProteinValueRanking")).fetchall() == []
+
+
+def test_refresh_writes_ranking(sqlite_engine):
+    deploy(sqlite_engine, '01_create_tables.sql', '05_market_summary.sql')
+    with sqlite_engine.begin() as conn:
+        conn.execute(text("INSERT INTO Products (ASIN, ProductName, Brand, Category, Price, Weight) VALUES "
+                          "('A1', 'Whey', 'X', 'P', 20, 1), ('A2', 'Barra', 'Y', 'P', 30, 0.001), "
+                          "('A3', 'Iso', 'Z', 'P', 10, 1)"))
+        conn.execute(text("INSERT INTO NutritionalInfo (ProductId, Protein, Energy) SELECT Id, "
+                          "CASE ASIN WHEN 'A1' THEN 25 WHEN 'A2' THEN 0.001 ELSE 50 END, 400 FROM Products"))
+    metrics = ProteinMetrics(sqlite_engine, BulkLoader('executemany', 1000))
+    assert metrics.refresh() == {'products': 3, 'changed': 3, 'removed': 0, 'ranked': 2}
+    with sqlite_engine.connect() as conn:
+        ranking = conn.execute(text("EXEC sp_GetProteinValueRanking")).fetchall()
+    assert [(row[0], row[3]) for row in ranking] == [('A3', 0.02), ('A1', 0.08)]
+    assert metrics.refresh()['changed'] == 0
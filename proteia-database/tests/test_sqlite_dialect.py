@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+from sqlite_dialect import TSqlConnection, translate_batch, translate_sql
+
+
+@pytest.fixture
+def connection():
+    connection = sqlite3.connect(':memory:', factory=TSqlConnection)
+    yield connection
+    connection.close()
+
+
+def test_functions_top_and_schema():
+    sql = translate_sql("SELECT TOP 5 Name, GETDATE() AS Now FROM dbo.Products WITH (NOLOCK) ORDER BY Name")
+    assert sql == ["SELECT  Name, CURRENT_TIMESTAMP AS Now FROM Products  ORDER BY Name LIMIT 5"]
+
+
+def test_literals_are_not_translated():
+    sql = translate_sql("SELECT Name FROM Products WHERE Note = 'GETDATE() ISNULL(' AND Brand = N'dbo.X'")
+    assert sql == ["SELECT Name FROM Products WHERE Note = 'GETDATE() ISNULL(' AND Brand = 'dbo.X'"]
+
+
+def test_offset_fetch():
+    sql = translate_sql("SELECT Name FROM Products ORDER BY Name OFFSET 10 ROWS FETCH NEXT 5 ROWS ONLY")
+    assert sql == ["SELECT Name FROM Products ORDER BY Name LIMIT 5 OFFSET 10"]
+
+
+def test_types():
+    sql = translate_sql("CREATE TABLE T (Id INT IDENTITY(1,1) PRIMARY KEY, Name NVARCHAR(MAX), Price DECIMAL(10,2))")
+    assert sql == ["CREATE TABLE T (Id INTEGER PRIMARY KEY, Name TEXT, Price REAL)"]
+
+
+def test_object_checks():
+    assert translate_sql("IF OBJECT_ID('T', 'U') IS NOT NULL DROP TABLE T") == ["DROP TABLE IF EXISTS T"]
+    sql = translate_sql("""
+    IF OBJECT_ID('T', 'U') IS NULL
+    BEGIN
+        CREATE TABLE T (Id INT NOT NULL);
+    END;
+    """)
+    assert sql == ["CREATE TABLE IF NOT EXISTS T (Id INT NOT NULL)"]
+
+
+def test_index_guard_and_include():
+    assert translate_sql("CREATE NONCLUSTERED INDEX IX ON T (Price) INCLUDE (Name)") == ["CREATE INDEX IX ON T (Price)"]
+    sql = translate_sql("""
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX' AND object_id = OBJECT_ID('T'))
+        CREATE INDEX IX ON T (Price) INCLUDE (Name);
+    """)
+    assert sql == ["CREATE INDEX IF NOT EXISTS IX ON T (Price)"]
+
+
+def test_batch_operations():
+    assert translate_batch("SET NOCOUNT ON") == ()
+    assert translate_batch("MERGE INTO T USING S ON 1 = 1 WHEN MATCHED THEN DELETE;")[0][0] == 'unsupported'
+    assert translate_batch("CREATE OR ALTER PROCEDURE sp_Y @Id INT AS BEGIN SELECT @Id; END")[0][0] == 'skip'
+    assert translate_batch("CREATE OR ALTER PROCEDURE dbo.sp_X AS BEGIN SELECT 1 AS Uno; END") == (
+        ('procedure', 'sp_x', 'SELECT 1 AS Uno;'),)
+
+
+def test_connection_runs_tsql(connection):
+    connection.execute("CREATE TABLE T (Id INT IDENTITY(1,1) PRIMARY KEY, Name NVARCHAR(50), Price DECIMAL(10,2))")
+    connection.execute("INSERT INTO T (Name, Price) VALUES ('a', 10), ('b', NULL)")
+    # DECIMAL con afinidad REAL: 10 / 4 no es una división entera
+    assert connection.execute("SELECT Price / 4 FROM T WHERE Name = 'a'").fetchall() == [(2.5,)]
+    assert connection.execute("SELECT TRY_CAST('x1' AS INT), TRY_CAST(' 12' AS INT)").fetchall() == [(None, 12)]
+    assert connection.execute("SELECT ISNULL(Price, 0) FROM T WHERE Name = 'b'").fetchall() == [(0,)]
+    assert connection.execute("DECLARE @n INT = (SELECT COUNT(*) FROM T); SELECT @n AS n").fetchall() == [(2,)]
+
+
+def test_procedures(connection):
+    connection.execute("CREATE TABLE T (Id INT)")
+    connection.execute("INSERT INTO T (Id) VALUES (1), (2), (3)")
+    connection.execute("CREATE OR ALTER PROCEDURE sp_Count AS BEGIN SELECT COUNT(*) AS n FROM T; END")
+    assert connection.execute("EXEC sp_Count").fetchall() == [(3,)]
+    # CREATE OR ALTER reemplaza el cuerpo guardado
+    connection.execute("CREATE OR ALTER PROCEDURE sp_Count AS BEGIN SELECT MIN(Id) FROM T; END")
+    assert connection.execute("EXEC dbo.sp_Count").fetchall() == [(1,)]
+    with pytest.raises(sqlite3.OperationalError):
+        connection.execute("EXEC sp_Missing")
+
+
+def test_merge_is_not_supported(connection):
+    connection.execute("CREATE TABLE T (Id INT)")
+    with pytest.raises(sqlite3.NotSupportedError):
+        connection.execute("MERGE INTO T USING T AS s ON T.Id = s.Id WHEN MATCHED THEN DELETE;")
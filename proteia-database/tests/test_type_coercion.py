@@ -0,0 +1,58 @@
+import pandas as pd
+
+from type_coercion import (coerce_column, coerce_products_frame, parse_bool, parse_date, parse_decimal,
+                           parse_int, parse_percent, parse_text)
+
+
+def values(series):
+    """Lista con None en lugar de NaN/NA para comparar"""
+    return [None if pd.isna(value) else value for value in series]
+
+
+def test_parse_decimal_rounds_and_drops_overflow():
+    series = pd.Series(['12.346', ' 7 ', 'abc', None, '99999999.99', '100000000'])
+    assert values(parse_decimal(series, 10, 2)) == [12.35, 7.0, None, None, 99999999.99, None]
+
+
+def test_parse_decimal_numeric_input():
+    assert values(parse_decimal(pd.Series([1.23456, -1e6, 999.99994]), 7, 4)) == [1.2346, None, 999.9999]
+
+
+def test_parse_percent():
+    assert values(parse_percent(pd.Series(['13.83%', '5', '', 'n/a']), 5, 4)) == [0.1383, 0.05, None, None]
+    assert values(parse_percent(pd.Series([25.0]), 5, 4)) == [0.25]
+
+
+def test_parse_int():
+    series = pd.Series(['42', '1.5', '3.0', str(2 ** 31), '-7', None])
+    assert values(parse_int(series)) == [42, None, 3, None, -7, None]
+    assert str(parse_int(series).dtype) == 'Int64'
+
+
+def test_parse_bool():
+    assert parse_bool(pd.Series(['TRUE', 'sí', '1', 'false', None, 'x'])).tolist() == [
+        True, True, True, False, False, False]
+
+
+def test_parse_date():
+    dates = parse_date(pd.Series(['4/18/2024', '2024-04-18', None]))
+    assert dates[0] == pd.Timestamp(2024, 4, 18)
+    assert values(dates[1:]) == [None, None]
+
+
+def test_parse_text():
+    assert values(parse_text(pd.Series(['  Whey  ', '', None, 'abcdef']), 4)) == ['Whey', None, None, 'abcd']
+
+
+def test_coerce_column_by_sql_type():
+    assert values(coerce_column(pd.Series(['13.83%']), 'PageSalesShare', 'DECIMAL(5,4)')) == [0.1383]
+    assert values(coerce_column(pd.Series(['13.83']), 'Price', 'DECIMAL(10,2)')) == [13.83]
+    assert values(coerce_column(pd.Series(['7']), 'Reviews', 'INT')) == [7]
+    assert values(coerce_column(pd.Series(['abc']), 'Brand', 'NVARCHAR(2)')) == ['ab']
+
+
+def test_coerce_products_frame_keeps_unknown_columns():
+    frame = pd.DataFrame({'Price': ['10.005'], 'Other': ['x']})
+    typed = coerce_products_frame(frame)
+    assert typed['Other'].tolist() == ['x']
+    assert typed['Price'].dtype == 'float64'
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Conversión vectorizada de columnas del CSV de mercado a tipos de Products
+Reemplaza los CAST/TRY_CAST que la migración hacía fila por fila en el
+servidor: porcentajes ("13.83%"), fechas ("4/18/2024"), booleanos ("TRUE")
+y decimales con la precisión y escala del esquema se convierten en el
+cliente, y las tablas de staging quedan tipadas.
+
+Los valores que no se pueden convertir quedan en NULL, igual que TRY_CAST.
+"""
+
+import re
+
+from market_schema import PERCENT_COLUMNS, PRODUCT_COLUMNS, to_products_frame
+
+DATE_FORMAT = '%m/%d/%Y'
+TRUE_VALUES = ('TRUE', '1', 'YES', 'SI', 'SÍ')
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+_DECIMAL_TYPE = re.compile(r'DECIMAL\((\d+),\s*(\d+)\)')
+_NVARCHAR_TYPE = re.compile(r'NVARCHAR\((\d+)\)')
+
+
+def _as_text(series):
+    """Serie como texto sin espacios; los nulos se conservan"""
+    return series.astype('string').str.strip()
+
+
+def _to_number(series):
+    """Convertir a float; los textos no numéricos pasan a NaN"""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.astype('float64')
+    return pd.to_numeric(_as_text(series), errors='coerce').astype('float64')
+
+
+def parse_decimal(series, precision, scale):
+    """DECIMAL(precision, scale): redondea a la escala y anula lo que no cabe"""
+    values = _to_number(series).round(scale)
+    limit = 10.0 ** (precision - scale)
+    return values.where(values.abs() < limit)
+
+
+def parse_percent(series, precision, scale):
+    """Porcentaje "13.83%" -> fracción 0.1383 con la escala del esquema"""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.astype('float64')
+    else:
+        text = _as_text(series).str.rstrip('%').str.strip()
+        values = pd.to_numeric(text, errors='coerce').astype('float64')
+    return parse_decimal(values / 100.0, precision, scale)
+
+
+def parse_int(series):
+    """INT: valores enteros dentro del rango de 32 bits; lo demás queda nulo"""
+    values = _to_number(series)
+    valid = (values == values.round()) & (values >= INT_MIN) & (values <= INT_MAX)
+    return values.where(valid).astype('Int64')
+
+
+def parse_bool(series):
+    """BIT: verdadero solo para TRUE/1/SÍ, como el CASE de la migración original"""
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(series):
+        return series.fillna(False).astype(bool)
+    return _as_text(series).str.upper().isin(TRUE_VALUES).fillna(False).astype(bool)
+
+
+def parse_date(series, date_format=DATE_FORMAT):
+    """DATE en formato del CSV (mes/día/año)"""
+    import pandas as pd
+
+    return pd.to_datetime(_as_text(series), format=date_format, errors='coerce')
+
+
+def parse_text(series, max_length=None):
+    """NVARCHAR(n): texto sin espacios extremos, recortado al largo de la columna"""
+    text = _as_text(series)
+    text = text.where(text != '')
+    if max_length:
+        text = text.str.slice(0, max_length)
+    return text.astype(object).where(text.notna(), None)
+
+
+def coerce_column(series, column, sql_type):
+    """Convertir una columna de Products según su tipo SQL"""
+    decimal = _DECIMAL_TYPE.fullmatch(sql_type)
+    if decimal:
+        precision, scale = int(decimal.group(1)), int(decimal.group(2))
+        if column in PERCENT_COLUMNS:
+            return parse_percent(series, precision, scale)
+        return parse_decimal(series, precision, scale)
+    if sql_type == 'INT':
+        return parse_int(series)
+    if sql_type == 'BIT':
+        return parse_bool(series)
+    if sql_type == 'DATE':
+        return parse_date(series)
+
+    nvarchar = _NVARCHAR_TYPE.fullmatch(sql_type)
+    return parse_text(series, int(nvarchar.group(1)) if nvarchar else None)
+
+
+def coerce_products_frame(frame):
+    """Convertir todas las columnas de un frame con nombres de Products"""
+    typed = frame.copy()
+    for _, column, sql_type in PRODUCT_COLUMNS:
+        if column in typed.columns:
+            typed[column] = coerce_column(typed[column], column, sql_type)
+    return typed
+
+
+def prepare_products_market(chunk):
+    """Lote limpio de Products_market.csv -> filas tipadas con columnas de Products"""
+    return coerce_products_frame(to_products_frame(chunk))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Verificación del estado de la base de datos sin escanear tablas
+Las filas de todas las tablas salen de una sola consulta al catálogo
+(sys.partitions: filas del heap o del índice clustered), así que verificar
+una base con tablas de 50M filas toma milisegundos y no lee páginas de datos
+al buffer pool. sys.partitions puede diferir de COUNT(*) mientras hay una
+transacción en curso; para verificar una importación terminada basta.
+
+En SQLite (backend local) no hay estadísticas de filas: se cuenta cada tabla
+con COUNT(*) en una sola consulta UNION ALL.
+
+Los chequeos que sí necesitan consultar datos (por ejemplo, que exista un
+usuario) son sondas TOP (1) y corren en paralelo, cada uno con su conexión
+del pool. El resultado es un VerificationResult: los scripts deciden cómo
+imprimirlo.
+"""
+
+import time
+
+from bulk_loader import is_sqlite_connection, quote_identifier
+from market_schema import REFERENCE_ASIN
+from sql_profiler import raw_connection
+
+# Tablas que la importación debe dejar con datos
+REQUIRED_TABLES = [
+    ('config', 'users'),
+    ('dbo', 'Products'),
+    ('dbo', 'NutritionalInfo'),
+    ('dbo', 'ProductAnalysis'),
+    ('dbo', 'Categories'),
+    ('dbo', 'Brands'),
+]
+
+# Tablas de staging del importador (temp_products_market, temp_selected_analysis, ...)
+STAGING_PREFIX = 'temp_'
+
+# Filas de heap (index_id 0) o índice clustered (1): una vez por tabla
+CATALOG_COUNTS_SQL = """
+SELECT s.name AS SchemaName, t.name AS TableName, SUM(p.rows) AS TableRows
+FROM sys.tables t
+INNER JOIN sys.schemas s ON s.schema_id = t.schema_id
+INNER JOIN sys.partitions p ON p.object_id = t.object_id AND p.index_id IN (0, 1)
+GROUP BY s.name, t.name
+"""
+
+SQLITE_TABLES_SQL = """
+SELECT name FROM sqlite_master
+WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '\\_tsql\\_%' ESCAPE '\\'
+"""
+
+# En SQLite todas las tablas quedan en un solo esquema: se reportan como dbo
+SQLITE_SCHEMA = 'dbo'
+
+
+def table_counts(cursor):
+    """
+    Filas por tabla en una sola consulta: ({(esquema, tabla): filas}, método)
+    El método es 'catalog' (Azure SQL, sys.partitions) o 'exact' (SQLite)
+    """
+    if is_sqlite_connection(cursor.connection):
+        cursor.execute(SQLITE_TABLES_SQL)
+        names = [row[0] for row in cursor.fetchall()]
+        if not names:
+            return {}, 'exact'
+        cursor.execute(' UNION ALL '.join(
+            f"SELECT '{name.replace(chr(39), chr(39) * 2)}', COUNT(*) FROM {quote_identifier(name)}"
+            for name in names))
+        return {(SQLITE_SCHEMA, name): rows for name, rows in cursor.fetchall()}, 'exact'
+
+    cursor.execute(CATALOG_COUNTS_SQL)
+    return {(schema, table): int(rows or 0) for schema, table, rows in cursor.fetchall()}, 'catalog'
+
+
+class CheckResult:
+    """Resultado de un chequeo: nombre, si pasó, detalle y duración"""
+
+    def __init__(self, name, ok, detail='', seconds=0.0):
+        self.name = name
+        self.ok = ok
+        self.detail = detail
+        self.seconds = seconds
+
+
+class VerificationResult:
+    """Conteos por tabla, tablas requeridas faltantes o vacías y chequeos"""
+
+    def __init__(self, counts, method, required, checks, seconds):
+        self.counts = counts
+        self.method = method
+        self.required = list(required)
+        self.checks = checks
+        self.seconds = seconds
+
+    @property
+    def missing(self):
+        return [table for table in self.required if table not in self.counts]
+
+    @property
+    def empty(self):
+        return [table for table in self.required if self.counts.get(table) == 0]
+
+    @property
+    def staging(self):
+        return {table: rows for table, rows in self.counts.items()
+                if table[1].lower().startswith(STAGING_PREFIX)}
+
+    @property
+    def ok(self):
+        return not self.missing and not self.empty and all(check.ok for check in self.checks)
+
+    def rows(self, table, schema='dbo'):
+        """Filas de una tabla (None si no existe)"""
+        return self.counts.get((schema, table))
+
+    def report(self):
+        """Texto para los scripts de verificación"""
+        label = "catálogo (sys.partitions)" if self.method == 'catalog' else "COUNT(*)"
+        lines = [f"📈 Conteo de registros ({len(self.counts)} tablas, {label}, {self.seconds * 1000:,.0f} ms):"]
+        for schema, table in self.required:
+            rows = self.counts.get((schema, table))
+            if rows is None:
+                lines.append(f"   ❌ {schema}.{table}: No existe")
+            else:
+                lines.append(f"   {'📊' if rows else '⚠️ '} {schema}.{table}: {rows:,} registros")
+        if self.staging:
+            lines.append("\n🔄 Tablas temporales:")
+            for (schema, table), rows in sorted(self.staging.items()):
+                lines.append(f"   📋 {schema}.{table}: {rows:,} registros")
+        if self.checks:
+            lines.append("\n🔍 Chequeos:")
+            for check in self.checks:
+                detail = f": {check.detail}" if check.detail else ""
+                lines.append(f"   {'✅' if check.ok else '❌'} {check.name}{detail} ({check.seconds * 1000:,.0f} ms)")
+        return '\n'.join(lines)
+
+
+def _probe(sql, description):
+    """Chequeo que pasa si la consulta devuelve al menos una fila"""
+    def check(cursor):
+        cursor.execute(sql)
+        found = cursor.fetchone() is not None
+        return found, description if found else f"sin {description}"
+    return check
+
+
+# (nombre, tabla requerida, función(cursor) -> (ok, detalle)); solo sondas TOP (1)
+DEFAULT_CHECKS = [
+    ('Usuarios', ('config', 'users'), _probe("SELECT TOP (1) 1 FROM config.users", "usuarios registrados")),
+    ('Producto de referencia', ('dbo', 'Products'),
+     _probe(f"SELECT TOP (1) 1 FROM Products WHERE ASIN = '{REFERENCE_ASIN}'", REFERENCE_ASIN)),
+    ('Análisis vinculados', ('dbo', 'ProductAnalysis'),
+     _probe("SELECT TOP (1) 1 FROM ProductAnalysis pa INNER JOIN Products p ON p.Id = pa.ProductId",
+            "análisis con producto")),
+]
+
+
+class DatabaseVerifier:
+    """Conteos por catálogo y chequeos en paralelo sobre conexiones del pool del engine"""
+
+    def __init__(self, engine, required_tables=None, checks=None, max_workers=4):
+        self.engine = engine
+        self.required_tables = REQUIRED_TABLES if required_tables is None else required_tables
+        self.checks = DEFAULT_CHECKS if checks is None else checks
+        self.max_workers = max_workers
+
+    def _with_cursor(self, func):
+        connection = raw_connection(self.engine)
+        try:
+            cursor = connection.cursor()
+            try:
+                return func(cursor)
+            finally:
+                cursor.close()
+        finally:
+            # Solo lecturas: devolver la conexión al pool sin transacción abierta
+            connection.rollback()
+            connection.close()
+
+    def _run_check(self, name, func):
+        started = time.perf_counter()
+        try:
+            ok, detail = self._with_cursor(func)
+        except Exception as e:
+            ok, detail = False, str(e)
+        return CheckResult(name, ok, detail, time.perf_counter() - started)
+
+    def run(self):
+        """Ejecutar conteos y chequeos; devuelve un VerificationResult"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        started = time.perf_counter()
+        counts, method = self._with_cursor(table_counts)
+
+        # Los chequeos de tablas que no existen fallan sin consultar
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for name, table, func in self.checks:
+                if table is not None and table not in counts:
+                    results[name] = CheckResult(name, False, f"{table[0]}.{table[1]} no existe")
+                else:
+                    futures[name] = executor.submit(self._run_check, name, func)
+            for name, future in futures.items():
+                results[name] = future.result()
+        results = [results[name] for name, _, _ in self.checks]
+        return VerificationResult(counts, method, self.required_tables, results, time.perf_counter() - started)
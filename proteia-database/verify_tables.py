@@ -3,8 +3,8 @@
 Script para verificar que todas las tablas existen
 """
 
-import pyodbc
-from connection_config import get_direct_connection_string
+from connection_config import pooled_connection
+from verification import table_counts
 
 def verify_tables():
     print("🔍 Verificando tablas en la base de datos...")
@@ -13,25 +13,9 @@ def verify_tables():
     password = "$3d2z@Se9IPW"
     
     try:
-        conn_str = get_direct_connection_string(username, password)
-        
-        with pyodbc.connect(conn_str) as conn:
+        with pooled_connection(username, password) as conn:
             cursor = conn.cursor()
             
-            # Verificar todas las tablas
-            print("\n📋 Tablas existentes:")
-            cursor.execute("""
-                SELECT 
-                    TABLE_SCHEMA,
-                    TABLE_NAME,
-                    TABLE_TYPE
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_TYPE = 'BASE TABLE'
-                ORDER BY TABLE_SCHEMA, TABLE_NAME
-            """)
-            
-            tables = cursor.fetchall()
-            
             required_tables = [
                 ('config', 'users'),
                 ('dbo', 'Products'),
@@ -40,12 +24,15 @@ def verify_tables():
                 ('dbo', 'UserSessions')
             ]
             
-            existing_tables = [(t.TABLE_SCHEMA, t.TABLE_NAME) for t in tables]
+            # Tablas y filas en una sola consulta al catálogo
+            print("\n📋 Tablas existentes:")
+            counts, _ = table_counts(cursor)
+            existing_tables = sorted(counts)
             
-            print(f"Total tablas encontradas: {len(tables)}")
-            for table in tables:
-                status = "✅" if (table.TABLE_SCHEMA, table.TABLE_NAME) in required_tables else "ℹ️"
-                print(f"   {status} {table.TABLE_SCHEMA}.{table.TABLE_NAME}")
+            print(f"Total tablas encontradas: {len(existing_tables)}")
+            for schema, table in existing_tables:
+                status = "✅" if (schema, table) in required_tables else "ℹ️"
+                print(f"   {status} {schema}.{table} ({counts[(schema, table)]:,} registros)")
             
             print(f"\n🔍 Verificando tablas requeridas:")
             missing_tables = []